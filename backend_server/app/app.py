@@ -4,7 +4,12 @@ from flask_jwt_extended import JWTManager
 from datetime import datetime
 from app.config import Config
 from app.db import DB
+from app.utils.log import setup_logging, get_logger
+from app.utils import metrics
+from app.utils.query_budget import setup_query_budget
+from app.utils.rate_limit import setup_proxy_fix
 from bson import ObjectId
+import orjson
 
 
 # ============================================================
@@ -24,6 +29,17 @@ class CustomJSONProvider(DefaultJSONProvider):
         return super().default(obj)
 
 
+class OrjsonProvider(CustomJSONProvider):
+    # datetime/UUID are native to orjson; ObjectId goes through default()
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # ============================================================
 # APPLICATION FACTORY
 # ============================================================
@@ -31,16 +47,30 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # -----------------------------------------------
+    # Logging (queued, background writer, request ids)
+    # -----------------------------------------------
+    setup_logging(app)
+    metrics.setup_metrics(app)
+    setup_query_budget(app)
+
     # -----------------------------------------------
     # JSON ENGINE FIX — THE MOST IMPORTANT PART
     # -----------------------------------------------
     # Register custom JSON provider (NEW Flask system)
-    app.json_provider_class = CustomJSONProvider
+    app.json_provider_class = OrjsonProvider
     app.json = app.json_provider_class(app)
 
     # Disable old JSON encoder so Flask MUST use the provider
     app.json_encoder = None     # ← CRITICAL FIX!
 
+    # Reject oversized uploads from Content-Length, before the body
+    # is read (64KB headroom for multipart framing and form fields)
+    app.config["MAX_CONTENT_LENGTH"] = Config.MAX_UPLOAD_BYTES + 64 * 1024
+
+    # Client IP from X-Forwarded-For when behind trusted proxies
+    setup_proxy_fix(app)
+
     # -----------------------------------------------
     # JWT initialization
     # -----------------------------------------------
@@ -51,6 +81,19 @@ def create_app():
     # -----------------------------------------------
     DB.initialize()
 
+    # Warm the in-process medicine catalog (reloads lazily if this fails)
+    from app.services.medicine_catalog import MedicineCatalog
+    try:
+        MedicineCatalog.load()
+    except Exception as e:
+        get_logger("catalog").warning("Initial medicine catalog load failed: %s", e)
+
+    # -----------------------------------------------
+    # CLI commands (flask ensure-indexes / check-indexes)
+    # -----------------------------------------------
+    from app.cli import register_cli
+    register_cli(app)
+
     # -----------------------------------------------
     # Register Blueprints
     # -----------------------------------------------
@@ -63,6 +106,8 @@ def create_app():
     from app.routes.veterinarian_auth import veterinarian_auth_bp
     from app.routes.upload_routes import upload_bp
     from app.routes.medicines import medicines_bp
+    from app.routes.authority_dashboard import authority_dashboard_bp
+    from app.routes.ops import ops_bp
     app.register_blueprint(medicines_bp, url_prefix="/medicines")
 
 
@@ -73,7 +118,9 @@ def create_app():
     app.register_blueprint(consumer_bp, url_prefix='/consumer')
     app.register_blueprint(veterinarian_auth_bp, url_prefix='/veterinarian/auth')
     app.register_blueprint(authority_auth_bp, url_prefix='/authority/auth')
+    app.register_blueprint(authority_dashboard_bp, url_prefix='/authority/dashboard')
     app.register_blueprint(upload_bp, url_prefix='/uploads')
+    app.register_blueprint(ops_bp)
 
     # -----------------------------------------------
     # Health Check Route
@@ -86,9 +133,15 @@ def create_app():
             "status": "running"
         }), 200
 
-    # -----------------------------------------------
-    # Error Handlers
-    # -----------------------------------------------
+    register_error_handlers(app)
+
+    return app
+
+
+# -----------------------------------------------
+# Error Handlers (JSON bodies, like every other response)
+# -----------------------------------------------
+def register_error_handlers(app):
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({
@@ -96,11 +149,16 @@ def create_app():
             "message": str(error)
         }), 404
 
+    @app.errorhandler(413)
+    def payload_too_large(error):
+        return jsonify({
+            "error": "Payload too large",
+            "message": f"Uploads are limited to {Config.MAX_UPLOAD_BYTES} bytes"
+        }), 413
+
     @app.errorhandler(500)
     def internal_server_error(error):
         return jsonify({
             "error": "Internal server error",
             "message": str(error)
         }), 500
-
-    return app
@@ -0,0 +1,361 @@
+import os
+import sys
+from datetime import datetime
+
+import click
+from bson import ObjectId
+from mongoengine.queryset.visitor import Q
+
+
+# ============================================================
+# MODELS WITH DECLARED INDEXES
+# ============================================================
+def indexed_models():
+    from app.models.farmers import Farmer
+    from app.models.vets import Vet
+    from app.models.animals import Animal
+    from app.models.treatments import Treatment
+    from app.models.withdrawal_alert import WithdrawalAlert
+    from app.models.authorized_medicine import AuthorizedMedicine
+    from app.models.authorities import Authority
+    from app.models.dashboard_rollup import DashboardRollup
+    from app.models.otp_code import OTPCode
+
+    return [
+        Farmer, Vet, Animal, Treatment, WithdrawalAlert,
+        AuthorizedMedicine, Authority, DashboardRollup, OTPCode,
+    ]
+
+
+# ============================================================
+# HOT ROUTE QUERIES (shape only — ids are placeholders)
+# ============================================================
+def route_queries():
+    from app.models.farmers import Farmer
+    from app.models.vets import Vet
+    from app.models.animals import Animal
+    from app.models.treatments import Treatment
+    from app.models.withdrawal_alert import WithdrawalAlert
+
+    some_id = ObjectId()
+    return {
+        "treatments.get_treatments_by_farmer": Treatment.objects(
+            Q(farmer=some_id) & (Q(status="pending") | Q(vet=some_id))
+        ).order_by("-created_at", "-id"),
+        "treatments.get_treatments_by_animal": Treatment.objects(
+            animal=some_id
+        ).order_by("-created_at", "-id"),
+        "animals.by_farmer": Animal.objects(farmer=some_id),
+        "withdrawal.farm_safety": Animal.objects(
+            farmer=some_id, withdrawal_safe_from__gt=datetime.utcnow()
+        ),
+        "withdrawal.active_alert_for_animal": WithdrawalAlert.objects(
+            animal_id=str(some_id), safe_from__gt=datetime.utcnow()
+        ),
+        "vet_auth.by_mobile": Vet.objects(mobile_e164="+910000000000").only("id"),
+        "export.farmers_by_district": Farmer.objects(district="placeholder").only("id"),
+    }
+
+
+def export_pipelines():
+    """{name: (collection, pipeline)} as the export route runs them."""
+    from app.services.export_service import DATASETS, ExportService
+
+    since = datetime.utcnow()
+    pipelines = {}
+    for dataset, spec in DATASETS.items():
+        kind, _ = spec["district_by"]
+        owner_ids = [ObjectId()] if kind == "farmer" else [str(ObjectId())]
+        pipelines[f"export.{dataset}"] = (
+            spec["collection"], ExportService.build_pipeline(dataset, since)
+        )
+        pipelines[f"export.{dataset}.district"] = (
+            spec["collection"], ExportService.build_pipeline(dataset, since, None, owner_ids)
+        )
+    return pipelines
+
+
+def winning_plans(explained):
+    """
+    Yield every winningPlan in explain() output: top level for find,
+    under stages[].$cursor (or a top-level queryPlanner) for aggregate.
+    """
+    if isinstance(explained, dict):
+        for key, value in explained.items():
+            if key == "winningPlan":
+                yield value
+            elif key != "rejectedPlans":
+                yield from winning_plans(value)
+    elif isinstance(explained, list):
+        for item in explained:
+            yield from winning_plans(item)
+
+
+def plan_stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+
+# ============================================================
+# CLI REGISTRATION
+# ============================================================
+def register_cli(app):
+
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes():
+        """Build every index declared in model meta (background builds)."""
+        for model in indexed_models():
+            click.echo(f"[INDEX] {model._get_collection_name()} ...")
+            model.ensure_indexes()
+
+        # consumer_checks is read raw (no model meta); index it directly
+        from app.db import DB
+        click.echo("[INDEX] consumer_checks ...")
+        DB.consumer_checks.create_index([("checked_at", 1)], background=True)
+        DB.consumer_checks.create_index([("farmer_id", 1), ("checked_at", 1)], background=True)
+        click.echo("[INDEX] done")
+
+    @app.cli.command("check-indexes")
+    def check_indexes():
+        """explain() each known route query and export pipeline; fail on any COLLSCAN."""
+        from app.db import DB
+
+        explained = {name: queryset.explain() for name, queryset in route_queries().items()}
+        for name, (collection, pipeline) in export_pipelines().items():
+            explained[name] = DB.db.command(
+                "explain", {"aggregate": collection, "pipeline": pipeline, "cursor": {}},
+                verbosity="queryPlanner"
+            )
+
+        failures = []
+        for name, explain in explained.items():
+            stages = list(plan_stages(list(winning_plans(explain))))
+
+            status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+            click.echo(f"[EXPLAIN] {name}: {' <- '.join(stages)} [{status}]")
+
+            if status != "ok":
+                failures.append(name)
+
+        if failures:
+            click.echo(f"[EXPLAIN] COLLSCAN in: {', '.join(failures)}", err=True)
+            sys.exit(1)
+
+        click.echo("[EXPLAIN] all route queries use an index")
+
+    @app.cli.command("backfill-withdrawal-status")
+    def backfill_withdrawal_status():
+        """Populate Animal.withdrawal_safe_from from withdrawal_alerts."""
+        from app.services.withdrawal_service import WithdrawalService
+
+        updated = WithdrawalService.backfill_animal_status()
+        click.echo(f"[BACKFILL] animals updated = {updated}")
+
+    @app.cli.command("drop-animal-treatment-ids")
+    @click.option("--batch-size", default=1000, help="Animals checked per batch")
+    def drop_animal_treatment_ids(batch_size):
+        """
+        Remove the legacy Animal.treatment_ids array. Treatments are found
+        by the indexed Treatment.animal field; ids listed on an animal
+        with no matching treatment are reported before the array is dropped.
+        """
+        from app.db import DB
+
+        query = {"treatment_ids": {"$exists": True}}
+        animals = DB.animals.find(query, {"treatment_ids": 1}).batch_size(batch_size)
+
+        orphans = 0
+        for animal in animals:
+            listed = {
+                ObjectId(t) for t in animal.get("treatment_ids") or [] if ObjectId.is_valid(t)
+            }
+            if not listed:
+                continue
+            found = DB.treatments.count_documents({"_id": {"$in": list(listed)}, "animal": animal["_id"]})
+            if found < len(listed):
+                orphans += len(listed) - found
+                click.echo(f"[MIGRATE] animal {animal['_id']}: {len(listed) - found} listed treatments not found")
+
+        result = DB.animals.update_many(query, {"$unset": {"treatment_ids": ""}})
+        click.echo(f"[MIGRATE] animals updated = {result.modified_count}, orphaned ids = {orphans}")
+
+    @app.cli.command("backfill-mobile-e164")
+    @click.option("--batch-size", default=1000, help="Documents written per batch")
+    def backfill_mobile_e164(batch_size):
+        """
+        Set mobile_e164 on vets and farmers saved before it existed.
+        Numbers that do not parse, or that normalize to a mobile another
+        account already holds, are reported and left for manual cleanup.
+        Run ensure-indexes afterwards.
+        """
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError
+        from app.db import DB
+        from app.utils.phone import normalize_mobile
+
+        for collection in (DB.vets, DB.farmers):
+            name = collection.name
+            taken = {
+                doc["mobile_e164"]: doc["_id"]
+                for doc in collection.find({"mobile_e164": {"$type": "string"}}, {"mobile_e164": 1})
+            }
+            pending = collection.find(
+                {"mobile_e164": {"$not": {"$type": "string"}}}, {"mobile": 1}
+            ).batch_size(batch_size)
+
+            updated = invalid = conflicts = 0
+            ops = []
+
+            def flush():
+                nonlocal updated, conflicts
+                if not ops:
+                    return
+                try:
+                    updated += collection.bulk_write(ops, ordered=False).modified_count
+                except BulkWriteError as e:
+                    updated += e.details.get("nModified", 0)
+                    conflicts += len(e.details.get("writeErrors", []))
+                ops.clear()
+
+            for doc in pending:
+                e164 = normalize_mobile(doc.get("mobile"))
+                if not e164:
+                    invalid += 1
+                    click.echo(f"[MIGRATE] {name} {doc['_id']}: invalid mobile {doc.get('mobile')!r}")
+                    continue
+                if e164 in taken:
+                    conflicts += 1
+                    click.echo(f"[MIGRATE] {name} {doc['_id']}: {e164} already used by {taken[e164]}")
+                    continue
+                taken[e164] = doc["_id"]
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"mobile_e164": e164}}))
+                if len(ops) >= batch_size:
+                    flush()
+            flush()
+
+            click.echo(f"[MIGRATE] {name} updated = {updated}, invalid = {invalid}, conflicts = {conflicts}")
+
+    @app.cli.command("rebuild-rollups")
+    @click.option("--since", default=None, help="YYYY-MM-DD; default rebuilds everything")
+    def rebuild_rollups(since):
+        """Recompute dashboard rollups from treatments and animals."""
+        from app.services.rollup_service import RollupService
+
+        since_dt = datetime.strptime(since, "%Y-%m-%d") if since else None
+        written = RollupService.rebuild(since_dt)
+        click.echo(f"[ROLLUP] rollup documents written = {written}")
+
+    @app.cli.command("bench-serializers")
+    @click.option("--rounds", default=20000, help="Documents serialized per model")
+    def bench_serializers(rounds):
+        """Serialization throughput: legacy to_mongo+_clean vs compiled."""
+        import json
+        import time as _time
+        from app.models.farmers import Farmer
+        from app.models.animals import Animal
+        from app.models.treatments import Treatment
+        from app.models.prescribed_medicine import PrescribedMedicine
+        from app.utils.serializer import compile_serializer, _clean
+
+        now = datetime.utcnow()
+        samples = {
+            "Farmer": Farmer(
+                id=ObjectId(), name="Asha", mobile="+919800000000",
+                aadhar_number="1234", document_paths=["a.pdf", "b.pdf"],
+                created_at=now, updated_at=now
+            ),
+            "Animal": Animal(
+                id=ObjectId(), farmer=ObjectId(), species="cow", tag_number="T-1",
+                additional_image_paths=["1.jpg", "2.jpg"], created_at=now, updated_at=now
+            ),
+            "Treatment": Treatment(
+                id=ObjectId(), farmer=ObjectId(), animal=ObjectId(), vet=ObjectId(),
+                symptoms=["fever", "cough"],
+                medicines=[
+                    PrescribedMedicine(medicine=ObjectId(), dosage="5ml", withdrawal_period_days=7)
+                    for _ in range(3)
+                ],
+                created_at=now, updated_at=now
+            ),
+        }
+
+        def legacy(doc):
+            cleaned = _clean(doc.to_mongo().to_dict())
+            cleaned["id"] = cleaned.pop("_id", None)
+            return cleaned
+
+        for name, doc in samples.items():
+            for label, fn in (("legacy", legacy), ("compiled", compile_serializer(type(doc)))):
+                started = _time.perf_counter()
+                for _ in range(rounds):
+                    json.dumps(fn(doc))
+                elapsed = _time.perf_counter() - started
+                click.echo(f"[BENCH] {name:<9} {label:<8} {rounds / elapsed:>10.0f} docs/s")
+
+    @app.cli.command("bench-upload-memory")
+    @click.option("--sizes", default="1,8,32,64", help="File sizes in MB, comma separated")
+    def bench_upload_memory(sizes):
+        """Peak Python memory per upload: read() + post vs streamed body."""
+        import tempfile
+        import threading
+        import tracemalloc
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from app.services.storage_service import StorageService
+        from app.services.storage_backends import SupabaseBackend
+
+        class StandIn(BaseHTTPRequestHandler):
+            # Local stand-in for the storage upload endpoint: drains the body
+            def do_POST(self):
+                remaining = int(self.headers.get("Content-Length", 0))
+                while remaining:
+                    remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        storage = StorageService(backend=SupabaseBackend(
+            f"http://127.0.0.1:{server.server_port}", "bench", "bench"
+        ))
+
+        def peak_mb(fn):
+            tracemalloc.start()
+            try:
+                fn()
+                return tracemalloc.get_traced_memory()[1] / 2**20
+            finally:
+                tracemalloc.stop()
+
+        try:
+            for size_mb in (int(s) for s in sizes.split(",")):
+                with tempfile.TemporaryFile() as f:
+                    block = os.urandom(2**20)
+                    for _ in range(size_mb):
+                        f.write(block)
+
+                    def buffered():
+                        f.seek(0)
+                        storage.upload_file("bench/buffered", f.read())
+
+                    def streamed():
+                        f.seek(0)
+                        storage.upload_stream("bench/streamed", f, max_bytes=2**40, dedupe=False)
+
+                    click.echo(
+                        f"[BENCH] {size_mb:>4} MB  buffered peak {peak_mb(buffered):8.2f} MB"
+                        f"  streamed peak {peak_mb(streamed):6.2f} MB"
+                    )
+        finally:
+            server.shutdown()
@@ -10,9 +10,119 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))
     TEST_OTP_MODE = os.getenv('TEST_OTP_MODE', 'False').lower() == 'true'
 
+    # MongoDB connection pool (shared by MongoEngine and raw PyMongo)
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 10000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")  # e.g. "zstd,snappy,zlib"
+    MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+    # Keyset pagination for list endpoints
+    PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", 50))
+    PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", 200))
+
+    # Consumer safety result cache (per farmer, per worker)
+    SAFETY_CACHE_MAX_TTL_SECONDS = int(os.getenv("SAFETY_CACHE_MAX_TTL_SECONDS", 30))
+    SAFETY_CACHE_MAX_ENTRIES = int(os.getenv("SAFETY_CACHE_MAX_ENTRIES", 10000))
+
+    # Authority dashboard overview cache (shared by all sessions)
+    OVERVIEW_CACHE_TTL_SECONDS = int(os.getenv("OVERVIEW_CACHE_TTL_SECONDS", 30))
+
+    # Farmer -> district lookups for dashboard rollups (per worker)
+    ROLLUP_DISTRICT_CACHE_SECONDS = int(os.getenv("ROLLUP_DISTRICT_CACHE_SECONDS", 300))
+    ROLLUP_DISTRICT_CACHE_MAX_ENTRIES = int(os.getenv("ROLLUP_DISTRICT_CACHE_MAX_ENTRIES", 4096))
+
+    # Logging (queued, written by a background thread)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1.0))
+
+    # Per-route Mongo command budgets: "off", "log" or "raise" (tests)
+    QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off").lower()
+
+    # Bearer token for /metrics and /health/db-pool (scrapers send
+    # "Authorization: Bearer ..."); unset = both refuse every request
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # Authority exports (streamed NDJSON / CSV)
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+    EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", 64 * 1024))
+    EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", 2))
+    # Owner ids per $in when an export is filtered by district
+    EXPORT_DISTRICT_BATCH = int(os.getenv("EXPORT_DISTRICT_BATCH", 1000))
+
+    # Treatment camps: most animals / treatments per bulk call
+    TREATMENT_BATCH_MAX = int(os.getenv("TREATMENT_BATCH_MAX", 200))
+
+    # Object storage (Supabase) HTTP client
+    STORAGE_POOL_SIZE = int(os.getenv("STORAGE_POOL_SIZE", 10))
+    STORAGE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("STORAGE_CONNECT_TIMEOUT_SECONDS", 3))
+    STORAGE_READ_TIMEOUT_SECONDS = float(os.getenv("STORAGE_READ_TIMEOUT_SECONDS", 20))
+    STORAGE_RETRIES = int(os.getenv("STORAGE_RETRIES", 2))
+    STORAGE_BACKOFF_SECONDS = float(os.getenv("STORAGE_BACKOFF_SECONDS", 0.3))
+    STORAGE_BREAKER_FAILURES = int(os.getenv("STORAGE_BREAKER_FAILURES", 5))
+    STORAGE_BREAKER_RESET_SECONDS = int(os.getenv("STORAGE_BREAKER_RESET_SECONDS", 30))
+
+    # Largest single file accepted by the upload routes
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 15 * 1024 * 1024))
+
+    # Storage backend: "supabase" or "local" (content-addressed files
+    # under LOCAL_STORAGE_ROOT, served by /uploads/files; no network)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+    LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", "local_storage")
+    # HMAC key for /uploads/files links; separate from JWT_SECRET_KEY so
+    # a leaked file link never helps forge tokens, and either can rotate
+    FILE_SIGNING_KEY = os.getenv("FILE_SIGNING_KEY", "super-secret-file-signing-key")
+
+    # Signed storage URLs (cached per worker until near expiry)
+    SIGNED_URL_EXPIRES_SECONDS = int(os.getenv("SIGNED_URL_EXPIRES_SECONDS", 3600 * 24 * 365))
+    SIGNED_URL_REFRESH_MARGIN_SECONDS = int(os.getenv("SIGNED_URL_REFRESH_MARGIN_SECONDS", 3600))
+    SIGNED_URL_CACHE_MAX_ENTRIES = int(os.getenv("SIGNED_URL_CACHE_MAX_ENTRIES", 50000))
+    SIGN_BATCH_MAX = int(os.getenv("SIGN_BATCH_MAX", 200))
+
+    # Image derivatives (WebP thumb/medium)
+    IMAGE_DERIVATIVES_ENABLED = os.getenv("IMAGE_DERIVATIVES_ENABLED", "true").lower() == "true"
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+    IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", 75))
+
+    # OTP: local hashed codes (TTL-indexed), SMS sent in the background
+    OTP_LENGTH = int(os.getenv("OTP_LENGTH", 6))
+    OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", 300))
+    OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+    OTP_QUEUE_SIZE = int(os.getenv("OTP_QUEUE_SIZE", 1000))
+    # HMAC key for stored codes; separate from JWT_SECRET_KEY
+    OTP_HASH_KEY = os.getenv("OTP_HASH_KEY", "super-secret-otp-hash-key")
+    # TEST_OTP_MODE: no SMS is sent and every code is this one
+    TEST_OTP_CODE = os.getenv("TEST_OTP_CODE", "123456")
+    # send-otp token buckets: burst size and sustained refill rate
+    OTP_MOBILE_BURST = int(os.getenv("OTP_MOBILE_BURST", 3))
+    OTP_MOBILE_PER_HOUR = float(os.getenv("OTP_MOBILE_PER_HOUR", 6))
+    OTP_IP_BURST = int(os.getenv("OTP_IP_BURST", 20))
+    OTP_IP_PER_MINUTE = float(os.getenv("OTP_IP_PER_MINUTE", 10))
+    # Reverse proxies in front of the app whose X-Forwarded-For is
+    # trusted for the client IP (0 = clients connect directly)
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", 0))
+
+    # Per-worker cache of normalized (E.164) mobile numbers
+    PHONE_CACHE_SIZE = int(os.getenv("PHONE_CACHE_SIZE", 4096))
+
+    # How often a worker checks whether the medicine catalog changed
+    MEDICINE_CATALOG_CHECK_SECONDS = int(os.getenv("MEDICINE_CATALOG_CHECK_SECONDS", 30))
+    # Shortest gap between version checks forced by unknown medicine ids
+    MEDICINE_CATALOG_MISS_CHECK_SECONDS = float(os.getenv("MEDICINE_CATALOG_MISS_CHECK_SECONDS", 2))
+
+# OTP SMS go through Twilio's Messages API, sent from TWILIO_SMS_FROM
+# (a Twilio number or messaging service SID) — required for OTP login.
+# Codes are generated and checked locally (otp_codes collection), so
+# TWILIO_VERIFY_SERVICE_SID is no longer used.
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-TWILIO_VERIFY_SERVICE_SID = os.getenv('TWILIO_VERIFY_SERVICE_SID') # seconds
+TWILIO_VERIFY_SERVICE_SID = os.getenv('TWILIO_VERIFY_SERVICE_SID')  # unused, see above
+TWILIO_SMS_FROM = os.getenv('TWILIO_SMS_FROM')
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
@@ -1,10 +1,94 @@
-from pymongo import MongoClient
+import threading
+import time
+
+from pymongo import monitoring
 import certifi
 from app.config import Config
+from app.utils.metrics import MongoCommandMetrics
+from app.utils.query_budget import QueryBudgetListener
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Tracks how many pooled connections are checked out and how long
+    requests wait to get one. Used to size workers vs maxPoolSize.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def _pending(self):
+        if not hasattr(self._local, "started"):
+            self._local.started = {}
+        return self._local.started
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_avg_ms": round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "max_pool_size": Config.MONGO_MAX_POOL_SIZE,
+            }
+
+    # -- checkout ------------------------------------------------
+    def connection_check_out_started(self, event):
+        self._pending()[event.address] = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = self._pending().pop(event.address, None)
+        waited_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_total_ms += waited_ms
+            self.wait_max_ms = max(self.wait_max_ms, waited_ms)
+
+    def connection_check_out_failed(self, event):
+        self._pending().pop(event.address, None)
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    # -- pool lifecycle (not tracked) ----------------------------
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
 
 class DB:
     client = None
     db = None
+    pool_monitor = None
+    command_listener = None
     farmers = None
     animals = None
     vets = None
@@ -13,12 +97,45 @@ class DB:
     consumer_checks = None
     authority_verifications = None
     authorities = None
+    withdrawal_alerts = None
 
     @classmethod
-    def initialize(cls):
+    def client_options(cls):
+        options = {
+            "tlsCAFile": certifi.where(),
+            "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": Config.MONGO_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "connectTimeoutMS": Config.MONGO_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": Config.MONGO_SOCKET_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "readPreference": Config.MONGO_READ_PREFERENCE,
+            "event_listeners": [cls.pool_monitor, cls.command_listener],
+        }
+        if Config.MONGO_COMPRESSORS:
+            options["compressors"] = Config.MONGO_COMPRESSORS
+        if Config.QUERY_BUDGET_MODE != "off":
+            options["event_listeners"].append(QueryBudgetListener())
+        return options
+
+    @classmethod
+    def initialize(cls, mongo_client_class=None):
         from mongoengine import connect
-        connect(db=Config.MONGO_DB_NAME, host=Config.MONGO_URI, tlsCAFile=certifi.where())
-        cls.client = MongoClient(Config.MONGO_URI, tlsCAFile=certifi.where())
+
+        # One client per process: MongoEngine owns it, raw PyMongo
+        # handles below share the same pool and server monitors.
+        # `mongo_client_class` swaps the driver (tests: mongomock).
+        cls.pool_monitor = PoolMonitor()
+        cls.command_listener = MongoCommandMetrics()
+        options = cls.client_options()
+        if mongo_client_class is not None:
+            options["mongo_client_class"] = mongo_client_class
+        cls.client = connect(
+            db=Config.MONGO_DB_NAME,
+            host=Config.MONGO_URI,
+            **options
+        )
         cls.db = cls.client[Config.MONGO_DB_NAME]
         cls.farmers = cls.db.farmers
         cls.animals = cls.db.animals
@@ -28,8 +145,17 @@ class DB:
         cls.consumer_checks = cls.db.consumer_checks
         cls.authority_verifications = cls.db.authority_verifications
         cls.authorities = cls.db.authorities
+        cls.withdrawal_alerts = cls.db.withdrawal_alerts
+
+    @classmethod
+    def pool_stats(cls):
+        if not cls.pool_monitor:
+            return {}
+        return cls.pool_monitor.snapshot()
 
     @classmethod
     def close(cls):
         if cls.client:
-            cls.client.close()
\ No newline at end of file
+            from mongoengine import disconnect
+            disconnect()
+            cls.client = None
@@ -6,6 +6,10 @@ from mongoengine import (
 import datetime
 from app.utils.serializer import SerializerMixin
 from app.models.farmers import Farmer
+from app.models.prefetch import reference_id
+from app.utils.log import get_logger
+
+log = get_logger("rollups")
 
 
 class GPSLocation(EmbeddedDocument):
@@ -39,20 +43,41 @@ class Animal(Document, SerializerMixin):
     current_health_issues = ListField(StringField())
     is_active = BooleanField(default=True)
 
-    treatment_ids = ListField(StringField())
+    # Denormalized from withdrawal_alerts: latest safe_from of any
+    # treatment on this animal (None = never under withdrawal)
+    withdrawal_safe_from = DateTimeField()
 
     gps_location = EmbeddedDocumentField(GPSLocation)
 
     created_at = DateTimeField(default=datetime.datetime.utcnow)
     updated_at = DateTimeField(default=datetime.datetime.utcnow)
 
-    meta = {"collection": "animals"}
-    # Optional but helps debugging
-    def to_json(self):
-        print("🔥 Animal.to_json() running")
-        return super().to_json()
-
+    meta = {
+        "collection": "animals",
+        "index_background": True,
+        # Tolerate fields dropped from the schema (treatment_ids) on
+        # documents not yet migrated by `drop-animal-treatment-ids`
+        "strict": False,
+        "indexes": [
+            ("farmer", "withdrawal_safe_from"),
+            # dashboard overview: farms under withdrawal (covered)
+            ("withdrawal_safe_from", "farmer"),
+        ]
+    }
     def save(self, *args, **kwargs):
         self.updated_at = datetime.datetime.utcnow()
-        return super().save(*args, **kwargs)
+        is_new = self.pk is None
+        result = super().save(*args, **kwargs)
+
+        if is_new:
+            # Logged, not raised: the animal is already stored
+            from app.services.rollup_service import RollupService, ANIMALS_REGISTERED
+            try:
+                RollupService.record(
+                    ANIMALS_REGISTERED, farmer_id=reference_id(self, "farmer"), key=self.species
+                )
+            except Exception:
+                log.exception("rollup update failed for animal %s", self.pk)
+
+        return result
 
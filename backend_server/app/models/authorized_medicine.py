@@ -11,3 +11,17 @@ class AuthorizedMedicine(Document):
     meta = {
         "collection": "authorized_medicines"
     }
+
+    # Any write invalidates the in-process MedicineCatalog on every worker.
+    # Bulk/raw writes must call MedicineCatalog.bump_version() themselves.
+    def save(self, *args, **kwargs):
+        from app.services.medicine_catalog import MedicineCatalog
+        result = super().save(*args, **kwargs)
+        MedicineCatalog.bump_version()
+        return result
+
+    def delete(self, *args, **kwargs):
+        from app.services.medicine_catalog import MedicineCatalog
+        result = super().delete(*args, **kwargs)
+        MedicineCatalog.bump_version()
+        return result
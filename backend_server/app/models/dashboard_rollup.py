@@ -0,0 +1,25 @@
+from mongoengine import Document, StringField, IntField, DictField
+
+
+class DashboardRollup(Document):
+    """
+    One document per (day, district, metric), maintained with $inc by
+    RollupService. `counts` breaks the total down by a metric-specific
+    key (species, medicine id, compliant/violation, ...).
+    """
+
+    id = StringField(primary_key=True)  # "<day>|<district>|<metric>"
+    day = StringField(required=True)    # YYYY-MM-DD (UTC)
+    district = StringField(required=True)
+    metric = StringField(required=True)
+
+    total = IntField(default=0)
+    counts = DictField()
+
+    meta = {
+        "collection": "dashboard_rollups",
+        "index_background": True,
+        "indexes": [
+            ("metric", "day", "district"),
+        ]
+    }
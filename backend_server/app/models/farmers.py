@@ -5,6 +5,7 @@ from mongoengine import (
 )
 import datetime
 from app.utils.serializer import SerializerMixin
+from app.utils.phone import normalize_mobile
 
 
 
@@ -35,9 +36,12 @@ class Farmer(Document, SerializerMixin):
     age = IntField()
     gender = StringField(choices=["male", "female", "other"])
     address = StringField()
+    district = StringField()
 
     # Contact
     mobile = StringField(required=True, unique=True)
+    # E.164 form of `mobile`, set on save; what logins match on
+    mobile_e164 = StringField(unique=True, sparse=True)
     mobile_verified = BooleanField(default=False)
 
     # Identity
@@ -65,13 +69,28 @@ class Farmer(Document, SerializerMixin):
     created_at = DateTimeField(default=datetime.datetime.utcnow)
     updated_at = DateTimeField(default=datetime.datetime.utcnow)
 
-    meta = {"collection": "farmers"}
+    meta = {
+        "collection": "farmers",
+        "index_background": True,
+        "indexes": [
+            # authority exports filtered by district
+            "district",
+            # dashboard overview: pending verifications
+            "is_verified",
+        ]
+    }
 
-    # 🔥 ADD THIS EXACTLY HERE
     def to_json(self):
-        print("🔥 FARMER MIXIN to_json OVERRIDDEN IS RUNNING")
         return SerializerMixin.to_json(self)
 
     def save(self, *args, **kwargs):
         self.updated_at = datetime.datetime.utcnow()
-        return super(Farmer, self).save(*args, **kwargs)
+        self.mobile_e164 = normalize_mobile(self.mobile) or self.mobile_e164
+        district_changed = self.pk is not None and "district" in self._get_changed_fields()
+        result = super(Farmer, self).save(*args, **kwargs)
+
+        if district_changed:
+            from app.services.rollup_service import forget_farmer_district
+            forget_farmer_district(self.pk)
+
+        return result
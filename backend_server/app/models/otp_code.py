@@ -0,0 +1,22 @@
+from mongoengine import Document, StringField, IntField, DateTimeField
+import datetime
+
+
+class OTPCode(Document):
+    """
+    Pending one-time code per mobile (E.164). Only an HMAC of the code
+    is stored; Mongo's TTL monitor removes the document at expires_at.
+    """
+
+    id = StringField(primary_key=True)  # E.164 mobile
+    code_hash = StringField(required=True)
+    attempts = IntField(default=0)
+    expires_at = DateTimeField(required=True)
+    created_at = DateTimeField(default=datetime.datetime.utcnow)
+
+    meta = {
+        "collection": "otp_codes",
+        "indexes": [
+            {"fields": ["expires_at"], "expireAfterSeconds": 0},
+        ]
+    }
@@ -0,0 +1,99 @@
+from bson import DBRef, ObjectId
+from mongoengine import Document
+
+
+def reference_id(doc, field_name):
+    """
+    Return the ObjectId stored in a ReferenceField without
+    dereferencing it (no DB query).
+    """
+    value = doc._data.get(field_name)
+    if value is None:
+        return None
+    if isinstance(value, DBRef):
+        return value.id
+    if isinstance(value, Document):
+        return value.pk
+    if isinstance(value, ObjectId):
+        return value
+    return getattr(value, "id", value)
+
+
+def prefetched(doc, field_name):
+    """
+    The document select_related() loaded into a ReferenceField, or None
+    when it was not loaded (e.g. the target was deleted). Never queries.
+    """
+    value = doc._data.get(field_name)
+    return value if isinstance(value, Document) else None
+
+
+def _targets(doc, path):
+    """
+    Yield (owner, field_name, field) for a dotted path such as
+    "animal" or "medicines.medicine" (list of embedded docs).
+    """
+    head, _, rest = path.partition(".")
+    field = doc._fields.get(head)
+    if field is None:
+        raise ValueError(f"Unknown field '{head}' on {type(doc).__name__}")
+
+    if not rest:
+        yield doc, head, field
+        return
+
+    value = doc._data.get(head)
+    if value is None:
+        return
+    items = value if isinstance(value, (list, tuple)) else [value]
+    for item in items:
+        yield from _targets(item, rest)
+
+
+def select_related(documents, *paths, projections=None):
+    """
+    Bulk-dereference ReferenceFields for a list/queryset of documents.
+
+    Every referenced id is collected per collection, each collection is
+    fetched once with $in (optionally projected), and the loaded docs are
+    stitched back so attribute access no longer hits the DB.
+
+        treatments = select_related(
+            Treatment.objects(farmer=farmer_id),
+            "animal", "medicines.medicine",
+            projections={"animal": ["tag_number", "species"]},
+        )
+
+    Returns the documents as a list.
+    """
+    documents = list(documents)
+    projections = projections or {}
+
+    for path in paths:
+        pending = {}  # ObjectId -> [(owner, field_name)]
+        document_type = None
+
+        for doc in documents:
+            for owner, field_name, field in _targets(doc, path):
+                document_type = field.document_type
+                value = owner._data.get(field_name)
+                if value is None or isinstance(value, Document):
+                    continue
+                ref = reference_id(owner, field_name)
+                pending.setdefault(ref, []).append((owner, field_name))
+
+        if not pending:
+            continue
+
+        fields = projections.get(path)
+        projection = {f: 1 for f in fields} if fields else None
+        cursor = document_type._get_collection().find(
+            {"_id": {"$in": list(pending)}}, projection
+        )
+
+        for son in cursor:
+            loaded = document_type._from_son(son)
+            for owner, field_name in pending.get(son["_id"], ()):
+                owner._data[field_name] = loaded
+
+    return documents
@@ -0,0 +1,18 @@
+from mongoengine import Document, StringField, IntField, DateTimeField
+import datetime
+
+
+class StoredFile(Document):
+    """
+    Content hash index for uploads: one document per distinct file in
+    a storage folder. A re-upload of the same bytes to that folder is
+    answered with `path` instead of being stored again.
+    """
+
+    id = StringField(primary_key=True)  # "<folder>|<sha256 hex of the content>"
+    path = StringField(required=True)   # storage path of the first upload
+    size = IntField()
+    content_type = StringField()
+    created_at = DateTimeField(default=datetime.datetime.utcnow)
+
+    meta = {"collection": "stored_files"}
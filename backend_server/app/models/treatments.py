@@ -1,6 +1,6 @@
 from mongoengine import (
     Document, StringField, IntField, BooleanField,
-    DateTimeField, ListField, ReferenceField
+    DateTimeField, ListField, ReferenceField, ObjectIdField
 )
 import datetime
 from app.models.farmers import Farmer
@@ -9,6 +9,10 @@ from app.models.animals import Animal
 from app.utils.serializer import SerializerMixin
 from mongoengine import Document, ReferenceField, EmbeddedDocumentListField
 from app.models.prescribed_medicine import PrescribedMedicine
+from app.models.prefetch import reference_id
+from app.utils.log import get_logger
+
+log = get_logger("rollups")
 
 
 class MedicineDetail(Document, SerializerMixin):
@@ -50,11 +54,28 @@ class Treatment(Document, SerializerMixin):
         choices=["pending", "diagnosed", "completed"],
         default="pending"
     )
+    # Set by bulk diagnose: tells a request which treatments it updated
+    diagnosis_batch = ObjectIdField()
 
     created_at = DateTimeField(default=datetime.datetime.utcnow)
     updated_at = DateTimeField(default=datetime.datetime.utcnow)
 
-    meta = {"collection": "treatments"}
+    meta = {
+        "collection": "treatments",
+        "index_background": True,
+        "indexes": [
+            # get_treatments_by_farmer (keyset order)
+            ("farmer", "-created_at", "-id"),
+            ("farmer", "status", "vet", "-created_at"),
+            # get_treatments_by_animal (keyset order)
+            ("animal", "-created_at", "-id"),
+            ("vet", "-created_at"),
+            ("status", "-created_at"),
+            # authority exports (date range, optionally violations only)
+            ("created_at",),
+            ("is_flagged_violation", "created_at"),
+        ]
+    }
 
     def save(self, *args, **kwargs):
         # auto withdrawal date
@@ -66,4 +87,17 @@ class Treatment(Document, SerializerMixin):
             )
 
         self.updated_at = datetime.datetime.utcnow()
-        return super().save(*args, **kwargs)
+        is_new = self.pk is None
+        result = super().save(*args, **kwargs)
+
+        if is_new:
+            # The treatment is stored either way: a rollup failure is
+            # logged (rebuild-rollups repairs it), never a 500 that the
+            # client would retry into a duplicate
+            from app.services.rollup_service import RollupService, TREATMENTS_CREATED
+            try:
+                RollupService.record(TREATMENTS_CREATED, farmer_id=reference_id(self, "farmer"))
+            except Exception:
+                log.exception("rollup update failed for treatment %s", self.pk)
+
+        return result
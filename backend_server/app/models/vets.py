@@ -5,6 +5,7 @@ from mongoengine import (
 )
 import datetime
 from app.utils.serializer import SerializerMixin
+from app.utils.phone import normalize_mobile
 
 
 class GPSLocation(EmbeddedDocument):
@@ -21,6 +22,8 @@ class Vet(Document, SerializerMixin):
 
     # Contact
     mobile = StringField(required=True, unique=True)
+    # E.164 form of `mobile`, set on save; what logins match on
+    mobile_e164 = StringField(unique=True, sparse=True)
     mobile_verified = BooleanField(default=False)
 
     # Professional details
@@ -49,13 +52,20 @@ class Vet(Document, SerializerMixin):
     created_at = DateTimeField(default=datetime.datetime.utcnow)
     updated_at = DateTimeField(default=datetime.datetime.utcnow)
 
-    meta = {"collection": "vets"}
+    meta = {
+        "collection": "vets",
+        "index_background": True,
+        "indexes": [
+            # dashboard overview: pending verifications
+            "is_verified",
+        ]
+    }
 
     def to_json(self):
-        print("🔥 CUSTOM Vet.to_json() IS RUNNING")
         return SerializerMixin.to_json(self)
 
 
     def save(self, *args, **kwargs):
         self.updated_at = datetime.datetime.utcnow()
+        self.mobile_e164 = normalize_mobile(self.mobile) or self.mobile_e164
         return super(Vet, self).save(*args, **kwargs)
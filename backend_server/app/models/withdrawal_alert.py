@@ -11,5 +11,12 @@ class WithdrawalAlert(Document):
     created_at = DateTimeField(default=datetime.utcnow)
 
     meta = {
-        'collection': 'withdrawal_alerts'
+        'collection': 'withdrawal_alerts',
+        'index_background': True,
+        'indexes': [
+            ('animal_id', 'safe_from'),
+            'treatment_id',
+            # authority exports by date range
+            'created_at',
+        ]
     }
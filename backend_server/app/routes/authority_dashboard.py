@@ -0,0 +1,270 @@
+import calendar
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Blueprint, Response, request, stream_with_context
+from flask_jwt_extended import jwt_required
+
+from app.db import DB
+from app.utils.responses import success_response, error_response
+from app.utils.security import current_principal
+from app.utils.query_budget import query_budget
+from app.services.medicine_catalog import MedicineCatalog
+from app.services.overview_service import OverviewService
+from app.services.export_service import ExportService, ExportBusy
+from app.services.rollup_service import (
+    RollupService, day_key,
+    TREATMENTS_CREATED, TREATMENTS_DIAGNOSED, MEDICINE_USAGE,
+    VET_VISITS, ANIMALS_REGISTERED,
+)
+
+authority_dashboard_bp = Blueprint("authority_dashboard", __name__)
+
+
+def authority_required(fn):
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not current_principal().is_authority:
+            return error_response("Only authorities can access this", 403)
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def district_arg():
+    return request.args.get("district") or None
+
+
+def days_arg(default):
+    try:
+        return max(1, int(request.args.get("days", default)))
+    except (TypeError, ValueError):
+        return default
+
+
+OVERVIEW_FIELDS = (
+    "total_farmers", "total_veterinarians", "total_animals",
+    "total_treatments", "pending_verifications",
+)
+
+
+# ------------------------------------------------------------
+# 0) OVERVIEW — rollups + indexed counts, TTL-cached
+# ------------------------------------------------------------
+@authority_dashboard_bp.route('/overview', methods=['GET'])
+@query_budget(6)
+@authority_required
+def overview():
+    return success_response(OverviewService.get(), 200)
+
+
+@authority_dashboard_bp.route('/simplified', methods=['GET'])
+@query_budget(6)
+@authority_required
+def simplified():
+    data = OverviewService.get()
+    return success_response({
+        "overview": {k: data[k] for k in OVERVIEW_FIELDS},
+        "today_treatments": data["today_treatments"],
+        "violations_count": data["violations_count"],
+        "farm_safety": data["farm_safety"],
+        "charts": data["charts"],
+    }, 200)
+
+
+# ------------------------------------------------------------
+# 1) TODAY'S TREATMENTS
+# ------------------------------------------------------------
+@authority_dashboard_bp.route('/stats/daily-treatments', methods=['GET'])
+@query_budget(3)
+@authority_required
+def daily_treatments():
+    today = day_key()
+    totals = RollupService.totals_by_day(TREATMENTS_CREATED, today, district_arg())
+    return success_response({"today_treatments": totals.get(today, 0)}, 200)
+
+
+# ------------------------------------------------------------
+# 2) TREATMENT TRENDS (last 6 months, line chart)
+# ------------------------------------------------------------
+@authority_dashboard_bp.route('/stats/treatment-trends', methods=['GET'])
+@query_budget(3)
+@authority_required
+def treatment_trends():
+    months = RollupService.months_back(6)
+    totals = RollupService.totals_by_day(TREATMENTS_CREATED, day_key(months[0]), district_arg())
+
+    per_month = {}
+    for day, n in totals.items():
+        per_month[day[:7]] = per_month.get(day[:7], 0) + n
+
+    data = [
+        {"month": calendar.month_abbr[m.month], "treatments": per_month.get(m.strftime("%Y-%m"), 0)}
+        for m in months
+    ]
+    return success_response(data, 200)
+
+
+# ------------------------------------------------------------
+# 3) MEDICINE USAGE (top 10)
+# ------------------------------------------------------------
+@authority_dashboard_bp.route('/stats/medicine-usage', methods=['GET'])
+@query_budget(3)
+@authority_required
+def medicine_usage():
+    since = day_key(datetime.utcnow() - timedelta(days=days_arg(365)))
+    counts = RollupService.counts(MEDICINE_USAGE, since, district_arg())
+
+    data = [
+        {"medicine": MedicineCatalog.name_for(medicine_id) or "Unknown", "count": n}
+        for medicine_id, n in counts.items()
+    ]
+    data.sort(key=lambda row: row["count"], reverse=True)
+    return success_response(data[:10], 200)
+
+
+# ------------------------------------------------------------
+# 4) ANIMALS BY SPECIES (bar chart)
+# ------------------------------------------------------------
+@authority_dashboard_bp.route('/stats/animals-by-species', methods=['GET'])
+@query_budget(3)
+@authority_required
+def animals_by_species():
+    counts = RollupService.counts(ANIMALS_REGISTERED, district=district_arg())
+    data = [{"species": species, "count": n} for species, n in counts.items()]
+    data.sort(key=lambda row: row["count"], reverse=True)
+    return success_response(data, 200)
+
+
+# ------------------------------------------------------------
+# 5) FARM SAFETY STATUS (pie chart)
+# Current state, not a counter: read from the indexed
+# Animal.withdrawal_safe_from instead of a rollup. ?district=
+# narrows both counts to the district's farmers.
+# ------------------------------------------------------------
+@authority_dashboard_bp.route('/stats/farm-safety-status', methods=['GET'])
+@query_budget(3)
+@authority_required
+def farm_safety_status():
+    under_withdrawal = {"withdrawal_safe_from": {"$gt": datetime.utcnow()}}
+    district = district_arg()
+    if district:
+        farmer_ids = DB.farmers.distinct("_id", {"district": district})
+        total_farmers = len(farmer_ids)
+        under_withdrawal["farmer"] = {"$in": farmer_ids}
+    else:
+        total_farmers = DB.farmers.estimated_document_count()
+    unsafe_farmers = len(DB.animals.distinct("farmer", under_withdrawal)) if total_farmers else 0
+    safe_farmers = max(0, total_farmers - unsafe_farmers)
+
+    def pct(n):
+        return round(n * 100 / total_farmers) if total_farmers else 0
+
+    data = [
+        {"name": "Safe", "value": pct(safe_farmers)},
+        {"name": "Under Withdrawal", "value": pct(unsafe_farmers)},
+    ]
+    return success_response(data, 200)
+
+
+# ------------------------------------------------------------
+# 6) COMPLIANCE (last 6 months, area chart)
+# ------------------------------------------------------------
+@authority_dashboard_bp.route('/stats/compliance-data', methods=['GET'])
+@query_budget(3)
+@authority_required
+def compliance_data():
+    months = RollupService.months_back(6)
+    rows = RollupService.fetch(TREATMENTS_DIAGNOSED, day_key(months[0]), district=district_arg())
+
+    per_month = {}
+    for row in rows:
+        bucket = per_month.setdefault(row["day"][:7], {"compliant": 0, "violation": 0})
+        for outcome, n in (row.get("counts") or {}).items():
+            bucket[outcome] = bucket.get(outcome, 0) + n
+
+    data = []
+    for m in months:
+        bucket = per_month.get(m.strftime("%Y-%m"), {})
+        data.append({
+            "month": calendar.month_abbr[m.month],
+            "compliant": bucket.get("compliant", 0),
+            "nonCompliant": bucket.get("violation", 0),
+        })
+    return success_response(data, 200)
+
+
+# ------------------------------------------------------------
+# 7) VET ACTIVITY (last 7 days)
+# ------------------------------------------------------------
+@authority_dashboard_bp.route('/stats/vet-activity', methods=['GET'])
+@query_budget(3)
+@authority_required
+def vet_activity():
+    days = RollupService.days_back(7)
+    totals = RollupService.totals_by_day(VET_VISITS, day_key(days[0]), district_arg())
+
+    data = [
+        {"day": calendar.day_abbr[d.weekday()], "visits": totals.get(day_key(d), 0)}
+        for d in days
+    ]
+    return success_response(data, 200)
+
+
+# ------------------------------------------------------------
+# 8) EXPORTS — streamed NDJSON / CSV, optionally gzipped
+# GET /exports/<dataset>?format=ndjson|csv&from=YYYY-MM-DD&to=YYYY-MM-DD&district=
+# ------------------------------------------------------------
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def date_arg(name):
+    value = request.args.get(name)
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+
+@authority_dashboard_bp.route('/exports/<dataset>', methods=['GET'])
+@query_budget(3)
+@authority_required
+def export_dataset(dataset):
+    if dataset not in ExportService.datasets():
+        return error_response(f"Unknown dataset, expected one of {ExportService.datasets()}", 404)
+
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in EXPORT_MIMETYPES:
+        return error_response("format must be ndjson or csv", 400)
+
+    try:
+        date_from = date_arg("from")
+        date_to = date_arg("to")
+    except ValueError:
+        return error_response("from/to must be YYYY-MM-DD", 400)
+    if date_to:
+        date_to += timedelta(days=1)  # inclusive end day
+
+    compress = (
+        request.args.get("gzip", "1") != "0"
+        and "gzip" in request.headers.get("Accept-Encoding", "")
+    )
+
+    try:
+        ExportService.acquire()
+    except ExportBusy as e:
+        return error_response(str(e), 429)
+
+    try:
+        pipelines = ExportService.build_pipelines(dataset, date_from, date_to, district_arg())
+        chunks = ExportService.stream(dataset, pipelines, fmt, compress=compress)
+    except Exception:
+        ExportService.release()
+        raise
+
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt])
+    response.call_on_close(ExportService.release)
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="{dataset}-{day_key()}.{fmt}"'
+    )
+    response.headers["Vary"] = "Accept-Encoding"
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
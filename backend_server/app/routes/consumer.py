@@ -0,0 +1,69 @@
+from flask import Blueprint, request, make_response
+from bson import ObjectId
+
+from app.db import DB
+from app.utils.responses import success_response, error_response
+from app.services.withdrawal_service import WithdrawalService
+from app.services.safety_cache import SafetyCache
+from app.utils.query_budget import query_budget
+
+consumer_bp = Blueprint("consumer", __name__)
+
+
+def build_safety_payload(farmer_id):
+    safety = WithdrawalService.get_farm_safety(farmer_id)
+    safe_after = safety["safe_after"]
+
+    if safety["is_safe"]:
+        payload = {
+            "status": "SAFE",
+            "message": "No animals on this farm are under a withdrawal period",
+            "safe_after": None,
+        }
+    else:
+        payload = {
+            "status": "UNSAFE",
+            "message": "Products from this farm are under a withdrawal period",
+            "safe_after": safe_after.isoformat(),
+        }
+
+    payload["farmer_id"] = farmer_id
+    payload["animals_under_withdrawal"] = len(safety["animals_under_withdrawal"])
+
+    earliest = min(
+        (a["safe_from"] for a in safety["animals_under_withdrawal"]),
+        default=None
+    )
+    return payload, earliest
+
+
+# ------------------------------------------------------------
+# CONSUMER SAFETY CHECK (QR scan) — cached, ETag-aware
+# ------------------------------------------------------------
+@consumer_bp.route('/safety/<farmer_id>', methods=['GET'])
+@query_budget(3)
+def farmer_safety(farmer_id):
+    if not ObjectId.is_valid(farmer_id):
+        return error_response("Farmer not found", 404)
+
+    # Canonical form, as used by SafetyCache.invalidate (hex case varies)
+    farmer_id = str(ObjectId(farmer_id))
+
+    entry = SafetyCache.get(farmer_id)
+    if entry is None:
+        if not DB.farmers.find_one({"_id": ObjectId(farmer_id)}, {"_id": 1}):
+            return error_response("Farmer not found", 404)
+
+        payload, earliest = build_safety_payload(farmer_id)
+        entry = SafetyCache.put(farmer_id, payload, earliest)
+
+    payload, etag, _ = entry
+
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response, _status = success_response(payload, 200)
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
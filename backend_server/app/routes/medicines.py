@@ -0,0 +1,44 @@
+from flask import Blueprint
+from flask_jwt_extended import jwt_required
+
+from app.utils.responses import success_response, error_response
+from app.services.medicine_catalog import MedicineCatalog
+from app.utils.query_budget import query_budget
+
+medicines_bp = Blueprint("medicines", __name__)
+
+
+def medicine_to_dict(medicine):
+    return {
+        "medicine_id": str(medicine.id),
+        "name": medicine.name,
+        "dosage": medicine.dosage,
+        "route": medicine.route,
+        "frequency": medicine.frequency,
+        "duration_days": medicine.duration_days,
+        "withdrawal_period_days": medicine.withdrawal_period_days,
+    }
+
+
+# ------------------------------------------------------------
+# 1) LIST AUTHORIZED MEDICINES (picker) — served from the catalog
+# ------------------------------------------------------------
+@medicines_bp.route('/', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def list_medicines():
+    return success_response([medicine_to_dict(m) for m in MedicineCatalog.all()], 200)
+
+
+# ------------------------------------------------------------
+# 2) GET ONE AUTHORIZED MEDICINE
+# ------------------------------------------------------------
+@medicines_bp.route('/<medicine_id>', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def get_medicine(medicine_id):
+    medicine = MedicineCatalog.get(medicine_id)
+    if not medicine:
+        return error_response("Medicine not found", 404)
+
+    return success_response(medicine_to_dict(medicine), 200)
@@ -0,0 +1,33 @@
+from flask import Blueprint, Response, jsonify
+
+from app.db import DB
+from app.services.storage_service import StorageService
+from app.utils import metrics
+from app.utils.security import metrics_token_required
+
+ops_bp = Blueprint("ops", __name__)
+
+
+# ------------------------------------------------------------
+# Mongo connection pool stats (METRICS_TOKEN bearer only)
+# ------------------------------------------------------------
+@ops_bp.route('/health/db-pool', methods=['GET'])
+@metrics_token_required
+def db_pool_stats():
+    return jsonify(DB.pool_stats()), 200
+
+
+# ------------------------------------------------------------
+# Prometheus metrics (METRICS_TOKEN bearer only)
+# ------------------------------------------------------------
+@ops_bp.route('/metrics', methods=['GET'])
+@metrics_token_required
+def prometheus_metrics():
+    pool = DB.pool_stats()
+    gauges = {
+        "mongo_pool_connections_in_use": ("Checked-out pool connections", pool.get("in_use", 0)),
+        "mongo_pool_checkout_wait_max_ms": ("Longest pool checkout wait", pool.get("wait_max_ms", 0)),
+        "mongo_pool_checkout_failures": ("Pool checkouts that timed out/failed", pool.get("checkout_failures", 0)),
+        "storage_circuit_open": ("Storage circuit breaker open (1) or closed (0)", StorageService.breaker_open()),
+    }
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
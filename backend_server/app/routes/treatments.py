@@ -1,52 +1,80 @@
 from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from flask_jwt_extended import jwt_required
+from bson import ObjectId, json_util
 from mongoengine.queryset.visitor import Q
 
-from app.utils.responses import success_response, error_response
-from app.models.treatments import Treatment, MedicineDetail
+from app.utils.responses import success_response, error_response, stream_success_response, RawJSON
+from app.utils.security import current_principal
+from app.utils.pagination import page_args, keyset_page, InvalidCursor
+from app.utils.log import get_logger
+from app.utils.query_budget import query_budget
+from app.models.treatments import Treatment
 from app.models.farmers import Farmer
-from app.models.vets import Vet
 from app.models.animals import Animal
+from app.models.prefetch import reference_id, prefetched, select_related
 from app.services.withdrawal_service import WithdrawalService
-from app.models.authorized_medicine import AuthorizedMedicine
-from app.models.prescribed_medicine import PrescribedMedicine
-from app.models.authorized_medicine import AuthorizedMedicine
-from app.models.prescribed_medicine import PrescribedMedicine
-from app.services.withdrawal_service import WithdrawalService
-from datetime import datetime
+from app.services.medicine_catalog import MedicineCatalog
+from app.services.rollup_service import RollupService
+from app.services.treatment_service import TreatmentService, PrescriptionError
 
 treatments_bp = Blueprint("treatments", __name__)
+log = get_logger("treatments")
+
+# Fields returned by the treatment list endpoints (projection via .only())
+ANIMAL_LIST_FIELDS = (
+    "id", "animal", "vet", "status", "symptoms", "notes", "medicines",
+    "is_withdrawal_completed", "is_flagged_violation",
+    "withdrawal_ends_on", "created_at",
+)
+FARMER_LIST_FIELDS = ("id", "animal", "vet", "status", "symptoms", "notes", "created_at")
+# Animal fields shown next to each treatment in the farmer list
+ANIMAL_SUMMARY_FIELDS = ("tag_number", "species")
+
+
+def medicines_response(treatment):
+    # Medicine names come from the in-process catalog (no DB hit)
+    medicines = []
+    for pm in treatment.medicines:
+        medicine_id = reference_id(pm, "medicine")
+        medicines.append({
+            "medicine_id": str(medicine_id),
+            "medicine_name": MedicineCatalog.name_for(medicine_id),
+            "dosage": pm.dosage,
+            "frequency": pm.frequency,
+            "duration_days": pm.duration_days,
+            "withdrawal_period_days": pm.withdrawal_period_days
+        })
+    return medicines
 
 # ------------------------------------------------------------
 # 1) FARMER CREATES TREATMENT REQUEST
 # ------------------------------------------------------------
 @treatments_bp.route('/request', methods=['POST'])
+@query_budget(6)
 @jwt_required()
 def create_treatment_request():
-    print("\n[TREATMENT] create_treatment_request CALLED")
+    log.debug("create_treatment_request called")
 
     data = request.get_json() or {}
-    farmer_id = get_jwt_identity()
-    print(f"[TREATMENT] farmer_id = {farmer_id}")
+    principal = current_principal()
+    log.debug("farmer_id=%s", principal.id)
 
-    farmer = Farmer.objects(id=farmer_id).first()
-    if not farmer:
-        print("[TREATMENT] ERROR: Not a farmer")
+    if not principal.is_farmer:
+        log.info("create_treatment_request rejected: not a farmer")
         return error_response("Only farmers can create treatment requests", 403)
 
     required_fields = ["animal_id", "symptoms"]
     if not all(data.get(f) for f in required_fields):
-        print("[TREATMENT] ERROR: Missing fields")
+        log.info("create_treatment_request rejected: missing fields")
         return error_response("Missing fields", 400)
 
-    animal = Animal.objects(id=data["animal_id"], farmer=farmer).first()
+    animal = Animal.objects(id=data["animal_id"], farmer=principal.id).only("id").first()
     if not animal:
-        print("[TREATMENT] ERROR: Animal not found or not owned by farmer")
+        log.info("create_treatment_request rejected: animal not found or not owned")
         return error_response("Animal not found", 403)
 
     treatment = Treatment(
-        farmer=farmer,
+        farmer=ObjectId(principal.id),
         animal=animal,
         #diagnosis=data["diagnosis"],
         symptoms=data.get("symptoms", []),
@@ -55,59 +83,49 @@ def create_treatment_request():
         status="pending"
     ).save()
 
-    animal.treatment_ids.append(str(treatment.id))
-    animal.save()
-
-    print(f"[TREATMENT] Treatment request created: {treatment.id}")
-    return success_response(treatment.to_json(), 201)
+    log.info("treatment request created id=%s", treatment.id)
+    # Document.to_json() is already JSON; embed it without re-parsing
+    return success_response(RawJSON(treatment.to_json()), 201)
 
 # ------------------------------------------------------------
 # 2) GET A SINGLE TREATMENT
 # ------------------------------------------------------------
 
 @treatments_bp.route('/<treatment_id>', methods=['GET'])
+@query_budget(3)
 @jwt_required()
 def get_treatment(treatment_id):
-    print(f"\n[TREATMENT] get_treatment CALLED: {treatment_id}")
+    log.debug("get_treatment called id=%s", treatment_id)
 
-    user_id = get_jwt_identity()
+    principal = current_principal()
     treatment = Treatment.objects(id=treatment_id).first()
 
     if not treatment:
         return error_response("Treatment not found", 404)
 
-    farmer = Farmer.objects(id=user_id).first()
-    vet = Vet.objects(id=user_id).first()
+    farmer_ref = reference_id(treatment, "farmer")
+    vet_ref = reference_id(treatment, "vet")
 
-    if farmer and str(treatment.farmer.id) != str(farmer.id):
+    if principal.is_farmer and str(farmer_ref) != principal.id:
         return error_response("Not allowed", 403)
 
-    if vet:
-        if treatment.vet and str(treatment.vet.id) != str(vet.id):
+    if principal.is_vet:
+        if vet_ref and str(vet_ref) != principal.id:
             return error_response("Not allowed", 403)
-        if not treatment.vet and treatment.status != "pending":
+        if not vet_ref and treatment.status != "pending":
             return error_response("Not allowed", 403)
 
     # ✅ BUILD MEDICINES WITH NAMES
-    medicines_response = []
-    for pm in treatment.medicines:
-        medicines_response.append({
-            "medicine_id": str(pm.medicine.id),
-            "medicine_name": pm.medicine.name,   # ✅ FIX
-            "dosage": pm.dosage,
-            "frequency": pm.frequency,
-            "duration_days": pm.duration_days,
-            "withdrawal_period_days": pm.withdrawal_period_days
-        })
+    medicines = medicines_response(treatment)
 
     response = {
         "treatment_id": str(treatment.id),
         "status": treatment.status,
         "symptoms": treatment.symptoms,
         "notes": treatment.notes,
-        "animal_id": str(treatment.animal.id),
-        "vet_id": str(treatment.vet.id) if treatment.vet else None,
-        "medicines": medicines_response,
+        "animal_id": str(reference_id(treatment, "animal")),
+        "vet_id": str(vet_ref) if vet_ref else None,
+        "medicines": medicines,
         "is_withdrawal_completed": treatment.is_withdrawal_completed,
         "is_flagged_violation": treatment.is_flagged_violation,
         "created_at": treatment.created_at,
@@ -125,18 +143,18 @@ def get_treatment(treatment_id):
 
 
 @treatments_bp.route('/<treatment_id>/diagnose', methods=['PUT'])
+@query_budget(10)
 @jwt_required()
 def diagnose_treatment(treatment_id):
-    print(f"\n[TREATMENT] diagnose_treatment CALLED: {treatment_id}")
+    log.debug("diagnose_treatment called id=%s", treatment_id)
 
     data = request.get_json() or {}
-    vet_id = get_jwt_identity()
+    principal = current_principal()
 
     # -----------------------------
     # AUTH CHECK
     # -----------------------------
-    vet = Vet.objects(id=vet_id).first()
-    if not vet:
+    if not principal.is_vet:
         return error_response("Only vets can diagnose", 403)
 
     treatment = Treatment.objects(id=treatment_id).first()
@@ -146,109 +164,61 @@ def diagnose_treatment(treatment_id):
     if treatment.status != "pending":
         return error_response("Already diagnosed", 400)
 
-    medicines_input = data.get("medicines")
-    if not medicines_input or not isinstance(medicines_input, list):
-        return error_response("Medicines list required", 400)
-
-    prescribed = []
-    max_withdrawal_days = 0  # 🔴 STRICTEST RULE (IMPORTANT)
-
-    # -----------------------------
-    # PROCESS MEDICINES
-    # -----------------------------
-    for m in medicines_input:
-        medicine_id = m.get("medicine_id")
-        if not medicine_id:
-            return error_response("medicine_id is required", 400)
-
-        authorized = AuthorizedMedicine.objects(id=medicine_id).first()
-        if not authorized:
-            return error_response("Unauthorized medicine selected", 400)
-
-        vet_days = m.get("vet_withdrawal_days")
-
-        # -----------------------------
-        # SAFETY WITHDRAWAL FORMULA
-        # -----------------------------
-        final_withdrawal_days = authorized.withdrawal_period_days
-
-        if vet_days is not None:
-            if vet_days < authorized.withdrawal_period_days:
-                print(
-                    f"[SAFETY] Vet tried to reduce withdrawal "
-                    f"({vet_days} < {authorized.withdrawal_period_days}) → BLOCKED"
-                )
-                final_withdrawal_days = authorized.withdrawal_period_days
-            else:
-                final_withdrawal_days = vet_days
-
-        print(
-            f"[MEDICINE] {authorized.name}: "
-            f"authorized={authorized.withdrawal_period_days}, "
-            f"vet={vet_days}, "
-            f"final={final_withdrawal_days}"
-        )
-
-        prescribed.append(
-            PrescribedMedicine(
-                medicine=authorized,               
-                dosage=authorized.dosage,
-                frequency=authorized.frequency,
-                duration_days=authorized.duration_days,
-                withdrawal_period_days=final_withdrawal_days
-            )
-        )
-
-        max_withdrawal_days = max(max_withdrawal_days, final_withdrawal_days)
+    try:
+        prescribed, max_withdrawal_days = TreatmentService.prescribe(data.get("medicines"))
+    except PrescriptionError as e:
+        return error_response(str(e), 400)
 
     # -----------------------------
     # SAVE TREATMENT
     # -----------------------------
-    treatment.vet = vet
-    treatment.medicines = prescribed
-    treatment.notes = data.get("notes")
-    treatment.status = "diagnosed"
-    treatment.treatment_start_date = datetime.utcnow()
-    treatment.save()
+    # Conditional update (pending → diagnosed): a concurrent diagnosis
+    # by another vet makes this a no-op instead of overwriting it
+    treatment = TreatmentService.mark_diagnosed(
+        treatment.id, principal.id, prescribed, max_withdrawal_days, data.get("notes")
+    )
+    if treatment is None:
+        return error_response("Already diagnosed", 400)
 
     # -----------------------------
     # CREATE WITHDRAWAL ALERT
     # -----------------------------
     WithdrawalService.create_withdrawal_alert(
         treatment_id=str(treatment.id),
-        animal_id=str(treatment.animal.id),
+        animal_id=str(reference_id(treatment, "animal")),
         withdrawal_days=max_withdrawal_days
     )
 
-    print(
-        f"[WITHDRAWAL] Final withdrawal applied = {max_withdrawal_days} days "
-        f"(strictest medicine rule)"
+    log.info(
+        "treatment %s diagnosed, withdrawal=%s days (strictest medicine rule)",
+        treatment.id, max_withdrawal_days
+    )
+
+    # -----------------------------
+    # DASHBOARD ROLLUPS
+    # -----------------------------
+    RollupService.record_diagnosis(
+        treatment,
+        farmer_id=reference_id(treatment, "farmer"),
+        vet_id=principal.id,
+        medicine_ids=[reference_id(pm, "medicine") for pm in treatment.medicines]
     )
 
     # -----------------------------
     # RESPONSE WITH MEDICINE NAMES
     # -----------------------------
-    medicines_response = []
-    for pm in treatment.medicines:
-        medicines_response.append({
-            "medicine_id": str(pm.medicine.id),
-            "medicine_name": pm.medicine.name,
-            "dosage": pm.dosage,
-            "frequency": pm.frequency,
-            "duration_days": pm.duration_days,
-            "withdrawal_period_days": pm.withdrawal_period_days
-        })
-    print(medicines_response)
+    medicines = medicines_response(treatment)
+    log.debug("medicines=%s", medicines)
 
     response = {
         "treatment_id": str(treatment.id),
         "status": treatment.status,
         "diagnosis": treatment.diagnosis,
-        "animal_id": str(treatment.animal.id),
-        "vet_id": str(vet.id),
+        "animal_id": str(reference_id(treatment, "animal")),
+        "vet_id": principal.id,
         "treatment_start_date": treatment.treatment_start_date,
         "notes": treatment.notes,
-        "medicines": medicines_response,
+        "medicines": medicines,
         "final_withdrawal_days": max_withdrawal_days
     }
 
@@ -258,68 +228,154 @@ def diagnose_treatment(treatment_id):
 # 4) GET ALL TREATMENTS FOR AN ANIMAL
 # ------------------------------------------------------------
 @treatments_bp.route('/animal/<animal_id>', methods=['GET'])
+@query_budget(4)
 @jwt_required()
 def get_treatments_by_animal(animal_id):
-    print(f"\n[TREATMENT] get_treatments_by_animal CALLED: {animal_id}")
+    log.debug("get_treatments_by_animal called animal_id=%s", animal_id)
 
-    user_id = get_jwt_identity()
-    farmer = Farmer.objects(id=user_id).first()
-    vet = Vet.objects(id=user_id).first()
+    principal = current_principal()
 
     animal = Animal.objects(id=animal_id).first()
     if not animal:
         return error_response("Animal not found", 404)
 
-    if farmer and str(animal.farmer.id) != str(farmer.id):
+    if principal.is_farmer and str(reference_id(animal, "farmer")) != principal.id:
         return error_response("Not allowed", 403)
 
     query = Q(animal=animal)
-    if vet:
-        query &= (Q(vet=vet) | Q(status="pending"))
-
-    treatments = Treatment.objects(query)
-    print(f"[TREATMENT] treatments found = {treatments.count()}")
+    if principal.is_vet:
+        query &= (Q(vet=principal.id) | Q(status="pending"))
 
-    return success_response([t.to_json() for t in treatments], 200)
+    limit, cursor = page_args(request.args)
+    try:
+        treatments, next_cursor = keyset_page(
+            Treatment.objects(query), limit, cursor, fields=ANIMAL_LIST_FIELDS
+        )
+    except InvalidCursor as e:
+        return error_response(str(e), 400)
+
+    log.debug("treatments on page=%s", len(treatments))
+
+    # Same extended-JSON string per item as Document.to_json(),
+    # restricted to the projected fields; encoded item by item as the
+    # body streams out
+    return stream_success_response(
+        treatments,
+        serialize=lambda t: json_util.dumps(t.to_mongo(fields=ANIMAL_LIST_FIELDS)),
+        meta={"next_cursor": next_cursor, "limit": limit}
+    )
 
 
 # ------------------------------------------------------------
 # 5) GET ALL TREATMENTS FOR A FARMER (VET ONLY)
 # ------------------------------------------------------------
 @treatments_bp.route('/farmer/<farmer_id>', methods=['GET'])
+@query_budget(5)
 @jwt_required()
 def get_treatments_by_farmer(farmer_id):
-    print(f"\n[TREATMENT] get_treatments_by_farmer CALLED: {farmer_id}")
+    log.debug("get_treatments_by_farmer called farmer_id=%s", farmer_id)
 
-    user_id = get_jwt_identity()
+    principal = current_principal()
 
     # ✅ Only vets allowed
-    vet = Vet.objects(id=user_id).first()
-    if not vet:
+    if not principal.is_vet:
         return error_response("Only veterinarians can access this", 403)
 
-    farmer = Farmer.objects(id=farmer_id).first()
+    farmer = Farmer.objects(id=farmer_id).only("id").first()
     if not farmer:
         return error_response("Farmer not found", 404)
 
-    query = Q(farmer=farmer) & (Q(status="pending") | Q(vet=vet))
-    treatments = Treatment.objects(query).order_by("-created_at")
+    query = Q(farmer=farmer) & (Q(status="pending") | Q(vet=principal.id))
+
+    limit, cursor = page_args(request.args)
+    try:
+        treatments, next_cursor = keyset_page(
+            Treatment.objects(query), limit, cursor, fields=FARMER_LIST_FIELDS
+        )
+    except InvalidCursor as e:
+        return error_response(str(e), 400)
+
+    log.debug("treatments on page=%s", len(treatments))
 
-    print(f"[TREATMENT] treatments found = {treatments.count()}")
+    # One $in query for every animal on the page, not one per row
+    treatments = select_related(
+        treatments, "animal", projections={"animal": ANIMAL_SUMMARY_FIELDS}
+    )
 
-    data = []
-    for t in treatments:
-        data.append({
+    def serialize(t):
+        animal_ref = reference_id(t, "animal")
+        animal = prefetched(t, "animal")
+        return {
             "treatment_id": str(t.id),
             "status": t.status,
 
-            # ✅ SAFE ONLY
-            "animal_id": str(t.animal.id) if t.animal else None,
+            # ✅ SAFE ONLY — ids read from the reference, no dereference
+            "animal_id": str(animal_ref) if animal_ref else None,
+            "animal_tag_number": animal.tag_number if animal else None,
+            "animal_species": animal.species if animal else None,
 
             "symptoms": t.symptoms,
             "notes": t.notes,
             "created_at": t.created_at,
-            "diagnosed_by_vet": bool(t.vet),
-        })
+            "diagnosed_by_vet": reference_id(t, "vet") is not None,
+        }
+
+    return stream_success_response(
+        treatments, serialize,
+        meta={"next_cursor": next_cursor, "limit": limit}
+    )
+
+
+# ------------------------------------------------------------
+# 6) TREATMENT CAMP (VET ONLY) — create + diagnose many animals
+# Body: {animal_ids: [...], medicines: [...], symptoms?, notes?}
+# ------------------------------------------------------------
+@treatments_bp.route('/camp', methods=['POST'])
+@query_budget(7)
+@jwt_required()
+def treatment_camp():
+    data = request.get_json() or {}
+    principal = current_principal()
+
+    if not principal.is_vet:
+        return error_response("Only vets can run treatment camps", 403)
+
+    try:
+        report = TreatmentService.run_camp(
+            principal.id,
+            data.get("animal_ids"),
+            data.get("medicines"),
+            symptoms=data.get("symptoms"),
+            notes=data.get("notes"),
+        )
+    except PrescriptionError as e:
+        return error_response(str(e), 400)
+
+    return success_response(report, 201 if report["created"] else 200)
+
+
+# ------------------------------------------------------------
+# 7) BULK DIAGNOSE (VET ONLY) — one prescription, many treatments
+# Body: {treatment_ids: [...], medicines: [...], notes?}
+# ------------------------------------------------------------
+@treatments_bp.route('/bulk/diagnose', methods=['PUT'])
+@query_budget(8)
+@jwt_required()
+def bulk_diagnose():
+    data = request.get_json() or {}
+    principal = current_principal()
+
+    if not principal.is_vet:
+        return error_response("Only vets can diagnose", 403)
+
+    try:
+        report = TreatmentService.diagnose_many(
+            principal.id,
+            data.get("treatment_ids"),
+            data.get("medicines"),
+            notes=data.get("notes"),
+        )
+    except PrescriptionError as e:
+        return error_response(str(e), 400)
 
-    return success_response(data, 200)
+    return success_response(report, 200)
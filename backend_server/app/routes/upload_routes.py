@@ -1,11 +1,21 @@
-from flask import Blueprint, request
+import os
+
+from bson import ObjectId
+from flask import Blueprint, request, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from app.services.storage_service import StorageService
+from app.db import DB
+from app.services.storage_service import StorageService, StorageUnavailable, UploadTooLarge
+from app.services.image_derivatives import ImageDerivatives, derivative_path, is_image_path
+from app.services.storage_backends import LocalBackend, verify_file_signature
 from app.utils.responses import success_response, error_response
+from app.utils.log import get_logger
+from app.utils.security import current_principal
+from app.config import Config
 
 upload_bp = Blueprint("upload", __name__)
 storage = StorageService()
+log = get_logger("uploads")
 
 
 # -----------------------------------------------------------
@@ -23,6 +33,22 @@ def validate_file(uploaded_file):
     return None
 
 
+# -----------------------------------------------------------
+# Helper: WebP thumb/medium sizes, built in the background.
+# A deduplicated upload reuses the earlier file and its derivatives,
+# unless they were never stored (e.g. that build failed).
+# -----------------------------------------------------------
+def schedule_derivatives(uploaded, file):
+    path = uploaded["path"]
+    if not ImageDerivatives.enabled() or not is_image_path(path):
+        return
+    if uploaded["deduplicated"] and storage.sign_paths([derivative_path(path, "thumb")]):
+        return
+    uploaded["derivatives"] = ImageDerivatives.schedule(
+        storage, path, file.stream, file.content_type
+    )
+
+
 # -----------------------------------------------------------
 # Upload Farmer files
 # -----------------------------------------------------------
@@ -37,17 +63,19 @@ def upload_farmer_file():
     farmer_id = get_jwt_identity()
 
     storage_path = storage.generate_path(f"farmers/{farmer_id}", file.filename)
-    file_bytes = file.read()
-
     try:
-        path = storage.upload_file(storage_path, file_bytes, file.content_type)
-        url = storage.get_signed_url(path)
+        uploaded = storage.upload_and_sign(storage_path, file.stream, file.content_type)
+    except UploadTooLarge as e:
+        return error_response(str(e), 413)
+    except StorageUnavailable as e:
+        return error_response(str(e), 503)
     except Exception as e:
-        print(e)
-        print(error_response(str(e), 500))
+        log.exception("farmer upload failed")
         return error_response(str(e), 500)
 
-    return success_response({"path": path, "url": url}, 200)
+    schedule_derivatives(uploaded, file)
+
+    return success_response(uploaded, 200)
 
 
 # -----------------------------------------------------------
@@ -67,15 +95,16 @@ def upload_vet_file():
         error_response("Invalid or expired token",401)
 
     storage_path = storage.generate_path(f"vets/{vet_id}", file.filename)
-    file_bytes = file.read()
-
     try:
-        path = storage.upload_file(storage_path, file_bytes, file.content_type)
-        url = storage.get_signed_url(path)
+        uploaded = storage.upload_and_sign(storage_path, file.stream, file.content_type)
+    except UploadTooLarge as e:
+        return error_response(str(e), 413)
+    except StorageUnavailable as e:
+        return error_response(str(e), 503)
     except Exception as e:
         return error_response(str(e), 500)
 
-    return success_response({"path": path, "url": url}, 200)
+    return success_response(uploaded, 200)
 
 
 # -----------------------------------------------------------
@@ -90,15 +119,18 @@ def upload_animal_file(animal_id):
         return error_response(error, 400)
 
     storage_path = storage.generate_path(f"animals/{animal_id}", file.filename)
-    file_bytes = file.read()
-
     try:
-        path = storage.upload_file(storage_path, file_bytes, file.content_type)
-        url = storage.get_signed_url(path)
+        uploaded = storage.upload_and_sign(storage_path, file.stream, file.content_type)
+    except UploadTooLarge as e:
+        return error_response(str(e), 413)
+    except StorageUnavailable as e:
+        return error_response(str(e), 503)
     except Exception as e:
         return error_response(str(e), 500)
 
-    return success_response({"path": path, "url": url}, 200)
+    schedule_derivatives(uploaded, file)
+
+    return success_response(uploaded, 200)
 
 
 # -----------------------------------------------------------
@@ -113,12 +145,138 @@ def upload_treatment_file(treatment_id):
         return error_response(error, 400)
 
     storage_path = storage.generate_path(f"treatments/{treatment_id}", file.filename)
-    file_bytes = file.read()
+    try:
+        uploaded = storage.upload_and_sign(storage_path, file.stream, file.content_type)
+    except UploadTooLarge as e:
+        return error_response(str(e), 413)
+    except StorageUnavailable as e:
+        return error_response(str(e), 503)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+    return success_response(uploaded, 200)
+
+
+# -----------------------------------------------------------
+# Batch-sign stored paths (e.g. every photo on a list screen)
+# Body: {"paths": [...]} → {"urls": {path: url}}
+# -----------------------------------------------------------
+SIGNABLE_FOLDERS = ("farmers", "vets", "animals", "treatments")
+
+
+def parse_signable(path):
+    """
+    Split "<folder>/<owner id>/<file>" into (folder, owner_id), or
+    None for anything else (unknown folder, bad id, "." / ".." parts).
+    """
+    if not isinstance(path, str):
+        return None
+    parts = path.split("/")
+    if len(parts) < 3 or any(part in ("", ".", "..") for part in parts):
+        return None
+    if parts[0] not in SIGNABLE_FOLDERS or not ObjectId.is_valid(parts[1]):
+        return None
+    return parts[0], ObjectId(parts[1])
+
+
+def signable_owners(principal, owners):
+    """
+    Return the (folder, owner_id) pairs the caller may read: authorities
+    everything; farmers their own folder and their animals' /
+    treatments'; vets their own folder, the animals / treatments they may
+    see on the treatment routes (assigned to them, or still pending) and
+    the farmers they have treated. At most three queries.
+    """
+    if principal.is_authority:
+        return set(owners)
+
+    me = ObjectId(principal.id) if ObjectId.is_valid(principal.id) else None
+    allowed = set()
+    if me is None:
+        return allowed
+
+    farmer_ids = [oid for folder, oid in owners if folder == "farmers"]
+    animal_ids = [oid for folder, oid in owners if folder == "animals"]
+    treatment_ids = [oid for folder, oid in owners if folder == "treatments"]
+    visible = {"$or": [{"vet": me}, {"status": "pending"}]}
+
+    if principal.is_farmer:
+        allowed |= {("farmers", me)} & owners
+        if animal_ids:
+            allowed |= {
+                ("animals", a["_id"])
+                for a in DB.animals.find({"_id": {"$in": animal_ids}, "farmer": me}, {"_id": 1})
+            }
+        if treatment_ids:
+            allowed |= {
+                ("treatments", t["_id"])
+                for t in DB.treatments.find({"_id": {"$in": treatment_ids}, "farmer": me}, {"_id": 1})
+            }
+    elif principal.is_vet:
+        allowed |= {("vets", me)} & owners
+        if farmer_ids:
+            allowed |= {
+                ("farmers", oid)
+                for oid in DB.treatments.distinct("farmer", {"farmer": {"$in": farmer_ids}, "vet": me})
+            }
+        if animal_ids:
+            allowed |= {
+                ("animals", oid)
+                for oid in DB.treatments.distinct("animal", {"animal": {"$in": animal_ids}, **visible})
+            }
+        if treatment_ids:
+            allowed |= {
+                ("treatments", t["_id"])
+                for t in DB.treatments.find({"_id": {"$in": treatment_ids}, **visible}, {"_id": 1})
+            }
+
+    return allowed
+
+
+@upload_bp.route('/sign', methods=['POST'])
+@jwt_required()
+def sign_files():
+    paths = (request.get_json() or {}).get("paths")
+    if not paths or not isinstance(paths, list):
+        return error_response("paths list required", 400)
+    if len(paths) > Config.SIGN_BATCH_MAX:
+        return error_response(f"At most {Config.SIGN_BATCH_MAX} paths per call", 400)
+
+    owners = [parse_signable(p) for p in paths]
+    if not all(owners):
+        return error_response("Invalid storage path", 400)
+    if not set(owners) <= signable_owners(current_principal(), set(owners)):
+        return error_response("Not allowed", 403)
 
     try:
-        path = storage.upload_file(storage_path, file_bytes, file.content_type)
-        url = storage.get_signed_url(path)
+        urls = storage.sign_paths(paths)
+    except StorageUnavailable as e:
+        return error_response(str(e), 503)
     except Exception as e:
+        log.exception("batch sign failed")
         return error_response(str(e), 500)
 
-    return success_response({"path": path, "url": url}, 200)
+    return success_response({"urls": urls}, 200)
+
+
+# -----------------------------------------------------------
+# Serve files of the local storage backend (signed URLs only);
+# send_file handles Range / If-Modified-Since requests
+# -----------------------------------------------------------
+@upload_bp.route('/files/<path:storage_path>', methods=['GET'])
+def serve_file(storage_path):
+    if not isinstance(storage.backend, LocalBackend):
+        return error_response("Not found", 404)
+
+    if not verify_file_signature(storage_path, request.args.get("expires"), request.args.get("sig")):
+        return error_response("Invalid or expired link", 403)
+
+    try:
+        full_path = storage.backend.path_for(storage_path)
+    except Exception:
+        return error_response("Not found", 404)
+
+    if not os.path.isfile(full_path):
+        return error_response("Not found", 404)
+
+    return send_file(full_path, conditional=True, max_age=3600)
@@ -1,18 +1,47 @@
 from flask import Blueprint, request
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
+from mongoengine.errors import NotUniqueError
 from datetime import timedelta
 from app.utils.responses import success_response, error_response
-from app.services.otp_service import OTPService
+from app.services.otp_service import OTPService, OTP_MOBILE_LIMIT, OTP_IP_LIMIT, otp_mobile_key
+from app.services.storage_service import StorageService
 from app.models.vets import Vet
 from app.utils.serializer import SerializerMixin
+from app.utils.security import issue_access_token, ROLE_VET
+from app.utils.rate_limit import rate_limit, client_ip
+from app.utils.phone import normalize_mobile, mobile_variants
+from app.utils.log import get_logger
 
 veterinarian_auth_bp = Blueprint('veterinarian_auth', __name__)
 otp_service = OTPService()
+storage = StorageService()
+log = get_logger("vet_auth")
+
+
+def find_vet(mobile, raw=None):
+    """
+    Vet by E.164 mobile. Falls back to the legacy `mobile` field for
+    vets saved before mobile_e164 existed (until `flask
+    backfill-mobile-e164` has run) and fills in their mobile_e164.
+    """
+    vet = Vet.objects(mobile_e164=mobile).only("id").first()
+    if vet:
+        return vet
+
+    vet = Vet.objects(mobile__in=mobile_variants(mobile, raw)).only("id").first()
+    if vet:
+        try:
+            Vet.objects(id=vet.id, mobile_e164=None).update_one(set__mobile_e164=mobile)
+        except NotUniqueError:
+            log.warning("vet %s: %s already used by another vet", vet.id, mobile)
+    return vet
 
 # ============================================================
 # 1️⃣ REGISTER → STEP 1 → SEND OTP
 # ============================================================
 @veterinarian_auth_bp.route('/register/send-otp', methods=['POST'])
+@rate_limit(OTP_IP_LIMIT, client_ip)
+@rate_limit(OTP_MOBILE_LIMIT, otp_mobile_key, "Too many OTP requests for this number")
 def vet_register_send_otp():
     data = request.get_json() or {}
     mobile = data.get("mobile")
@@ -20,7 +49,11 @@ def vet_register_send_otp():
     if not mobile:
         return error_response("Mobile number is required", 400)
 
-    if Vet.objects(mobile=mobile).first():
+    raw, mobile = mobile, normalize_mobile(mobile)
+    if not mobile:
+        return error_response("Invalid mobile number", 400)
+
+    if find_vet(mobile, raw):
         return error_response("Mobile already registered", 409)
 
     sid = otp_service.send_otp(mobile)
@@ -43,12 +76,17 @@ def vet_register_verify_otp():
     if not mobile or not otp_code:
         return error_response("Mobile number and OTP are required", 400)
 
+    mobile = normalize_mobile(mobile)
+    if not mobile:
+        return error_response("Invalid mobile number", 400)
+
     if not otp_service.verify_otp(mobile, otp_code):
         return error_response("Invalid OTP", 401)
 
     # Generate temp token valid for 10 minutes
     temp_token = create_access_token(
         identity=mobile,
+        additional_claims={"role": "registration"},
         expires_delta=timedelta(minutes=10)
     )
 
@@ -64,7 +102,15 @@ def vet_register_verify_otp():
 @veterinarian_auth_bp.route('/register', methods=['POST'])
 @jwt_required()
 def vet_register():
-    mobile = get_jwt_identity()  # mobile extracted from temp token
+    # Only the temp token from register/verify-otp may create an account
+    if get_jwt().get("role") != "registration":
+        return error_response("Registration token required", 403)
+
+    # E.164 mobile from the temp token (normalized again for tokens
+    # issued before identities were normalized)
+    mobile = normalize_mobile(get_jwt_identity())
+    if not mobile:
+        return error_response("Invalid mobile number", 400)
 
     data = request.get_json() or {}
     required = ["name", "qualification", "registration_number"]
@@ -72,7 +118,7 @@ def vet_register():
     if not all(data.get(f) for f in required):
         return error_response("Missing required fields", 400)
 
-    if Vet.objects(mobile=mobile).first():
+    if find_vet(mobile, get_jwt_identity()):
         return error_response("Mobile already registered", 409)
 
     vet = Vet(
@@ -84,7 +130,7 @@ def vet_register():
     )
     vet.save()
 
-    access_token = create_access_token(identity=str(vet.id), expires_delta=timedelta(hours=24))
+    access_token = issue_access_token(vet.id, ROLE_VET, expires_delta=timedelta(hours=24))
 
     return success_response(
         {"message": "Registration successful", "access_token": access_token},
@@ -96,6 +142,8 @@ def vet_register():
 # 4️⃣ LOGIN → STEP 1 → SEND OTP
 # ============================================================
 @veterinarian_auth_bp.route('/login/send-otp', methods=['POST'])
+@rate_limit(OTP_IP_LIMIT, client_ip)
+@rate_limit(OTP_MOBILE_LIMIT, otp_mobile_key, "Too many OTP requests for this number")
 def vet_login_send_otp():
     data = request.get_json() or {}
     mobile = data.get("mobile")
@@ -103,7 +151,11 @@ def vet_login_send_otp():
     if not mobile:
         return error_response("Mobile number is required", 400)
 
-    if not Vet.objects(mobile=mobile).first():
+    raw, mobile = mobile, normalize_mobile(mobile)
+    if not mobile:
+        return error_response("Invalid mobile number", 400)
+
+    if not find_vet(mobile, raw):
         return error_response("Veterinarian not found", 404)
 
     sid = otp_service.send_otp(mobile)
@@ -126,14 +178,18 @@ def vet_login_verify_otp():
     if not mobile or not otp_code:
         return error_response("Mobile number and OTP are required", 400)
 
+    raw, mobile = mobile, normalize_mobile(mobile)
+    if not mobile:
+        return error_response("Invalid mobile number", 400)
+
     if not otp_service.verify_otp(mobile, otp_code):
         return error_response("Invalid OTP", 401)
 
-    vet = Vet.objects(mobile=mobile).first()
+    vet = find_vet(mobile, raw)
     if not vet:
         return error_response("Veterinarian not found", 404)
 
-    access_token = create_access_token(identity=str(vet.id), expires_delta=timedelta(hours=24))
+    access_token = issue_access_token(vet.id, ROLE_VET, expires_delta=timedelta(hours=24))
 
     return success_response(
         {"message": "Login successful", "access_token": access_token},
@@ -153,6 +209,7 @@ def vet_me():
     if not vet:
         return error_response("Veterinarian not found", 404)
 
-    return success_response(vet.to_json(), 200)
+    # All document photos signed in one storage call (cached after)
+    return success_response(storage.attach_signed_urls(vet.to_json()), 200)
 
 
@@ -0,0 +1,290 @@
+import csv
+import io
+import json
+import threading
+import zlib
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.config import Config
+from app.db import DB
+from app.services.medicine_catalog import MedicineCatalog
+from app.utils.log import get_logger
+
+log = get_logger("export")
+
+
+class ExportBusy(RuntimeError):
+    pass
+
+
+# ============================================================
+# VALUE FORMATTING
+# ============================================================
+def _value(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _medicine_names(medicines):
+    return [
+        MedicineCatalog.name_for(m.get("medicine")) or str(m.get("medicine"))
+        for m in medicines or []
+    ]
+
+
+def _treatment_row(doc):
+    return {
+        "treatment_id": str(doc["_id"]),
+        "farmer_id": _value(doc.get("farmer")),
+        "animal_id": _value(doc.get("animal")),
+        "vet_id": _value(doc.get("vet")),
+        "status": doc.get("status"),
+        "diagnosis": doc.get("diagnosis"),
+        "symptoms": doc.get("symptoms") or [],
+        "medicines": _medicine_names(doc.get("medicines")),
+        "treatment_start_date": _value(doc.get("treatment_start_date")),
+        "withdrawal_ends_on": _value(doc.get("withdrawal_ends_on")),
+        "is_flagged_violation": bool(doc.get("is_flagged_violation")),
+        "violation_reason": doc.get("violation_reason"),
+        "created_at": _value(doc.get("created_at")),
+    }
+
+
+def _alert_row(doc):
+    return {
+        "alert_id": str(doc["_id"]),
+        "treatment_id": doc.get("treatment_id"),
+        "animal_id": doc.get("animal_id"),
+        "safe_from": _value(doc.get("safe_from")),
+        "alert_sent": bool(doc.get("alert_sent")),
+        "created_at": _value(doc.get("created_at")),
+    }
+
+
+def _consumer_check_row(doc):
+    result = doc.get("result") or {}
+    return {
+        "check_id": str(doc["_id"]),
+        "farmer_id": _value(doc.get("farmer_id")),
+        "animal_id": _value(doc.get("animal_id")),
+        "is_safe_milk": result.get("is_safe_milk"),
+        "is_safe_meat": result.get("is_safe_meat"),
+        "message": result.get("message"),
+        "checked_at": _value(doc.get("checked_at")),
+    }
+
+
+TREATMENT_PROJECTION = {
+    "farmer": 1, "animal": 1, "vet": 1, "status": 1, "diagnosis": 1,
+    "symptoms": 1, "medicines.medicine": 1, "treatment_start_date": 1,
+    "withdrawal_ends_on": 1, "is_flagged_violation": 1,
+    "violation_reason": 1, "created_at": 1,
+}
+
+
+# ============================================================
+# DATASETS
+# collection: DB attribute; date_field: range filter + sort key
+# district_by: how a district narrows the query (field $in owner ids) —
+#   "farmer"  -> field holds the farmer ObjectId
+#   "animal"  -> field holds the animal id as a string
+# ============================================================
+DATASETS = {
+    "treatments": {
+        "collection": "treatments",
+        "date_field": "created_at",
+        "district_by": ("farmer", "farmer"),
+        "projection": TREATMENT_PROJECTION,
+        "row": _treatment_row,
+    },
+    "violations": {
+        "collection": "treatments",
+        "date_field": "created_at",
+        "district_by": ("farmer", "farmer"),
+        "filter": {"is_flagged_violation": True},
+        "projection": TREATMENT_PROJECTION,
+        "row": _treatment_row,
+    },
+    "withdrawal-alerts": {
+        "collection": "withdrawal_alerts",
+        "date_field": "created_at",
+        "district_by": ("animal", "animal_id"),
+        "projection": {"treatment_id": 1, "animal_id": 1, "safe_from": 1,
+                       "alert_sent": 1, "created_at": 1},
+        "row": _alert_row,
+    },
+    "consumer-checks": {
+        "collection": "consumer_checks",
+        "date_field": "checked_at",
+        "district_by": ("farmer", "farmer_id"),
+        "projection": {"farmer_id": 1, "animal_id": 1, "result": 1, "checked_at": 1},
+        "row": _consumer_check_row,
+    },
+}
+
+# Column order for CSV (NDJSON uses the same keys)
+COLUMNS = {name: list(spec["row"]({"_id": ObjectId()}).keys()) for name, spec in DATASETS.items()}
+
+
+# ============================================================
+# ENCODERS — each yields str/bytes chunks of roughly
+# EXPORT_CHUNK_BYTES so the response is flushed steadily
+# ============================================================
+def _ndjson_chunks(rows):
+    buffer, size = [], 0
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= Config.EXPORT_CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _csv_chunks(rows, columns):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            ";".join(map(str, v)) if isinstance(v, list) else ("" if v is None else v)
+            for v in (row[c] for c in columns)
+        ])
+        if out.tell() >= Config.EXPORT_CHUNK_BYTES:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class ExportService:
+    # Exports hold a worker for their whole duration; cap how many a
+    # process runs at once so dashboard requests keep a free worker.
+    _slots = threading.BoundedSemaphore(Config.EXPORT_MAX_CONCURRENT)
+
+    @staticmethod
+    def datasets():
+        return list(DATASETS)
+
+    # --------------------------------------------------------
+    # Pipeline — one $match on indexed fields: the date range, and for
+    # a district the owner ids of one batch (farmer/animal id $in)
+    # --------------------------------------------------------
+    @staticmethod
+    def build_pipeline(dataset, date_from=None, date_to=None, owner_ids=None):
+        spec = DATASETS[dataset]
+        match = dict(spec.get("filter", {}))
+
+        date_range = {}
+        if date_from:
+            date_range["$gte"] = date_from
+        if date_to:
+            date_range["$lt"] = date_to
+        if date_range:
+            match[spec["date_field"]] = date_range
+
+        if owner_ids is not None:
+            match[spec["district_by"][1]] = {"$in": owner_ids}
+
+        return [
+            {"$match": match},
+            {"$sort": {spec["date_field"]: 1}},
+            {"$project": spec["projection"]},
+        ]
+
+    # --------------------------------------------------------
+    # A district's owner ids, EXPORT_DISTRICT_BATCH at a time:
+    # farmers by the indexed farmers.district, then (for animal
+    # keyed datasets) their animals by the indexed animals.farmer
+    # --------------------------------------------------------
+    @staticmethod
+    def district_batches(dataset, district):
+        kind, _ = DATASETS[dataset]["district_by"]
+        size = Config.EXPORT_DISTRICT_BATCH
+
+        def batched(cursor, key):
+            batch = []
+            for doc in cursor.batch_size(size):
+                batch.append(key(doc))
+                if len(batch) >= size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        farmers = DB.farmers.find({"district": district}, {"_id": 1})
+        for farmer_ids in batched(farmers, lambda f: f["_id"]):
+            if kind == "farmer":
+                yield farmer_ids
+            else:
+                animals = DB.animals.find({"farmer": {"$in": farmer_ids}}, {"_id": 1})
+                yield from batched(animals, lambda a: str(a["_id"]))
+
+    @staticmethod
+    def build_pipelines(dataset, date_from=None, date_to=None, district=None):
+        """
+        Pipelines to run in turn. Without a district that is one; with
+        one, a pipeline per batch of owner ids (rows are in date order
+        within a batch). Ids are resolved lazily, while streaming.
+        """
+        if not district:
+            yield ExportService.build_pipeline(dataset, date_from, date_to)
+            return
+        for owner_ids in ExportService.district_batches(dataset, district):
+            yield ExportService.build_pipeline(dataset, date_from, date_to, owner_ids)
+
+    @staticmethod
+    def acquire():
+        if not ExportService._slots.acquire(blocking=False):
+            raise ExportBusy("Too many exports running, try again shortly")
+
+    @staticmethod
+    def release():
+        ExportService._slots.release()
+
+    # --------------------------------------------------------
+    # Stream
+    # --------------------------------------------------------
+    @staticmethod
+    def stream(dataset, pipelines, fmt, compress=False):
+        """
+        Generator of response chunks. Reads through batched cursors,
+        so memory stays flat however many documents match.
+        """
+        spec = DATASETS[dataset]
+        collection = getattr(DB, spec["collection"])
+
+        def rows():
+            count = 0
+            try:
+                for pipeline in pipelines:
+                    with collection.aggregate(pipeline, batchSize=Config.EXPORT_BATCH_SIZE) as cursor:
+                        for doc in cursor:
+                            count += 1
+                            yield spec["row"](doc)
+            finally:
+                log.info("export %s format=%s rows=%s", dataset, fmt, count)
+
+        if fmt == "csv":
+            chunks = _csv_chunks(rows(), COLUMNS[dataset])
+        else:
+            chunks = _ndjson_chunks(rows())
+
+        return _gzip(chunks) if compress else chunks
@@ -0,0 +1,110 @@
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.config import Config
+from app.utils.log import get_logger
+
+from PIL import Image, ImageOps
+
+log = get_logger("images")
+
+# name -> longest edge in px; stored as WebP next to the original
+DERIVATIVES = {"thumb": 160, "medium": 720}
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+
+def derivative_path(storage_path, name):
+    """animals/<id>/<uuid>.jpg -> animals/<id>/<uuid>.<name>.webp"""
+    base, _ = os.path.splitext(storage_path)
+    return f"{base}.{name}.webp"
+
+
+def is_image_path(storage_path):
+    return os.path.splitext(storage_path)[1].lower() in (".jpg", ".jpeg", ".png", ".webp")
+
+
+# ============================================================
+# WORKER PROCESS — pure CPU work, no app state
+# ============================================================
+def render_derivatives(source_file):
+    """Decode once, return {name: webp bytes} for every DERIVATIVES size."""
+    with Image.open(source_file) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+
+        out = {}
+        for name, edge in sorted(DERIVATIVES.items(), key=lambda kv: -kv[1]):
+            img.thumbnail((edge, edge))  # largest first, each step shrinks further
+            buffer = io.BytesIO()
+            img.save(buffer, "WEBP", quality=Config.IMAGE_WEBP_QUALITY, method=4)
+            out[name] = buffer.getvalue()
+        return out
+
+
+class ImageDerivatives:
+    """
+    Thumbnails/medium sizes built off the request thread: decoding and
+    resizing run in a process pool (CPU-bound, outside the GIL), the
+    resulting uploads on a small thread pool.
+    """
+
+    _lock = threading.Lock()
+    _processes = None
+    _uploads = None
+
+    @classmethod
+    def enabled(cls):
+        return Config.IMAGE_DERIVATIVES_ENABLED
+
+    @classmethod
+    def _pools(cls):
+        if cls._processes is None:
+            with cls._lock:
+                if cls._processes is None:
+                    # spawn: forking a threaded server can deadlock the child
+                    cls._uploads = ThreadPoolExecutor(
+                        max_workers=2, thread_name_prefix="image-upload"
+                    )
+                    cls._processes = ProcessPoolExecutor(
+                        max_workers=Config.IMAGE_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return cls._processes, cls._uploads
+
+    @classmethod
+    def schedule(cls, storage, storage_path, stream, content_type):
+        """
+        Queue derivatives for an uploaded image. Copies the upload to a
+        temp file (the request's stream is gone once we return) and
+        returns {name: derivative path}, or {} when not applicable.
+        """
+        if not cls.enabled() or content_type not in IMAGE_TYPES:
+            return {}
+
+        stream.seek(0)
+        fd, source_file = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(storage_path)[1])
+        with os.fdopen(fd, "wb") as tmp:
+            shutil.copyfileobj(stream, tmp, 64 * 1024)
+
+        processes, uploads = cls._pools()
+        future = processes.submit(render_derivatives, source_file)
+        future.add_done_callback(
+            lambda f: uploads.submit(cls._store, storage, storage_path, source_file, f)
+        )
+        return {name: derivative_path(storage_path, name) for name in DERIVATIVES}
+
+    @staticmethod
+    def _store(storage, storage_path, source_file, future):
+        try:
+            for name, data in future.result().items():
+                storage.upload_file(derivative_path(storage_path, name), data, "image/webp")
+            log.debug("derivatives stored for %s", storage_path)
+        except Exception:
+            log.exception("derivatives failed for %s", storage_path)
+        finally:
+            os.unlink(source_file)
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from app.config import Config
+from app.db import DB
+
+VERSION_KEY = "authorized_medicines"
+
+
+class MedicineCatalog:
+    """
+    In-process copy of the authorized_medicines collection, keyed by id
+    and by name. A version counter in `catalog_versions` is bumped on
+    every write; workers compare it at most once per
+    MEDICINE_CATALOG_CHECK_SECONDS and reload only when it changed.
+    """
+
+    _lock = threading.Lock()
+    _by_id = {}
+    _by_name = {}
+    _version = None
+    _checked_at = 0.0
+    _miss_checked_at = 0.0
+
+    # -----------------------------------------------------
+    # Loading / invalidation
+    # -----------------------------------------------------
+    @staticmethod
+    def _stored_version():
+        doc = DB.db.catalog_versions.find_one({"_id": VERSION_KEY}, {"version": 1})
+        return doc["version"] if doc else 0
+
+    @classmethod
+    def load(cls):
+        from app.models.authorized_medicine import AuthorizedMedicine
+
+        with cls._lock:
+            version = cls._stored_version()
+            medicines = list(AuthorizedMedicine.objects())
+            cls._by_id = {str(m.id): m for m in medicines}
+            cls._by_name = {m.name.lower(): m for m in medicines}
+            cls._version = version
+            cls._checked_at = time.monotonic()
+
+    @classmethod
+    def refresh(cls, force=False):
+        if cls._version is None:
+            cls.load()
+            return
+
+        now = time.monotonic()
+        if not force and now - cls._checked_at < Config.MEDICINE_CATALOG_CHECK_SECONDS:
+            return
+
+        cls._checked_at = now
+        if cls._stored_version() != cls._version:
+            cls.load()
+
+    @staticmethod
+    def bump_version():
+        DB.db.catalog_versions.update_one(
+            {"_id": VERSION_KEY},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+        # Make this worker pick the change up on its next read
+        MedicineCatalog._checked_at = 0.0
+
+    # -----------------------------------------------------
+    # Lookups
+    # -----------------------------------------------------
+    @classmethod
+    def get(cls, medicine_id):
+        if not medicine_id:
+            return None
+        cls.refresh()
+        medicine = cls._by_id.get(str(medicine_id))
+        if medicine is None and cls._may_check_on_miss():
+            # Possibly added on another worker since the last check
+            cls.refresh(force=True)
+            medicine = cls._by_id.get(str(medicine_id))
+        return medicine
+
+    @classmethod
+    def _may_check_on_miss(cls):
+        # One forced version check per interval: unknown ids (deleted
+        # or garbage) must not cost a query per lookup
+        now = time.monotonic()
+        if now - cls._miss_checked_at < Config.MEDICINE_CATALOG_MISS_CHECK_SECONDS:
+            return False
+        cls._miss_checked_at = now
+        return True
+
+    @classmethod
+    def get_by_name(cls, name):
+        if not name:
+            return None
+        cls.refresh()
+        return cls._by_name.get(name.lower())
+
+    @classmethod
+    def name_for(cls, medicine_id):
+        medicine = cls.get(medicine_id)
+        return medicine.name if medicine else None
+
+    @classmethod
+    def all(cls):
+        cls.refresh()
+        return sorted(cls._by_id.values(), key=lambda m: m.name)
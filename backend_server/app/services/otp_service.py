@@ -1,75 +1,158 @@
-import phonenumbers
-import random
+import hashlib
+import hmac
+import queue
+import re
+import secrets
+import threading
+from datetime import datetime, timedelta
+
+from flask import request
 from twilio.rest import Client
-from app.config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_VERIFY_SERVICE_SID, Config
+
+from app.config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_SMS_FROM, Config
+from app.models.otp_code import OTPCode
+from app.utils.log import get_logger
+from app.utils.metrics import observe_outbound
+from app.utils.phone import normalize_mobile
+from app.utils.rate_limit import TokenBucketLimiter
+
+log = get_logger("otp")
+
+# send-otp abuse protection (per worker)
+OTP_MOBILE_LIMIT = TokenBucketLimiter(
+    Config.OTP_MOBILE_BURST, Config.OTP_MOBILE_PER_HOUR / 3600
+)
+OTP_IP_LIMIT = TokenBucketLimiter(
+    Config.OTP_IP_BURST, Config.OTP_IP_PER_MINUTE / 60
+)
+
+
+def otp_mobile_key():
+    # E.164, so "+91 98..." and "98..." share one bucket; unparseable
+    # input falls back to its last 10 digits
+    mobile = (request.get_json(silent=True) or {}).get("mobile")
+    return normalize_mobile(mobile) or re.sub(r"\D", "", str(mobile or ""))[-10:] or None
+
+
+class OTPDispatcher:
+    """
+    Sends SMS from a background thread so a slow provider never holds
+    a request worker. The queue is bounded; when it is full send_otp
+    fails fast instead of piling up.
+    """
+
+    _queue = queue.Queue(maxsize=Config.OTP_QUEUE_SIZE)
+    _lock = threading.Lock()
+    _worker = None
+
+    @classmethod
+    def submit(cls, job):
+        cls._ensure_worker()
+        try:
+            cls._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            log.error("OTP queue full, dropping send to %s", job[1])
+            return False
+
+    @classmethod
+    def _ensure_worker(cls):
+        if cls._worker is None or not cls._worker.is_alive():
+            with cls._lock:
+                if cls._worker is None or not cls._worker.is_alive():
+                    cls._worker = threading.Thread(target=cls._run, name="otp-dispatch", daemon=True)
+                    cls._worker.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            send, to, body = cls._queue.get()
+            try:
+                send(to, body)
+            except Exception as e:
+                log.error("Error sending OTP to %s: %s", to, e)
+            finally:
+                cls._queue.task_done()
+
 
 class OTPService:
     def __init__(self):
         self.client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
 
     def parse_phone(self, phone_number):
-        try:
-            # If no +91 is included, parse with India as default
-            if not phone_number.startswith("+"):
-            # country 'IN' as default region
-                parsed = phonenumbers.parse(phone_number, "IN")
-            else:
-                parsed = phonenumbers.parse(phone_number)
+        return normalize_mobile(phone_number)
 
-            if not phonenumbers.is_valid_number(parsed):
-                return None
+    @staticmethod
+    def _hash(e164, code):
+        # Keyed per mobile: a leaked collection does not reveal codes
+        message = f"{e164}:{code}".encode()
+        return hmac.new(Config.OTP_HASH_KEY.encode(), message, hashlib.sha256).hexdigest()
 
-            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    def _send_sms(self, to, body):
+        with observe_outbound("twilio", "send_otp"):
+            self.client.messages.create(to=to, from_=TWILIO_SMS_FROM, body=body)
 
-        except:
+    def send_otp(self, phone_number):
+        """
+        Store a fresh hashed code and queue the SMS. Returns a truthy
+        dispatch id immediately, or None (invalid number / queue full).
+        """
+        e164 = self.parse_phone(phone_number)
+        if not e164:
+            log.info("Invalid phone: %s", phone_number)
             return None
 
-    def send_otp(self, phone_number):
         if Config.TEST_OTP_MODE:
-            # Generate a dummy OTP for testing
-            test_otp = str(random.randint(100000, 999999))
-            print(f"[TEST MODE] Sending OTP {test_otp} to {phone_number}")
-            # In a real scenario, you might store this test_otp temporarily for verification
+            code = Config.TEST_OTP_CODE
+        else:
+            code = f"{secrets.randbelow(10 ** Config.OTP_LENGTH):0{Config.OTP_LENGTH}d}"
+        now = datetime.utcnow()
+
+        # One pending code per mobile: a resend replaces the previous one
+        OTPCode._get_collection().replace_one(
+            {"_id": e164},
+            {
+                "code_hash": self._hash(e164, code),
+                "attempts": 0,
+                "expires_at": now + timedelta(seconds=Config.OTP_TTL_SECONDS),
+                "created_at": now,
+            },
+            upsert=True
+        )
+
+        if Config.TEST_OTP_MODE:
+            log.info("[TEST MODE] OTP stored for %s", e164)
             return "test_sid"
 
-        try:
-            e164 = self.parse_phone(phone_number)
-            if not e164:
-                print("Invalid phone:", phone_number)
-                return None
-
-            verification = self.client.verify.v2.services(
-                TWILIO_VERIFY_SERVICE_SID
-            ).verifications.create(
-                to=e164,
-                channel="sms"
-            )
-            return verification.sid
-
-        except Exception as e:
-            print("Error sending OTP:", e)
+        body = f"Your verification code is {code}. It expires in {Config.OTP_TTL_SECONDS // 60} minutes."
+        if not OTPDispatcher.submit((self._send_sms, e164, body)):
             return None
+        return "queued"
 
     def verify_otp(self, phone_number, otp_code):
-        if Config.TEST_OTP_MODE:
-            # For testing, assume a fixed OTP or any OTP is valid
-            print(f"[TEST MODE] Verifying OTP {otp_code} for {phone_number}")
-            return otp_code == "123456"  # Example: always approve if OTP is 123456
+        """Local check against the stored hash; the code is single-use."""
+        e164 = self.parse_phone(phone_number)
+        if not e164 or not otp_code:
+            log.info("Invalid phone: %s", phone_number)
+            return False
 
-        try:
-            e164 = self.parse_phone(phone_number)
-            if not e164:
-                print("Invalid phone:", phone_number)
-                return False
-
-            result = self.client.verify.v2.services(
-                TWILIO_VERIFY_SERVICE_SID
-            ).verification_checks.create(
-                to=e164,
-                code=otp_code
-            )
-            return result.status == "approved"
-
-        except Exception as e:
-            print("Error verifying OTP:", e)
+        codes = OTPCode._get_collection()
+
+        # Count the attempt first so parallel guesses share the budget
+        pending = codes.find_one_and_update(
+            {
+                "_id": e164,
+                "expires_at": {"$gt": datetime.utcnow()},
+                "attempts": {"$lt": Config.OTP_MAX_ATTEMPTS},
+            },
+            {"$inc": {"attempts": 1}},
+            projection={"code_hash": 1}
+        )
+        if not pending:
             return False
+
+        if not hmac.compare_digest(pending["code_hash"], self._hash(e164, str(otp_code))):
+            return False
+
+        # Consume; only one concurrent verifier can win
+        return codes.delete_one({"_id": e164, "code_hash": pending["code_hash"]}).deleted_count == 1
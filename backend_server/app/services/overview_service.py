@@ -0,0 +1,140 @@
+import calendar
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.config import Config
+from app.db import DB
+from app.services.rollup_service import (
+    RollupService, day_key, TREATMENTS_CREATED, TREATMENTS_DIAGNOSED, ANIMALS_REGISTERED,
+)
+from app.utils.query_budget import submit_in_context
+
+# Shared across requests: the overview's reads run in parallel
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="overview")
+
+
+class OverviewService:
+    """
+    Whole authority-dashboard overview in one call: treatment and animal
+    figures from the dashboard rollups, the rest from indexed counts,
+    run concurrently and cached for OVERVIEW_CACHE_TTL_SECONDS across
+    all authority sessions.
+    """
+
+    _lock = threading.Lock()
+    _cached = None
+    _expires_at = 0.0
+
+    # -----------------------------------------------------
+    # Reads — each one starts on an index
+    # -----------------------------------------------------
+    @staticmethod
+    def _rollups():
+        # Totals per metric, created-per-day and merged counts
+        # (violations, species) in one pass over the indexed metrics
+        return next(RollupService.collection().aggregate([
+            {"$match": {"metric": {"$in": [TREATMENTS_CREATED, TREATMENTS_DIAGNOSED, ANIMALS_REGISTERED]}}},
+            {"$facet": {
+                "totals": [{"$group": {"_id": "$metric", "total": {"$sum": "$total"}}}],
+                "created_by_day": [
+                    {"$match": {"metric": TREATMENTS_CREATED}},
+                    {"$group": {"_id": "$day", "total": {"$sum": "$total"}}},
+                ],
+                "counts": [
+                    {"$match": {"metric": {"$in": [TREATMENTS_DIAGNOSED, ANIMALS_REGISTERED]}}},
+                    {"$project": {"metric": 1, "counts": {"$objectToArray": "$counts"}}},
+                    {"$unwind": "$counts"},
+                    {"$group": {"_id": {"metric": "$metric", "key": "$counts.k"}, "n": {"$sum": "$counts.v"}}},
+                ],
+            }},
+        ]))
+
+    @staticmethod
+    def _accounts(collection):
+        # Total from collection metadata; unverified on the is_verified index
+        return (
+            collection.estimated_document_count(),
+            collection.count_documents({"is_verified": False}),
+        )
+
+    @staticmethod
+    def _unsafe_farmers(now):
+        # Covered by the (withdrawal_safe_from, farmer) index
+        return len(DB.animals.distinct("farmer", {"withdrawal_safe_from": {"$gt": now}}))
+
+    # -----------------------------------------------------
+    # Build + cache
+    # -----------------------------------------------------
+    @staticmethod
+    def build():
+        now = datetime.utcnow()
+        months = RollupService.months_back(6, now)
+
+        rollups_f = submit_in_context(_executor, OverviewService._rollups)
+        farmers_f = submit_in_context(_executor, OverviewService._accounts, DB.farmers)
+        vets_f = submit_in_context(_executor, OverviewService._accounts, DB.vets)
+        unsafe_f = submit_in_context(_executor, OverviewService._unsafe_farmers, now)
+
+        rollups = rollups_f.result()
+        total_farmers, unverified_farmers = farmers_f.result()
+        total_vets, unverified_vets = vets_f.result()
+        unsafe_farms = unsafe_f.result()
+
+        totals = {row["_id"]: row["total"] for row in rollups["totals"]}
+        counts = defaultdict(dict)
+        for row in rollups["counts"]:
+            counts[row["_id"]["metric"]][row["_id"]["key"]] = row["n"]
+
+        created_by_day = {row["_id"]: row["total"] for row in rollups["created_by_day"]}
+        trend_counts = defaultdict(int)
+        for day, n in created_by_day.items():
+            trend_counts[day[:7]] += n
+        species = sorted(counts[ANIMALS_REGISTERED].items(), key=lambda kv: kv[1], reverse=True)
+
+        safe_farms = max(0, total_farmers - unsafe_farms)
+
+        def pct(n):
+            return round(n * 100 / total_farmers) if total_farmers else 0
+
+        return {
+            "total_farmers": total_farmers,
+            "total_veterinarians": total_vets,
+            "total_animals": totals.get(ANIMALS_REGISTERED, 0),
+            "total_treatments": totals.get(TREATMENTS_CREATED, 0),
+            "pending_verifications": unverified_farmers + unverified_vets,
+            "today_treatments": created_by_day.get(day_key(now), 0),
+            "violations_count": counts[TREATMENTS_DIAGNOSED].get("violation", 0),
+            "farm_safety": {"safe": safe_farms, "unsafe": unsafe_farms},
+            "charts": {
+                "treatment_trends": [
+                    {
+                        "month": calendar.month_abbr[m.month],
+                        "treatments": trend_counts.get(m.strftime("%Y-%m"), 0),
+                    }
+                    for m in months
+                ],
+                "animals_by_species": [
+                    {"species": name, "count": n}
+                    for name, n in species
+                ],
+                "farm_safety_status": [
+                    {"name": "Safe", "value": pct(safe_farms)},
+                    {"name": "Under Withdrawal", "value": pct(unsafe_farms)},
+                ],
+            },
+        }
+
+    @classmethod
+    def get(cls):
+        if cls._cached is not None and time.monotonic() < cls._expires_at:
+            return cls._cached
+
+        # Single flight: concurrent callers wait for one rebuild
+        with cls._lock:
+            if cls._cached is None or time.monotonic() >= cls._expires_at:
+                cls._cached = cls.build()
+                cls._expires_at = time.monotonic() + Config.OVERVIEW_CACHE_TTL_SECONDS
+            return cls._cached
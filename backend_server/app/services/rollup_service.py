@@ -0,0 +1,311 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.config import Config
+from app.db import DB
+from app.models.dashboard_rollup import DashboardRollup
+
+UNKNOWN_DISTRICT = "unknown"
+
+# Metrics maintained incrementally
+TREATMENTS_CREATED = "treatments_created"
+TREATMENTS_DIAGNOSED = "treatments_diagnosed"   # counts: compliant / violation
+MEDICINE_USAGE = "medicine_usage"               # counts: medicine id
+VET_VISITS = "vet_visits"                       # counts: vet id
+ANIMALS_REGISTERED = "animals_registered"       # counts: species
+
+
+def day_key(when=None):
+    return (when or datetime.utcnow()).strftime("%Y-%m-%d")
+
+
+# farmer id -> (district, expires_at monotonic), oldest first
+_districts = OrderedDict()
+_districts_lock = threading.Lock()
+
+
+def district_for_farmer(farmer_id):
+    # Cached per worker for ROLLUP_DISTRICT_CACHE_SECONDS: district is
+    # optional and may be filled in after the farmer's first treatment
+    if not farmer_id:
+        return UNKNOWN_DISTRICT
+    farmer_id = str(farmer_id)
+
+    cached = _districts.get(farmer_id)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+
+    farmer = DB.farmers.find_one({"_id": ObjectId(farmer_id)}, {"district": 1})
+    district = (farmer or {}).get("district") or UNKNOWN_DISTRICT
+
+    with _districts_lock:
+        _districts.pop(farmer_id, None)
+        _districts[farmer_id] = (district, time.monotonic() + Config.ROLLUP_DISTRICT_CACHE_SECONDS)
+        while len(_districts) > Config.ROLLUP_DISTRICT_CACHE_MAX_ENTRIES:
+            _districts.popitem(last=False)
+    return district
+
+
+def forget_farmer_district(farmer_id):
+    """Drop a cached district (Farmer.save calls this when it changes)."""
+    with _districts_lock:
+        _districts.pop(str(farmer_id), None)
+
+
+class RollupService:
+
+    @staticmethod
+    def collection():
+        return DashboardRollup._get_collection()
+
+    # -----------------------------------------------------
+    # Write path ($inc, upsert)
+    # -----------------------------------------------------
+    @staticmethod
+    def _inc_spec(day, district, metric, counts, amount=1):
+        inc = {"total": amount}
+        for key, n in counts.items():
+            inc[f"counts.{key}"] = n
+        return (
+            {"_id": f"{day}|{district}|{metric}"},
+            {
+                "$inc": inc,
+                "$setOnInsert": {"day": day, "district": district, "metric": metric},
+            },
+        )
+
+    @staticmethod
+    def record(metric, farmer_id=None, key=None, amount=1, when=None):
+        counts = {key: amount} if key else {}
+        query, update = RollupService._inc_spec(
+            day_key(when), district_for_farmer(str(farmer_id) if farmer_id else None),
+            metric, counts, amount
+        )
+        RollupService.collection().update_one(query, update, upsert=True)
+
+    @staticmethod
+    def record_diagnosis(treatment, farmer_id, vet_id, medicine_ids, when=None):
+        """All diagnosis metrics for one treatment in a single bulk_write."""
+        day = day_key(when)
+        district = district_for_farmer(str(farmer_id))
+        outcome = "violation" if treatment.is_flagged_violation else "compliant"
+
+        medicine_counts = defaultdict(int)
+        for medicine_id in medicine_ids:
+            medicine_counts[str(medicine_id)] += 1
+
+        specs = [
+            RollupService._inc_spec(day, district, TREATMENTS_DIAGNOSED, {outcome: 1}),
+            RollupService._inc_spec(day, district, VET_VISITS, {str(vet_id): 1}),
+            RollupService._inc_spec(
+                day, district, MEDICINE_USAGE, medicine_counts, len(medicine_ids)
+            ),
+        ]
+        RollupService.collection().bulk_write(
+            [UpdateOne(query, update, upsert=True) for query, update in specs],
+            ordered=False
+        )
+
+    @staticmethod
+    def record_batch_diagnosis(rows, vet_id, created=False, when=None):
+        """
+        Diagnosis metrics for many treatments at once (treatment camps).
+        `rows` are (farmer_id, is_violation, medicine_ids); counts are
+        merged per district and written in one bulk_write. With
+        created=True the treatments are also counted as created.
+        """
+        if not rows:
+            return
+
+        day = day_key(when)
+        farmer_ids = {ObjectId(str(farmer_id)) for farmer_id, _, _ in rows}
+        districts = {
+            f["_id"]: f.get("district") or UNKNOWN_DISTRICT
+            for f in DB.farmers.find({"_id": {"$in": list(farmer_ids)}}, {"district": 1})
+        }
+
+        per_district = defaultdict(lambda: {
+            "created": 0, "outcomes": defaultdict(int), "medicines": defaultdict(int), "used": 0,
+        })
+        for farmer_id, is_violation, medicine_ids in rows:
+            entry = per_district[districts.get(ObjectId(str(farmer_id)), UNKNOWN_DISTRICT)]
+            entry["created"] += 1
+            entry["outcomes"]["violation" if is_violation else "compliant"] += 1
+            for medicine_id in medicine_ids:
+                entry["medicines"][str(medicine_id)] += 1
+                entry["used"] += 1
+
+        specs = []
+        for district, entry in per_district.items():
+            n = entry["created"]
+            if created:
+                specs.append(RollupService._inc_spec(day, district, TREATMENTS_CREATED, {}, n))
+            specs += [
+                RollupService._inc_spec(day, district, TREATMENTS_DIAGNOSED, entry["outcomes"], n),
+                RollupService._inc_spec(day, district, VET_VISITS, {str(vet_id): n}, n),
+                RollupService._inc_spec(
+                    day, district, MEDICINE_USAGE, entry["medicines"], entry["used"]
+                ),
+            ]
+
+        RollupService.collection().bulk_write(
+            [UpdateOne(query, update, upsert=True) for query, update in specs],
+            ordered=False
+        )
+
+    # -----------------------------------------------------
+    # Read path (one range query per chart)
+    # -----------------------------------------------------
+    @staticmethod
+    def fetch(metric, since_day=None, until_day=None, district=None):
+        query = {"metric": metric}
+        day_range = {}
+        if since_day:
+            day_range["$gte"] = since_day
+        if until_day:
+            day_range["$lte"] = until_day
+        if day_range:
+            query["day"] = day_range
+        if district:
+            query["district"] = district
+
+        return list(RollupService.collection().find(
+            query, {"day": 1, "total": 1, "counts": 1, "_id": 0}
+        ))
+
+    @staticmethod
+    def totals_by_day(metric, since_day=None, district=None):
+        totals = defaultdict(int)
+        for row in RollupService.fetch(metric, since_day, district=district):
+            totals[row["day"]] += row.get("total", 0)
+        return totals
+
+    @staticmethod
+    def counts(metric, since_day=None, district=None):
+        merged = defaultdict(int)
+        for row in RollupService.fetch(metric, since_day, district=district):
+            for key, n in (row.get("counts") or {}).items():
+                merged[key] += n
+        return merged
+
+    # -----------------------------------------------------
+    # Rebuild (backfill) from the source collections
+    # -----------------------------------------------------
+    @staticmethod
+    def rebuild(since=None, batch_size=1000):
+        """
+        Recompute rollups for days on/after `since` (a datetime, taken
+        from the start of its day; None = everything) from treatments and
+        animals. A treatment counts as created on its created_at day and
+        as diagnosed on its treatment_start_date day, so one created
+        before `since` but diagnosed after it is still counted.
+
+        Rebuilt rollups are written with $set (no empty window for the
+        dashboard); rollups in the range that the sources no longer
+        produce are deleted afterwards. Live $inc writes to keys created
+        during the rebuild are kept; a write landing between the scan and
+        the $set of its key can still be lost or double counted, so run
+        it off-peak. Returns the number of rollup documents written.
+        """
+        since_day = day_key(since) if since else None
+        if since:
+            since = datetime(since.year, since.month, since.day)
+
+        def in_range(day):
+            return since_day is None or day >= since_day
+
+        acc = defaultdict(lambda: {"total": 0, "counts": defaultdict(int)})
+
+        def bump(day, farmer_id, metric, key=None, amount=1):
+            entry = acc[(day, district_for_farmer(str(farmer_id) if farmer_id else None), metric)]
+            entry["total"] += amount
+            if key:
+                entry["counts"][key] += amount
+
+        rollups = RollupService.collection()
+        in_range_query = {"day": {"$gte": since_day}} if since_day else {}
+        # Keys that exist before the scan; whatever of these the rebuild
+        # does not produce again is stale
+        existing = {doc["_id"] for doc in rollups.find(in_range_query, {"_id": 1})}
+
+        treatment_match = {
+            "$or": [
+                {"created_at": {"$gte": since}},
+                {"treatment_start_date": {"$gte": since}},
+            ]
+        } if since else {}
+
+        treatments = DB.treatments.find(
+            treatment_match,
+            {"farmer": 1, "vet": 1, "status": 1, "medicines.medicine": 1,
+             "is_flagged_violation": 1, "created_at": 1, "treatment_start_date": 1}
+        ).batch_size(batch_size)
+
+        for t in treatments:
+            farmer_id = t.get("farmer")
+            created_day = day_key(t["created_at"])
+            if in_range(created_day):
+                bump(created_day, farmer_id, TREATMENTS_CREATED)
+
+            if t.get("status") not in ("diagnosed", "completed"):
+                continue
+            day = day_key(t.get("treatment_start_date") or t["created_at"])
+            if not in_range(day):
+                continue
+            outcome = "violation" if t.get("is_flagged_violation") else "compliant"
+            bump(day, farmer_id, TREATMENTS_DIAGNOSED, outcome)
+            if t.get("vet"):
+                bump(day, farmer_id, VET_VISITS, str(t["vet"]))
+            for pm in t.get("medicines") or []:
+                bump(day, farmer_id, MEDICINE_USAGE, str(pm.get("medicine")))
+
+        animals = DB.animals.find(
+            {"created_at": {"$gte": since}} if since else {},
+            {"farmer": 1, "species": 1, "created_at": 1}
+        ).batch_size(batch_size)
+
+        for a in animals:
+            bump(day_key(a["created_at"]), a.get("farmer"), ANIMALS_REGISTERED, a.get("species"))
+
+        ops = [
+            UpdateOne(
+                {"_id": f"{day}|{district}|{metric}"},
+                {"$set": {
+                    "day": day, "district": district, "metric": metric,
+                    "total": entry["total"], "counts": dict(entry["counts"]),
+                }},
+                upsert=True
+            )
+            for (day, district, metric), entry in acc.items()
+        ]
+        for start in range(0, len(ops), batch_size):
+            rollups.bulk_write(ops[start:start + batch_size], ordered=False)
+
+        stale = list(existing - {f"{day}|{district}|{metric}" for day, district, metric in acc})
+        for start in range(0, len(stale), batch_size):
+            rollups.delete_many({"_id": {"$in": stale[start:start + batch_size]}})
+
+        return len(ops)
+
+    @staticmethod
+    def months_back(n, now=None):
+        """First day of each of the last n months (oldest first)."""
+        now = now or datetime.utcnow()
+        year, month = now.year, now.month
+        months = []
+        for _ in range(n):
+            months.append(datetime(year, month, 1))
+            month -= 1
+            if month == 0:
+                year, month = year - 1, 12
+        return list(reversed(months))
+
+    @staticmethod
+    def days_back(n, now=None):
+        now = now or datetime.utcnow()
+        return [now - timedelta(days=i) for i in reversed(range(n))]
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+
+from app.config import Config
+
+
+class SafetyCache:
+    """
+    Per-farmer consumer safety results, cached in-process.
+
+    An entry lives until the earliest withdrawal on the farm ends (the
+    next moment the answer can change), capped at
+    SAFETY_CACHE_MAX_TTL_SECONDS. The worker that records a new
+    withdrawal drops the entry immediately; other workers converge
+    within the cap.
+    """
+
+    _lock = threading.Lock()
+    _entries = {}  # farmer_id -> (payload, etag, expires_at)
+
+    @staticmethod
+    def make_etag(payload):
+        raw = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha1(raw).hexdigest()
+
+    @classmethod
+    def get(cls, farmer_id):
+        entry = cls._entries.get(farmer_id)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            cls.invalidate(farmer_id)
+            return None
+        return entry
+
+    @classmethod
+    def put(cls, farmer_id, payload, earliest_safe_from=None):
+        ttl = Config.SAFETY_CACHE_MAX_TTL_SECONDS
+        if earliest_safe_from is not None:
+            remaining = (earliest_safe_from - datetime.utcnow()).total_seconds()
+            ttl = max(0, min(ttl, remaining))
+
+        entry = (payload, cls.make_etag(payload), time.monotonic() + ttl)
+        with cls._lock:
+            if len(cls._entries) >= Config.SAFETY_CACHE_MAX_ENTRIES:
+                cls._evict()
+            cls._entries[farmer_id] = entry
+        return entry
+
+    @classmethod
+    def invalidate(cls, farmer_id):
+        with cls._lock:
+            cls._entries.pop(str(farmer_id), None)
+
+    @classmethod
+    def _evict(cls):
+        now = time.monotonic()
+        expired = [k for k, v in cls._entries.items() if v[2] <= now]
+        for key in expired:
+            del cls._entries[key]
+        # Still full: drop the entries closest to expiry
+        overflow = len(cls._entries) - Config.SAFETY_CACHE_MAX_ENTRIES + 1
+        if overflow > 0:
+            for key in sorted(cls._entries, key=lambda k: cls._entries[k][2])[:overflow]:
+                del cls._entries[key]
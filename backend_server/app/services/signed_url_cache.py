@@ -0,0 +1,66 @@
+import threading
+import time
+
+from app.config import Config
+
+
+class SignedUrlCache:
+    """
+    Signed storage URLs cached in-process, keyed by storage path.
+
+    A URL is served from cache until SIGNED_URL_REFRESH_MARGIN_SECONDS
+    before it expires, so clients never receive one that is about to
+    stop working. When full, expired entries go first, then those
+    closest to expiry.
+    """
+
+    _lock = threading.Lock()
+    _entries = {}  # path -> (url, expires_at monotonic)
+
+    @classmethod
+    def get(cls, path):
+        entry = cls._entries.get(path)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            cls.invalidate(path)
+            return None
+        return entry[0]
+
+    @classmethod
+    def get_many(cls, paths):
+        """Returns ({path: url} for hits, [missing paths])."""
+        hits, misses = {}, []
+        for path in paths:
+            url = cls.get(path)
+            if url is None:
+                misses.append(path)
+            else:
+                hits[path] = url
+        return hits, misses
+
+    @classmethod
+    def put(cls, path, url, expires_in):
+        ttl = expires_in - Config.SIGNED_URL_REFRESH_MARGIN_SECONDS
+        if ttl <= 0:
+            return
+        with cls._lock:
+            if len(cls._entries) >= Config.SIGNED_URL_CACHE_MAX_ENTRIES:
+                cls._evict()
+            cls._entries[path] = (url, time.monotonic() + ttl)
+
+    @classmethod
+    def invalidate(cls, path):
+        with cls._lock:
+            cls._entries.pop(path, None)
+
+    @classmethod
+    def _evict(cls):
+        now = time.monotonic()
+        expired = [k for k, v in cls._entries.items() if v[1] <= now]
+        for key in expired:
+            del cls._entries[key]
+        overflow = len(cls._entries) - Config.SIGNED_URL_CACHE_MAX_ENTRIES + 1
+        if overflow > 0:
+            for key in sorted(cls._entries, key=lambda k: cls._entries[k][1])[:overflow]:
+                del cls._entries[key]
@@ -0,0 +1,247 @@
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import requests
+from flask import has_request_context, url_for
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.config import Config
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpen
+from app.utils.log import get_logger
+from app.utils.metrics import observe_outbound
+
+log = get_logger("storage")
+
+
+class StorageError(Exception):
+    pass
+
+
+class StorageUnavailable(StorageError):
+    """Backend unreachable or circuit open; callers should answer 503."""
+
+
+class StorageBackend(ABC):
+    """
+    Where object bytes live. Paths are opaque strings chosen by
+    StorageService; a backend only stores bytes and signs read URLs.
+    """
+
+    @abstractmethod
+    def upload(self, storage_path, body, content_type):
+        """Store `body` (bytes or a file-like object) at `storage_path`."""
+
+    @abstractmethod
+    def sign(self, paths, expires_in):
+        """{path: url} for the paths that exist; missing ones are left out."""
+
+
+# ============================================================
+# SUPABASE (HTTP)
+# ============================================================
+
+# One breaker per process: every client talks to the same backend,
+# so they share its health.
+_breaker = CircuitBreaker(
+    "storage", Config.STORAGE_BREAKER_FAILURES, Config.STORAGE_BREAKER_RESET_SECONDS
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def breaker_open():
+    return int(_breaker.state != CircuitBreaker.CLOSED)
+
+
+def _shared_session():
+    """Keep-alive session with a bounded pool and retry/backoff (per process)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=Config.STORAGE_RETRIES,
+                    connect=Config.STORAGE_RETRIES,
+                    read=Config.STORAGE_RETRIES,
+                    status=Config.STORAGE_RETRIES,
+                    backoff_factor=Config.STORAGE_BACKOFF_SECONDS,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    # uploads use x-upsert to unique paths, so POST is safe to retry
+                    allowed_methods=frozenset({"GET", "HEAD", "POST", "DELETE"}),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=Config.STORAGE_POOL_SIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+class SupabaseBackend(StorageBackend):
+    def __init__(self, url=None, key=None, bucket=None, session=None):
+        # url/session are injectable, e.g. a local stand-in for the
+        # Supabase storage API
+        self.url = url or os.getenv("SUPABASE_URL")
+        self.key = key or os.getenv("SUPABASE_SERVICE_KEY")  # service_role key (SECRET)
+        self.bucket = bucket or os.getenv("SUPABASE_BUCKET", "dfms")
+        self.session = session
+
+        self.headers = {
+            "apikey": self.key,
+            "Authorization": f"Bearer {self.key}",
+        }
+        self.timeout = (Config.STORAGE_CONNECT_TIMEOUT_SECONDS, Config.STORAGE_READ_TIMEOUT_SECONDS)
+
+    # Transport: pooled session + timeouts + circuit breaker
+    def _post(self, operation, url, **kwargs):
+        try:
+            _breaker.before_call()
+        except CircuitOpen as e:
+            raise StorageUnavailable(str(e))
+
+        session = self.session or _shared_session()
+        try:
+            with observe_outbound("supabase", operation):
+                response = session.post(url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            _breaker.record_failure()
+            log.warning("storage %s failed: %s", operation, e)
+            raise StorageUnavailable(f"Storage {operation} failed: {e.__class__.__name__}")
+
+        # 5xx (after retries) counts against the backend; 4xx is our request
+        if response.status_code >= 500:
+            _breaker.record_failure()
+        else:
+            _breaker.record_success()
+        return response
+
+    def upload(self, storage_path, body, content_type):
+        upload_url = f"{self.url}/storage/v1/object/{self.bucket}/{storage_path}"
+
+        response = self._post(
+            "upload", upload_url,
+            headers={**self.headers, "Content-Type": content_type, "x-upsert": "true"},
+            data=body
+        )
+
+        if response.status_code not in (200, 201):
+            raise StorageError(f"Supabase upload failed: {response.text}")
+
+    def sign(self, paths, expires_in):
+        # Batch endpoint even for one path: it reports missing objects
+        # (e.g. a thumbnail not built yet) per path instead of failing
+        res = self._post(
+            "sign_batch", f"{self.url}/storage/v1/object/sign/{self.bucket}",
+            headers=self.headers, json={"expiresIn": expires_in, "paths": paths}
+        )
+        if res.status_code != 200:
+            raise StorageError(f"Signed URL generation failed: {res.text}")
+
+        urls = {}
+        for item in res.json():
+            if item.get("error") or not item.get("signedURL"):
+                log.warning("cannot sign %s: %s", item.get("path"), item.get("error"))
+                continue
+            urls[item["path"]] = f"{self.url}{item['signedURL']}"
+        return urls
+
+
+# ============================================================
+# LOCAL FILESYSTEM (content-addressed, network-free)
+#   <root>/objects/<sha[:2]>/<sha>   the bytes, stored once
+#   <root>/paths/<storage path>      hard link to the object
+# Read URLs point at /uploads/files/<path> with an HMAC signature.
+# ============================================================
+def file_signature(storage_path, expires):
+    message = f"{storage_path}\n{expires}".encode()
+    return hmac.new(Config.FILE_SIGNING_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_file_signature(storage_path, expires, signature):
+    try:
+        if int(expires) < time.time():
+            return False
+    except (TypeError, ValueError):
+        return False
+    return hmac.compare_digest(file_signature(storage_path, expires), signature or "")
+
+
+def _file_url(path, expires, signature):
+    if has_request_context():
+        return url_for(
+            "upload.serve_file", storage_path=path,
+            expires=expires, sig=signature, _external=True
+        )
+    return f"/uploads/files/{path}?expires={expires}&sig={signature}"
+
+
+class LocalBackend(StorageBackend):
+    def __init__(self, root=None, url_builder=None):
+        self.root = os.path.abspath(root or Config.LOCAL_STORAGE_ROOT)
+        self.url_builder = url_builder or _file_url
+
+    def _safe(self, *parts):
+        full = os.path.abspath(os.path.join(self.root, *parts))
+        if not full.startswith(self.root + os.sep):
+            raise StorageError("Invalid storage path")
+        return full
+
+    def path_for(self, storage_path):
+        return self._safe("paths", storage_path)
+
+    def upload(self, storage_path, body, content_type):
+        os.makedirs(self._safe("tmp"), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._safe("tmp"))
+        hasher = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if isinstance(body, (bytes, bytearray)):
+                    hasher.update(body)
+                    tmp.write(body)
+                else:
+                    for chunk in iter(lambda: body.read(64 * 1024), b""):
+                        hasher.update(chunk)
+                        tmp.write(chunk)
+
+            digest = hasher.hexdigest()
+            obj = self._safe("objects", digest[:2], digest)
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            if os.path.exists(obj):
+                os.unlink(tmp_path)  # same bytes already stored
+            else:
+                os.replace(tmp_path, obj)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        target = self.path_for(storage_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.unlink(target)  # upsert semantics, like the Supabase backend
+        try:
+            os.link(obj, target)
+        except OSError:
+            shutil.copyfile(obj, target)  # filesystems without hard links
+
+    def sign(self, paths, expires_in):
+        expires = int(time.time()) + expires_in
+        return {
+            path: self.url_builder(path, expires, file_signature(path, expires))
+            for path in paths
+            if os.path.exists(self.path_for(path))
+        }
@@ -1,53 +1,228 @@
+import hashlib
 import os
 import uuid
-import requests
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import Config
+from app.models.stored_file import StoredFile
+from app.services.signed_url_cache import SignedUrlCache
+from app.services.image_derivatives import derivative_path, is_image_path
+from app.services.storage_backends import (
+    StorageError, StorageUnavailable, SupabaseBackend, LocalBackend, breaker_open,
+)
+from app.utils.log import get_logger
+
+log = get_logger("storage")
+
+
+class UploadTooLarge(StorageError):
+    pass
+
+
+class HashingReader:
+    """
+    File-like wrapper handed to the backend as the upload body: it is
+    read in small blocks, so the file is never held in memory,
+    and the sha256 is computed as the bytes go out.
+
+    `stream` must be seekable (Werkzeug spools uploads to a temp file).
+    Size is checked up front; urllib3 rewinds via seek(0) on retry,
+    which restarts the hash.
+    """
+
+    def __init__(self, stream, max_bytes):
+        self._stream = stream
+        self._start = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        self.size = stream.tell() - self._start
+        stream.seek(self._start)
+
+        if self.size > max_bytes:
+            raise UploadTooLarge(f"File exceeds {max_bytes} bytes")
+        self._reset()
+
+    def _reset(self):
+        self._hasher = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self._stream.read(size)
+        self.bytes_read += len(chunk)
+        self._hasher.update(chunk)
+        return chunk
+
+    def tell(self):
+        return self._stream.tell() - self._start
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence != os.SEEK_SET or offset != 0:
+            raise OSError("HashingReader only supports rewinding to the start")
+        self._stream.seek(self._start)
+        self._reset()
+        return 0
+
+    def __len__(self):
+        return self.size
+
+    def prehash(self):
+        """Hash the whole stream locally (for dedup), then rewind."""
+        for _ in iter(lambda: self.read(64 * 1024), b""):
+            pass
+        digest = self.hexdigest()
+        self.seek(0)
+        return digest
+
+    def hexdigest(self):
+        if self.bytes_read != self.size:
+            raise StorageError("Upload body was not fully read")
+        return self._hasher.hexdigest()
+
 
 class StorageService:
-    def __init__(self):
-        self.url = os.getenv("SUPABASE_URL")
-        self.key = os.getenv("SUPABASE_SERVICE_KEY")  # service_role key (SECRET)
-        self.bucket = os.getenv("SUPABASE_BUCKET", "dfms")
-
-        self.headers = {
-            "apikey": self.key,
-            "Authorization": f"Bearer {self.key}",
-        }
+    @staticmethod
+    def breaker_open():
+        """1 while the storage circuit is open/half-open (for /metrics)."""
+        return breaker_open()
+
+    def __init__(self, url=None, key=None, bucket=None, session=None, backend=None):
+        if backend is None:
+            if Config.STORAGE_BACKEND == "local":
+                backend = LocalBackend()
+            else:
+                backend = SupabaseBackend(url, key, bucket, session)
+        self.backend = backend
 
     # -----------------------------------------------------
-    # Upload raw file bytes to Supabase
+    # Upload raw file bytes (or a file-like body)
     # -----------------------------------------------------
     def upload_file(self, storage_path, file_bytes, content_type="application/octet-stream"):
-        upload_url = f"{self.url}/storage/v1/object/{self.bucket}/{storage_path}"
+        self.backend.upload(storage_path, file_bytes, content_type)
+        return storage_path
 
-        response = requests.post(
-            upload_url,
-            headers={**self.headers, "Content-Type": content_type},
-            data=file_bytes
-        )
+    # -----------------------------------------------------
+    # Stream a file-like object to storage (bounded memory)
+    # Returns (storage_path, sha256 hex, size in bytes, deduplicated)
+    #
+    # Identical bytes uploaded before to the same folder (one owner's
+    # farmers/<id>, animals/<id>, ...) are not sent again: the content
+    # hash index answers with the earlier path. Other folders never get
+    # a path outside their own.
+    # -----------------------------------------------------
+    def upload_stream(self, storage_path, stream, content_type="application/octet-stream",
+                      max_bytes=None, dedupe=True):
+        reader = HashingReader(stream, max_bytes or Config.MAX_UPLOAD_BYTES)
 
-        if response.status_code not in (200, 201):
-            raise Exception(f"Supabase upload failed: {response.text}")
+        if not dedupe:
+            self.upload_file(storage_path, reader, content_type)
+            return storage_path, reader.hexdigest(), reader.size, False
 
-        return storage_path
+        digest = reader.prehash()
+        key = f"{os.path.dirname(storage_path)}|{digest}"
+        index = StoredFile._get_collection()
+        existing = index.find_one({"_id": key}, {"path": 1})
+        if existing:
+            log.debug("dedup hit %s -> %s", key, existing["path"])
+            return existing["path"], digest, reader.size, True
+
+        self.upload_file(storage_path, reader, content_type)
+        if reader.hexdigest() != digest:
+            raise StorageError("File changed during upload")
+
+        try:
+            index.insert_one({
+                "_id": key, "path": storage_path, "size": reader.size,
+                "content_type": content_type, "created_at": datetime.utcnow(),
+            })
+        except DuplicateKeyError:
+            pass  # concurrent upload of the same bytes; both paths are valid
+        return storage_path, digest, reader.size, False
 
     # -----------------------------------------------------
     # Generate signed public URL
     # -----------------------------------------------------
-    def get_signed_url(self, storage_path, expires_in=3600 * 24 * 365):  # 1 year
-        signed_url_endpoint = f"{self.url}/storage/v1/object/sign/{self.bucket}/{storage_path}"
+    def get_signed_url(self, storage_path, expires_in=None):
+        url = self.sign_paths([storage_path], expires_in).get(storage_path)
+        if url is None:
+            raise StorageError(f"Signed URL generation failed: {storage_path} not found")
+        return url
 
-        data = {"expiresIn": expires_in}
+    # -----------------------------------------------------
+    # Sign many paths: cache first, then ONE batch call
+    # Returns {path: url}; paths the backend refuses are left out
+    # -----------------------------------------------------
+    def sign_paths(self, paths, expires_in=None):
+        expires_in = expires_in or Config.SIGNED_URL_EXPIRES_SECONDS
+        unique = list(dict.fromkeys(p for p in paths if p))
+        urls, missing = SignedUrlCache.get_many(unique)
 
-        res = requests.post(
-            signed_url_endpoint,
-            headers=self.headers,
-            json=data
-        )
+        if missing:
+            signed = self.backend.sign(missing, expires_in)
+            for path, url in signed.items():
+                SignedUrlCache.put(path, url, expires_in)
+            urls.update(signed)
 
-        if res.status_code != 200:
-            raise Exception(f"Signed URL generation failed: {res.text}")
+        return urls
 
-        return f"{self.url}{res.json()['signedURL']}"
+    # -----------------------------------------------------
+    # Add <name>_url / <name>_urls next to every <name>_path /
+    # <name>_paths field of a dict or list of dicts (in place).
+    # Image fields also get <name>_thumb_url(s); None until the
+    # derivative exists, so clients fall back to the original.
+    # -----------------------------------------------------
+    def attach_signed_urls(self, data, thumbnails=True):
+        docs = data if isinstance(data, list) else [data]
+
+        fields = []  # (doc, path key, value)
+        for doc in docs:
+            for key, value in list(doc.items()):
+                if value and (key.endswith("_path") or key.endswith("_paths")):
+                    fields.append((doc, key, value))
+
+        def thumb(path):
+            if thumbnails and is_image_path(path):
+                return derivative_path(path, "thumb")
+            return None
+
+        paths = []
+        for _, _, value in fields:
+            for path in (value if isinstance(value, list) else [value]):
+                paths.append(path)
+                paths.append(thumb(path))
+
+        try:
+            urls = self.sign_paths(paths)
+        except StorageError as e:
+            # Documents are still useful without URLs
+            log.warning("signing %s paths failed: %s", len(paths), e)
+            return data
+
+        for doc, key, value in fields:
+            if isinstance(value, list):
+                name = key[:-len("_paths")]
+                doc[name + "_urls"] = [urls.get(p) for p in value]
+                if thumbnails and any(is_image_path(p) for p in value):
+                    doc[name + "_thumb_urls"] = [urls.get(thumb(p)) for p in value]
+            else:
+                name = key[:-len("_path")]
+                doc[name + "_url"] = urls.get(value)
+                if thumb(value):
+                    doc[name + "_thumb_url"] = urls.get(thumb(value))
+        return data
+
+    # -----------------------------------------------------
+    # Upload + sign (same pooled connection on Supabase)
+    # -----------------------------------------------------
+    def upload_and_sign(self, storage_path, stream, content_type="application/octet-stream"):
+        path, sha256, size, deduplicated = self.upload_stream(storage_path, stream, content_type)
+        return {
+            "path": path,
+            "url": self.get_signed_url(path),
+            "sha256": sha256,
+            "size": size,
+            "deduplicated": deduplicated,
+        }
 
     # -----------------------------------------------------
     # Helper – Generate unique filename
@@ -0,0 +1,353 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import Config
+from app.db import DB
+from app.models.treatments import Treatment
+from app.models.prescribed_medicine import PrescribedMedicine
+from app.services.medicine_catalog import MedicineCatalog
+from app.services.rollup_service import RollupService
+from app.services.safety_cache import SafetyCache
+from app.utils.log import get_logger
+
+log = get_logger("treatments")
+
+
+class PrescriptionError(ValueError):
+    pass
+
+
+def _object_ids(raw_ids, errors):
+    """Parse ids in order, dropping duplicates; bad ones go to `errors`."""
+    parsed, seen = [], set()
+    for raw in raw_ids:
+        try:
+            oid = ObjectId(str(raw))
+        except (InvalidId, TypeError):
+            errors.append({"id": raw, "error": "Invalid id"})
+            continue
+        if oid in seen:
+            errors.append({"id": raw, "error": "Duplicate id"})
+            continue
+        seen.add(oid)
+        parsed.append(oid)
+    return parsed
+
+
+def _withdrawal_days(value):
+    """Non-negative int from JSON (int or digit string), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, int) and value >= 0:
+        return value
+    if isinstance(value, float) and value.is_integer() and value >= 0:
+        return int(value)
+    return None
+
+
+def _failed_indexes(error):
+    return {e["index"] for e in error.details.get("writeErrors", [])}
+
+
+class TreatmentService:
+
+    # --------------------------------------------------------
+    # Medicines — validated against the authorized catalog
+    # --------------------------------------------------------
+    @staticmethod
+    def prescribe(medicines_input):
+        """
+        Resolve the request's medicines against the catalog.
+        Returns (prescribed, max_withdrawal_days); raises PrescriptionError.
+        The strictest (longest) withdrawal of all medicines wins.
+        """
+        if not medicines_input or not isinstance(medicines_input, list):
+            raise PrescriptionError("Medicines list required")
+
+        # Item-level input errors are collected and reported together
+        invalid = []
+        for i, m in enumerate(medicines_input):
+            if not isinstance(m, dict):
+                invalid.append(f"medicines[{i}]: must be an object")
+            elif m.get("vet_withdrawal_days") is not None and _withdrawal_days(m["vet_withdrawal_days"]) is None:
+                invalid.append(f"medicines[{i}]: vet_withdrawal_days must be a non-negative integer")
+        if invalid:
+            raise PrescriptionError("; ".join(invalid))
+
+        prescribed = []
+        max_withdrawal_days = 0
+
+        for m in medicines_input:
+            medicine_id = m.get("medicine_id")
+            medicine_name = m.get("name")
+            if not medicine_id and not medicine_name:
+                raise PrescriptionError("medicine_id is required")
+
+            if medicine_id:
+                authorized = MedicineCatalog.get(medicine_id)
+            else:
+                authorized = MedicineCatalog.get_by_name(medicine_name)
+            if not authorized:
+                raise PrescriptionError("Unauthorized medicine selected")
+
+            vet_days = m.get("vet_withdrawal_days")
+            if vet_days is not None:
+                vet_days = _withdrawal_days(vet_days)
+
+            # A vet may extend the withdrawal, never shorten it
+            final_withdrawal_days = authorized.withdrawal_period_days
+            if vet_days is not None:
+                if vet_days < authorized.withdrawal_period_days:
+                    log.warning(
+                        "vet tried to reduce withdrawal (%s < %s) → blocked",
+                        vet_days, authorized.withdrawal_period_days
+                    )
+                else:
+                    final_withdrawal_days = vet_days
+
+            log.debug(
+                "medicine %s: authorized=%s vet=%s final=%s",
+                authorized.name, authorized.withdrawal_period_days,
+                vet_days, final_withdrawal_days
+            )
+
+            prescribed.append(
+                PrescribedMedicine(
+                    medicine=authorized,
+                    dosage=authorized.dosage,
+                    frequency=authorized.frequency,
+                    duration_days=authorized.duration_days,
+                    withdrawal_period_days=final_withdrawal_days
+                )
+            )
+            max_withdrawal_days = max(max_withdrawal_days, final_withdrawal_days)
+
+        return prescribed, max_withdrawal_days
+
+    # --------------------------------------------------------
+    # Status transitions — conditional, single-document updates
+    # --------------------------------------------------------
+    @staticmethod
+    def mark_diagnosed(treatment_id, vet_id, prescribed, max_withdrawal_days, notes=None):
+        """
+        pending → diagnosed in one findAndModify. Returns the updated
+        Treatment, or None if it was no longer pending.
+        """
+        now = datetime.utcnow()
+        return Treatment.objects(id=treatment_id, status="pending").modify(
+            new=True,
+            set__vet=ObjectId(vet_id),
+            set__medicines=prescribed,
+            set__notes=notes,
+            set__status="diagnosed",
+            set__treatment_start_date=now,
+            set__withdrawal_ends_on=now + timedelta(days=max_withdrawal_days),
+            set__updated_at=now,
+        )
+
+    @staticmethod
+    def check_batch_size(ids):
+        if not ids or not isinstance(ids, list):
+            raise PrescriptionError("A non-empty list of ids is required")
+        if len(ids) > Config.TREATMENT_BATCH_MAX:
+            raise PrescriptionError(f"At most {Config.TREATMENT_BATCH_MAX} items per batch")
+
+    # --------------------------------------------------------
+    # Shared tail: alerts, animal status, cache, rollups
+    # --------------------------------------------------------
+    @staticmethod
+    def _after_diagnosis(diagnosed, safe_from, vet_id, medicine_ids, created, now):
+        """
+        `diagnosed` is [(treatment_id, animal_id, farmer_id)]. One insert
+        for the alerts, one bulk_write for the animals, one for rollups.
+        """
+        DB.withdrawal_alerts.insert_many([
+            {
+                "treatment_id": str(treatment_id),
+                "animal_id": str(animal_id),
+                "safe_from": safe_from,
+                "alert_sent": False,
+                "created_at": now,
+            }
+            for treatment_id, animal_id, _ in diagnosed
+        ], ordered=False)
+
+        DB.animals.bulk_write([
+            UpdateOne({"_id": animal_id}, {"$max": {"withdrawal_safe_from": safe_from}})
+            for _, animal_id, _ in diagnosed
+        ], ordered=False)
+
+        for farmer_id in {farmer_id for _, _, farmer_id in diagnosed}:
+            SafetyCache.invalidate(farmer_id)
+
+        RollupService.record_batch_diagnosis(
+            [(farmer_id, False, medicine_ids) for _, _, farmer_id in diagnosed],
+            vet_id=vet_id, created=created, when=now
+        )
+
+    # --------------------------------------------------------
+    # Camp: create + diagnose a treatment per animal
+    # --------------------------------------------------------
+    @staticmethod
+    def run_camp(vet_id, animal_ids, medicines_input, symptoms=None, notes=None):
+        """
+        Returns {"created": [...], "errors": [...]}. Raises
+        PrescriptionError when the batch as a whole is invalid.
+        """
+        TreatmentService.check_batch_size(animal_ids)
+        prescribed, max_days = TreatmentService.prescribe(medicines_input)
+
+        errors = []
+        ids = _object_ids(animal_ids, errors)
+
+        owners = {
+            a["_id"]: a["farmer"]
+            for a in DB.animals.find({"_id": {"$in": ids}}, {"farmer": 1})
+        }
+        for oid in ids:
+            if oid not in owners:
+                errors.append({"id": str(oid), "error": "Animal not found"})
+        ids = [oid for oid in ids if oid in owners]
+        if not ids:
+            return {"created": [], "errors": errors}
+
+        now = datetime.utcnow()
+        safe_from = now + timedelta(days=max_days)
+        medicines = [pm.to_mongo() for pm in prescribed]
+
+        docs = []
+        for oid in ids:
+            treatment = Treatment(
+                id=ObjectId(),
+                farmer=owners[oid],
+                animal=oid,
+                vet=ObjectId(vet_id),
+                symptoms=symptoms or [],
+                notes=notes,
+                status="diagnosed",
+                treatment_start_date=now,
+                withdrawal_ends_on=now + timedelta(days=max_days),
+                created_at=now,
+                updated_at=now,
+            )
+            doc = treatment.to_mongo()
+            doc["medicines"] = medicines
+            docs.append(doc)
+
+        failed = set()
+        try:
+            Treatment._get_collection().insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = _failed_indexes(e)
+            log.warning("camp insert: %s of %s treatments failed", len(failed), len(docs))
+
+        diagnosed = []
+        for i, doc in enumerate(docs):
+            if i in failed:
+                errors.append({"id": str(doc["animal"]), "error": "Could not save treatment"})
+            else:
+                diagnosed.append((doc["_id"], doc["animal"], doc["farmer"]))
+
+        medicine_ids = [pm.medicine.pk for pm in prescribed]
+        if diagnosed:
+            TreatmentService._after_diagnosis(
+                diagnosed, safe_from, vet_id, medicine_ids,
+                created=True, now=now
+            )
+
+        log.info("camp by vet %s: %s treatments, %s errors", vet_id, len(diagnosed), len(errors))
+        return {
+            "created": [
+                {"treatment_id": str(t), "animal_id": str(a)} for t, a, _ in diagnosed
+            ],
+            "errors": errors,
+            "final_withdrawal_days": max_days,
+            "safe_from": safe_from,
+        }
+
+    # --------------------------------------------------------
+    # Diagnose many pending treatments with one prescription
+    # --------------------------------------------------------
+    @staticmethod
+    def diagnose_many(vet_id, treatment_ids, medicines_input, notes=None):
+        TreatmentService.check_batch_size(treatment_ids)
+        prescribed, max_days = TreatmentService.prescribe(medicines_input)
+
+        errors = []
+        ids = _object_ids(treatment_ids, errors)
+
+        found = {
+            t["_id"]: t
+            for t in DB.treatments.find(
+                {"_id": {"$in": ids}}, {"status": 1, "animal": 1, "farmer": 1}
+            )
+        }
+
+        pending = []
+        for oid in ids:
+            t = found.get(oid)
+            if t is None:
+                errors.append({"id": str(oid), "error": "Treatment not found"})
+            elif t.get("status") != "pending":
+                errors.append({"id": str(oid), "error": "Already diagnosed"})
+            else:
+                pending.append(t)
+        if not pending:
+            return {"diagnosed": [], "errors": errors}
+
+        now = datetime.utcnow()
+        safe_from = now + timedelta(days=max_days)
+        batch_id = ObjectId()
+        update = {"$set": {
+            "vet": ObjectId(vet_id),
+            "medicines": [pm.to_mongo() for pm in prescribed],
+            "notes": notes,
+            "status": "diagnosed",
+            "treatment_start_date": now,
+            "withdrawal_ends_on": safe_from,
+            "diagnosis_batch": batch_id,
+            "updated_at": now,
+        }}
+
+        # status guard: a treatment diagnosed meanwhile is left untouched
+        result = DB.treatments.bulk_write(
+            [UpdateOne({"_id": t["_id"], "status": "pending"}, update) for t in pending],
+            ordered=False
+        )
+        if result.modified_count < len(pending):
+            # Rare race (another request, even by this vet, or a delete):
+            # only the treatments stamped with this batch are ours
+            ours = {
+                t["_id"] for t in DB.treatments.find(
+                    {"_id": {"$in": [t["_id"] for t in pending]}, "diagnosis_batch": batch_id},
+                    {"_id": 1}
+                )
+            }
+            for t in pending:
+                if t["_id"] not in ours:
+                    errors.append({"id": str(t["_id"]), "error": "No longer pending"})
+            pending = [t for t in pending if t["_id"] in ours]
+
+        diagnosed = [(t["_id"], t["animal"], t["farmer"]) for t in pending]
+        medicine_ids = [pm.medicine.pk for pm in prescribed]
+        if diagnosed:
+            TreatmentService._after_diagnosis(
+                diagnosed, safe_from, vet_id, medicine_ids,
+                created=False, now=now
+            )
+
+        log.info("bulk diagnose by vet %s: %s treatments, %s errors", vet_id, len(diagnosed), len(errors))
+        return {
+            "diagnosed": [
+                {"treatment_id": str(t), "animal_id": str(a)} for t, a, _ in diagnosed
+            ],
+            "errors": errors,
+            "final_withdrawal_days": max_days,
+            "safe_from": safe_from,
+        }
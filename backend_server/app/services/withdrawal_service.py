@@ -1,18 +1,21 @@
 from datetime import datetime, timedelta
+from bson import ObjectId
 from app.db import DB
 from app.models.withdrawal_alert import WithdrawalAlert
+from app.services.safety_cache import SafetyCache
+from app.utils.log import get_logger
+
+log = get_logger("withdrawal")
 
 class WithdrawalService:
 
     @staticmethod
     def create_withdrawal_alert(treatment_id, animal_id, withdrawal_days):
-        print("\n[WITHDRAWAL] create_withdrawal_alert() CALLED")
-        print(f"[WITHDRAWAL] treatment_id = {treatment_id}")
-        print(f"[WITHDRAWAL] animal_id    = {animal_id}")
-        print(f"[WITHDRAWAL] days         = {withdrawal_days}")
-
         safe_from = datetime.utcnow() + timedelta(days=withdrawal_days)
-        print(f"[WITHDRAWAL] safe_from    = {safe_from}")
+        log.debug(
+            "create_withdrawal_alert treatment_id=%s animal_id=%s days=%s safe_from=%s",
+            treatment_id, animal_id, withdrawal_days, safe_from
+        )
 
         alert = WithdrawalAlert(
             treatment_id=str(treatment_id),
@@ -21,72 +24,106 @@ class WithdrawalService:
         )
         alert.save()
 
-        print(f"[WITHDRAWAL] ALERT SAVED with id = {alert.id}")
+        # Keep the animal's denormalized status in sync ($max: a shorter
+        # withdrawal never shortens an existing one)
+        animal = DB.animals.find_one_and_update(
+            {'_id': ObjectId(animal_id)},
+            {'$max': {'withdrawal_safe_from': safe_from}},
+            projection={'farmer': 1}
+        )
+
+        # Farm answer changed → drop the cached consumer safety result
+        if animal and animal.get('farmer'):
+            SafetyCache.invalidate(animal['farmer'])
+
+        log.info("withdrawal alert saved id=%s animal_id=%s", alert.id, animal_id)
         return safe_from
 
     @staticmethod
     def check_animal_safety(animal_id):
-        print("\n[WITHDRAWAL] check_animal_safety()")
-        print(f"[WITHDRAWAL] animal_id = {animal_id}")
-        print("[WITHDRAWAL] USING PyMongo path")
-
-        active_alert = DB.withdrawal_alerts.find_one({
-            'animal_id': str(animal_id),
-            'safe_from': {'$gt': datetime.utcnow().isoformat()}
-        })
+        animal = DB.animals.find_one(
+            {'_id': ObjectId(animal_id)},
+            {'withdrawal_safe_from': 1}
+        )
+        safe_from = animal.get('withdrawal_safe_from') if animal else None
 
-        print(f"[WITHDRAWAL] active_alert FOUND? {bool(active_alert)}")
-        return active_alert is None
+        is_safe = safe_from is None or safe_from <= datetime.utcnow()
+        log.debug("check_animal_safety animal_id=%s safe_from=%s safe=%s", animal_id, safe_from, is_safe)
+        return is_safe
 
     @staticmethod
     def get_active_withdrawal_alerts_for_farmer(farmer_id):
-        print("\n[WITHDRAWAL] get_active_withdrawal_alerts_for_farmer()")
-        print(f"[WITHDRAWAL] farmer_id = {farmer_id}")
-        print("[WITHDRAWAL] USING PyMongo path")
-
-        animals = list(DB.animals.find({'farmer_id': farmer_id}))
-        print(f"[WITHDRAWAL] animals found = {len(animals)}")
-
-        animal_ids = []
-        for a in animals:
-            aid = str(a.get('_id'))
-            animal_ids.append(aid)
-
-        print(f"[WITHDRAWAL] animal_ids = {animal_ids}")
-
-        if not animal_ids:
-            print("[WITHDRAWAL] No animals → returning []")
-            return []
-
-        active_alerts = list(DB.withdrawal_alerts.find({
-            'animal_id': {'$in': animal_ids},
-            'safe_from': {'$gt': datetime.utcnow().isoformat()}
-        }))
+        """
+        Animals of a farmer that are still under withdrawal, one entry
+        per animal: {animal_id, tag_number, species, safe_from}.
+        Single query on the (farmer, withdrawal_safe_from) index.
+        """
+        animals = DB.animals.find(
+            {
+                'farmer': ObjectId(farmer_id),
+                'withdrawal_safe_from': {'$gt': datetime.utcnow()}
+            },
+            {'tag_number': 1, 'species': 1, 'withdrawal_safe_from': 1}
+        )
 
-        print(f"[WITHDRAWAL] active alerts found = {len(active_alerts)}")
+        active = [
+            {
+                'animal_id': str(a['_id']),
+                'tag_number': a.get('tag_number'),
+                'species': a.get('species'),
+                'safe_from': a['withdrawal_safe_from'],
+            }
+            for a in animals
+        ]
 
-        for alert in active_alerts:
-            alert['_id'] = str(alert['_id'])
+        log.debug("farmer_id=%s animals under withdrawal=%s", farmer_id, len(active))
+        return active
 
-        return active_alerts
+    @staticmethod
+    def get_farm_safety(farmer_id):
+        """
+        Whole-farm answer: safe when no animal is under withdrawal.
+        `safe_after` is the latest safe_from across the farm.
+        """
+        active = WithdrawalService.get_active_withdrawal_alerts_for_farmer(farmer_id)
+        safe_after = max((a['safe_from'] for a in active), default=None)
+        return {
+            'is_safe': not active,
+            'safe_after': safe_after,
+            'animals_under_withdrawal': active,
+        }
 
     @staticmethod
     def get_active_alerts_for_animals(animal_ids):
-        print("\n[WITHDRAWAL] get_active_alerts_for_animals()")
-        print("[WITHDRAWAL] USING MongoEngine path")
-        print(f"[WITHDRAWAL] animal_ids = {animal_ids}")
-        print(f"[WITHDRAWAL] now        = {datetime.utcnow()}")
+        log.debug("get_active_alerts_for_animals animal_ids=%s", animal_ids)
 
-        alerts = WithdrawalAlert.objects(
+        return WithdrawalAlert.objects(
             animal_id__in=animal_ids,
             safe_from__gt=datetime.utcnow()
         )
 
-        print(f"[WITHDRAWAL] alerts found = {alerts.count()}")
-        for a in alerts:
-            print(
-                f"[WITHDRAWAL] alert → id={a.id}, "
-                f"animal_id={a.animal_id}, safe_from={a.safe_from}"
+    @staticmethod
+    def backfill_animal_status():
+        """
+        One-off migration: copy the latest safe_from of every animal's
+        withdrawal alerts onto Animal.withdrawal_safe_from.
+        """
+        from pymongo import UpdateOne
+
+        latest = DB.withdrawal_alerts.aggregate([
+            {'$group': {'_id': '$animal_id', 'safe_from': {'$max': '$safe_from'}}}
+        ])
+
+        ops = [
+            UpdateOne(
+                {'_id': ObjectId(row['_id'])},
+                {'$max': {'withdrawal_safe_from': row['safe_from']}}
             )
-
-        return alerts
+            for row in latest
+            if row['_id'] and ObjectId.is_valid(row['_id'])
+        ]
+        if not ops:
+            return 0
+
+        result = DB.animals.bulk_write(ops, ordered=False)
+        return result.modified_count
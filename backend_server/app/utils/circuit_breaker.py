@@ -0,0 +1,79 @@
+import threading
+import time
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive failures, for
+    `reset_seconds`. Then lets one trial call through (half-open): success
+    closes the circuit, failure opens it again.
+
+        breaker = CircuitBreaker("supabase", 5, 30)
+        with breaker:
+            call_backend()
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold, reset_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._cooled_down():
+                return self.HALF_OPEN
+            return self._state
+
+    def _cooled_down(self):
+        return time.monotonic() - self._opened_at >= self.reset_seconds
+
+    def before_call(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and not self._cooled_down():
+                raise CircuitOpen(f"{self.name} unavailable (circuit open)")
+            # Cooled down: exactly one caller probes the backend
+            if self._trial_running:
+                raise CircuitOpen(f"{self.name} unavailable (circuit half-open)")
+            self._state = self.HALF_OPEN
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def __enter__(self):
+        self.before_call()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.record_success()
+        else:
+            self.record_failure()
+        return False
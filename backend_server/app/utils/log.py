@@ -0,0 +1,97 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import uuid
+from datetime import datetime
+
+from flask import g, has_request_context, request
+
+from app.config import Config
+
+ROOT_LOGGER = "app"
+
+_listener = None
+
+
+def get_logger(name):
+    """Logger under the app namespace, e.g. get_logger("treatments")."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Runs on the calling thread: stamps the request id and applies the
+    per-request debug sampling decision before the record is queued.
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get("request_id", "-")
+            if record.levelno <= logging.DEBUG and not g.get("log_sampled", True):
+                return False
+        else:
+            record.request_id = "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({
+            "ts": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the request thread: drops records when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def setup_logging(app):
+    """
+    Route every `app.*` logger through a bounded queue to a background
+    writer thread, and attach request-id / sampling hooks to `app`.
+    """
+    global _listener
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(Config.LOG_LEVEL)
+
+    if _listener is None:
+        log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+
+        queue_handler = DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(RequestContextFilter())
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        writer = logging.StreamHandler()
+        writer.setFormatter(JsonFormatter())
+
+        _listener = logging.handlers.QueueListener(log_queue, writer)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        g.log_sampled = random.random() < Config.LOG_DEBUG_SAMPLE_RATE
+
+    @app.after_request
+    def echo_request_id(response):
+        if "request_id" in g:
+            response.headers["X-Request-ID"] = g.request_id
+        return response
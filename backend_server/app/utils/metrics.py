@@ -0,0 +1,172 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# ============================================================
+# MINIMAL PROMETHEUS REGISTRY (text exposition format 0.0.4)
+# ============================================================
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, v in self._values.items():
+                lines.append(f"{self.name}{_label_str(self.labels, values)} {v}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for values, series in self._series.items():
+                for bound, n in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_label_str(names, values + (bound,))} {n}")
+                lines.append(f"{self.name}_bucket{_label_str(names, values + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labels, values)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labels, values)} {series[-1]}")
+        return lines
+
+
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency by endpoint",
+    ("endpoint", "method", "status")
+)
+HTTP_MONGO_COMMANDS = Histogram(
+    "http_request_mongo_commands", "Mongo commands issued per request",
+    ("endpoint",), COUNT_BUCKETS
+)
+MONGO_DURATION = Histogram(
+    "mongo_command_duration_seconds", "Mongo command latency",
+    ("command",)
+)
+MONGO_COMMANDS = Counter(
+    "mongo_commands_total", "Mongo commands by endpoint",
+    ("command", "endpoint", "outcome")
+)
+OUTBOUND_DURATION = Histogram(
+    "outbound_request_duration_seconds", "External API call latency",
+    ("service", "operation", "outcome")
+)
+
+REGISTRY = [HTTP_DURATION, HTTP_MONGO_COMMANDS, MONGO_DURATION, MONGO_COMMANDS, OUTBOUND_DURATION]
+
+
+def current_endpoint():
+    if has_request_context():
+        return request.endpoint or "unknown"
+    return "background"
+
+
+# ============================================================
+# MONGO COMMAND LISTENER
+# ============================================================
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Counts and times every command; attributes it to the current route."""
+
+    def _record(self, event, outcome):
+        MONGO_DURATION.observe(event.duration_micros / 1e6, event.command_name)
+        MONGO_COMMANDS.inc(event.command_name, current_endpoint(), outcome)
+        if has_request_context():
+            g._mongo_commands = g.get("_mongo_commands", 0) + 1
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+
+# ============================================================
+# OUTBOUND CALLS (Supabase, Twilio)
+# ============================================================
+@contextmanager
+def observe_outbound(service, operation):
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        OUTBOUND_DURATION.observe(time.perf_counter() - started, service, operation, outcome)
+
+
+# ============================================================
+# FLASK WIRING
+# ============================================================
+def setup_metrics(app):
+
+    @app.before_request
+    def start_request_timer():
+        g._request_started = time.perf_counter()
+        g._mongo_commands = 0
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get("_request_started")
+        if started is not None:
+            endpoint = current_endpoint()
+            HTTP_DURATION.observe(
+                time.perf_counter() - started,
+                endpoint, request.method, response.status_code
+            )
+            HTTP_MONGO_COMMANDS.observe(g.get("_mongo_commands", 0), endpoint)
+        return response
+
+
+def render(extra_gauges=None):
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    for name, (help, value) in (extra_gauges or {}).items():
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine.queryset.visitor import Q
+
+from app.config import Config
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# -----------------------------------------------------
+# Opaque cursor tokens over (created_at, _id)
+# -----------------------------------------------------
+def encode_cursor(created_at, doc_id):
+    raw = json.dumps({"t": created_at.isoformat(), "id": str(doc_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(raw["t"]), ObjectId(raw["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise InvalidCursor("Invalid cursor")
+
+
+def page_args(args):
+    """
+    Read ?limit=&cursor= from request args.
+    Returns (limit, cursor) where cursor is the raw token or None.
+    With neither param the limit is None: the whole list, as before
+    pagination, for clients that do not page.
+    """
+    if "limit" not in args and not args.get("cursor"):
+        return None, None
+
+    try:
+        limit = int(args.get("limit", Config.PAGE_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        limit = Config.PAGE_DEFAULT_LIMIT
+
+    limit = max(1, min(limit, Config.PAGE_MAX_LIMIT))
+    return limit, args.get("cursor") or None
+
+
+def keyset_page(queryset, limit, cursor=None, fields=None):
+    """
+    Newest-first page of `queryset` ordered by (created_at, _id).
+    Fetches limit + 1 rows to know whether there is a next page, so no
+    count() query is needed. Returns (items, next_cursor); limit=None
+    returns every row and no cursor.
+    """
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) |
+            (Q(created_at=created_at) & Q(id__lt=last_id))
+        )
+
+    if fields:
+        queryset = queryset.only(*set(fields) | {"id", "created_at"})
+
+    queryset = queryset.order_by("-created_at", "-id")
+    if limit is None:
+        return list(queryset), None
+
+    items = list(queryset.limit(limit + 1))
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return items, next_cursor
@@ -0,0 +1,48 @@
+from functools import lru_cache
+
+import phonenumbers
+
+from app.config import Config
+
+DEFAULT_REGION = "IN"
+
+
+@lru_cache(maxsize=Config.PHONE_CACHE_SIZE)
+def normalize_mobile(raw):
+    """
+    E.164 form of a mobile number ("98xxxxxxxx", "+91 98xxx xxxxx" and
+    "+9198xxxxxxxx" all give "+9198xxxxxxxx"), or None if invalid.
+    Numbers without a country code are read as Indian. Cached per
+    worker: the same few numbers hit send, verify and login in a row.
+    """
+    if not raw or not isinstance(raw, str):
+        return None
+    try:
+        parsed = phonenumbers.parse(raw.strip(), DEFAULT_REGION)
+    except phonenumbers.NumberParseException:
+        return None
+
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def mobile_variants(e164, raw=None):
+    """
+    Ways a number may have been stored before mobiles were normalized:
+    as typed, E.164, national digits (plain or grouped), and with a
+    bare country code or 0 prefix.
+    For matching legacy `mobile` fields not yet backfilled.
+    """
+    parsed = phonenumbers.parse(e164)
+    national = str(parsed.national_number)
+    country = str(parsed.country_code)
+    formatted = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.NATIONAL)
+    variants = {
+        e164, national, "0" + national, country + national,
+        phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.INTERNATIONAL),
+        formatted, formatted.lstrip("0"),
+    }
+    if raw and isinstance(raw, str):
+        variants |= {raw, raw.strip()}
+    return sorted(variants)
@@ -0,0 +1,131 @@
+import contextvars
+import threading
+import traceback
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from pymongo import monitoring
+
+from app.config import Config
+from app.utils.log import get_logger
+
+log = get_logger("query_budget")
+
+MODE_OFF = "off"
+MODE_LOG = "log"
+MODE_RAISE = "raise"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(max_commands):
+    """
+    Declare the most Mongo commands a route may issue per request.
+    Put it directly under the blueprint's @route decorator:
+
+        @treatments_bp.route('/<treatment_id>', methods=['GET'])
+        @query_budget(3)
+        @jwt_required()
+        def get_treatment(treatment_id): ...
+    """
+    def decorator(fn):
+        fn.query_budget = max_commands
+        return fn
+    return decorator
+
+
+def _app_frames():
+    # Only frames from our own code, minus this module — enough to find
+    # the line that issued the command without a full interpreter dump.
+    return [
+        f"{frame.filename}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()[:-3]
+        if "/app/" in frame.filename and "query_budget" not in frame.filename
+    ]
+
+
+_capture = threading.local()
+
+
+class QueryBudgetListener(monitoring.CommandListener):
+    """
+    Records every command started on the request (or capture) thread,
+    with the app stack that issued it. Only attached when
+    QUERY_BUDGET_MODE is not "off", so production pays nothing.
+    """
+
+    def started(self, event):
+        entry = (event.command_name, _app_frames())
+
+        captured = getattr(_capture, "commands", None)
+        if captured is not None:
+            captured.append(entry)
+
+        if has_request_context():
+            commands = g.get("_budget_commands")
+            if commands is None:
+                commands = g._budget_commands = []
+            commands.append(entry)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@contextmanager
+def capture_commands():
+    """
+    Collect (command_name, stack) for every command issued on this thread
+    inside the block; for asserting fixed query counts in tests.
+    """
+    previous = getattr(_capture, "commands", None)
+    _capture.commands = commands = []
+    try:
+        yield commands
+    finally:
+        _capture.commands = previous
+
+
+def submit_in_context(executor, fn, *args):
+    """
+    executor.submit(fn, *args), run in a copy of the caller's context
+    (Flask's request/app contexts are contextvars), so commands issued
+    on the worker thread count towards this request's budget and
+    per-route metrics like any other.
+    """
+    if has_request_context() and g.get("_budget_commands") is None:
+        g._budget_commands = []  # one shared list, not one per thread
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _report(endpoint, budget, commands):
+    lines = [f"{endpoint} issued {len(commands)} Mongo commands (budget {budget}):"]
+    for i, (name, stack) in enumerate(commands, 1):
+        where = stack[-1] if stack else "?"
+        lines.append(f"  {i}. {name} at {where}")
+    return "\n".join(lines)
+
+
+def setup_query_budget(app):
+    if Config.QUERY_BUDGET_MODE == MODE_OFF:
+        return
+
+    @app.after_request
+    def enforce_query_budget(response):
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "query_budget", None)
+        commands = g.get("_budget_commands") or []
+
+        if budget is None or len(commands) <= budget:
+            return response
+
+        report = _report(request.endpoint, budget, commands)
+        if Config.QUERY_BUDGET_MODE == MODE_RAISE:
+            raise QueryBudgetExceeded(report)
+
+        log.warning(report)
+        return response
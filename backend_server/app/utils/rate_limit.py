@@ -0,0 +1,98 @@
+import itertools
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import request
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app.config import Config
+from app.utils.responses import error_response
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets, one per key: `capacity` requests in a
+    burst, refilled at `refill_per_second`. Limits are per worker.
+    """
+
+    def __init__(self, capacity, refill_per_second, max_keys=100000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated_at)
+
+    def take(self, key):
+        """Returns (allowed, retry_after_seconds)."""
+        now = time.monotonic()
+        with self._lock:
+            # pop + reinsert keeps the dict in least-recently-used order
+            tokens, updated_at = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                allowed, retry_after = True, 0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed = False
+                retry_after = math.ceil((1 - tokens) / self.refill_per_second)
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no state
+        full = [
+            k for k, (tokens, updated_at) in self._buckets.items()
+            if tokens + (now - updated_at) * self.refill_per_second >= self.capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+
+        # Still too many (e.g. a flood of distinct keys): drop the least
+        # recently used down to 90%, so the next takes don't prune again
+        excess = len(self._buckets) - self.max_keys * 9 // 10
+        if excess > 0:
+            for key in list(itertools.islice(self._buckets, excess)):
+                del self._buckets[key]
+
+
+def setup_proxy_fix(app):
+    """
+    Behind TRUSTED_PROXY_HOPS reverse proxies, take the client address
+    and scheme from the X-Forwarded-* headers they append. Without it
+    every request seems to come from the proxy and shares its per-IP
+    buckets; trusting more hops than exist lets clients pick their IP.
+    """
+    if Config.TRUSTED_PROXY_HOPS > 0:
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app, x_for=Config.TRUSTED_PROXY_HOPS, x_proto=Config.TRUSTED_PROXY_HOPS
+        )
+
+
+def client_ip():
+    return request.remote_addr or "-"
+
+
+def rate_limit(limiter, key_func, message="Too many requests, try again later"):
+    """
+    Reject with 429 + Retry-After once `key_func()` runs out of tokens.
+    A key of None (e.g. missing field) is not limited here.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = key_func()
+            if key is not None:
+                allowed, retry_after = limiter.take(key)
+                if not allowed:
+                    response, status = error_response(message, 429)
+                    response.headers["Retry-After"] = str(retry_after)
+                    return response, status
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
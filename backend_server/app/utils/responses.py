@@ -1,18 +1,68 @@
-from flask import jsonify
-import json
+from flask import jsonify, current_app, Response, stream_with_context
 
-def success_response(data, status_code=200):
-    # If route passed a JSON string, convert back to dict
-    if isinstance(data, str):
-        try:
-            data = json.loads(data)
-        except:
-            pass  # If not JSON, keep as is
+STREAM_CHUNK_BYTES = 16 * 1024
 
-    return jsonify({
+
+class RawJSON(str):
+    """Already-encoded JSON (e.g. Document.to_json()); embedded verbatim."""
+
+
+def _encode(value):
+    if isinstance(value, RawJSON):
+        return value
+    return current_app.json.dumps(value)
+
+
+def success_response(data, status_code=200, meta=None):
+    # Data must already be JSON-serializable; it is never re-parsed.
+    # Pre-encoded documents go in as RawJSON and are spliced in as-is.
+    if isinstance(data, RawJSON):
+        body = '{"status":"success","data":' + data
+        if meta is not None:
+            body += ',"meta":' + _encode(meta)
+        return current_app.response_class(body + "}", mimetype="application/json"), status_code
+
+    body = {
         'status': 'success',
         'data': data
-    }), status_code
+    }
+    if meta is not None:
+        body['meta'] = meta
+
+    return jsonify(body), status_code
+
+
+def stream_success_response(items, serialize=None, meta=None, status_code=200):
+    """
+    Stream {"status":"success","data":[...],"meta":...} from an iterable
+    (e.g. a query cursor) without building the list in memory. `meta` may
+    be a callable, evaluated after the last item (e.g. a next cursor).
+    """
+    def generate():
+        yield '{"status":"success","data":['
+
+        buffer, size, first = [], 0, True
+        for item in items:
+            encoded = _encode(serialize(item) if serialize else item)
+            buffer.append(encoded if first else "," + encoded)
+            size += len(encoded) + 1
+            first = False
+            if size >= STREAM_CHUNK_BYTES:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        buffer.append("]")
+
+        meta_value = meta() if callable(meta) else meta
+        if meta_value is not None:
+            buffer.append(',"meta":' + _encode(meta_value))
+        buffer.append("}")
+        yield "".join(buffer)
+
+    return Response(
+        stream_with_context(generate()),
+        status=status_code,
+        mimetype="application/json"
+    )
 
 
 def error_response(message, status_code=400):
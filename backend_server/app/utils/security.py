@@ -1,2 +1,135 @@
-# Placeholder for security-related utilities
-# e.g., password hashing, JWT token handling (beyond flask-jwt-extended basics)
\ No newline at end of file
+# Security-related utilities beyond flask-jwt-extended basics:
+# role claims on access tokens, a request-scoped principal, and the
+# shared-token check for operational endpoints.
+import hmac
+from functools import wraps
+
+from flask import g, request
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+
+from app.config import Config
+from app.utils.responses import error_response
+
+ROLE_FARMER = "farmer"
+ROLE_VET = "vet"
+ROLE_AUTHORITY = "authority"
+
+
+def issue_access_token(identity, role, expires_delta=None, **claims):
+    """
+    Create an access token carrying the caller's role (and its id under
+    "<role>_id") so protected routes can authorize without a DB lookup.
+    """
+    additional_claims = {"role": role, f"{role}_id": str(identity), **claims}
+    return create_access_token(
+        identity=str(identity),
+        additional_claims=additional_claims,
+        expires_delta=expires_delta
+    )
+
+
+class Principal:
+    """
+    The authenticated caller. Built from JWT claims; the full
+    Farmer/Vet document is only loaded when `document` is accessed.
+    """
+
+    def __init__(self, id, role, claims=None, document=None):
+        self.id = id
+        self.role = role
+        self.claims = claims or {}
+        self._document = document
+
+    @property
+    def is_farmer(self):
+        return self.role == ROLE_FARMER
+
+    @property
+    def is_vet(self):
+        return self.role == ROLE_VET
+
+    @property
+    def is_authority(self):
+        return self.role == ROLE_AUTHORITY
+
+    @property
+    def document(self):
+        if self._document is None and self.role:
+            model = _model_for(self.role)
+            if model is not None:
+                self._document = model.objects(id=self.id).first()
+        return self._document
+
+
+def _model_for(role):
+    if role == ROLE_FARMER:
+        from app.models.farmers import Farmer
+        return Farmer
+    if role == ROLE_VET:
+        from app.models.vets import Vet
+        return Vet
+    if role == ROLE_AUTHORITY:
+        from app.models.authorities import Authority
+        return Authority
+    return None
+
+
+def _legacy_principal(identity, claims):
+    # Tokens issued before role claims existed: resolve the role once
+    # from the DB (farmer, then vet, then authority) and keep the doc.
+    from app.models.farmers import Farmer
+    from app.models.vets import Vet
+    from app.models.authorities import Authority
+
+    farmer = Farmer.objects(id=identity).first()
+    if farmer:
+        return Principal(identity, ROLE_FARMER, claims, farmer)
+
+    vet = Vet.objects(id=identity).first()
+    if vet:
+        return Principal(identity, ROLE_VET, claims, vet)
+
+    authority = Authority.objects(id=identity).first()
+    if authority:
+        return Principal(identity, ROLE_AUTHORITY, claims, authority)
+
+    return Principal(identity, None, claims)
+
+
+def current_principal():
+    """
+    Return the Principal for the current request (requires a verified
+    JWT, i.e. call inside a @jwt_required() route). Cached on `g`.
+    """
+    principal = g.get("_principal")
+    if principal is not None:
+        return principal
+
+    identity = get_jwt_identity()
+    claims = get_jwt()
+    role = claims.get("role")
+
+    if role:
+        principal = Principal(identity, role, claims)
+    else:
+        principal = _legacy_principal(identity, claims)
+
+    g._principal = principal
+    return principal
+
+
+def metrics_token_required(fn):
+    """
+    Allow the request only with "Authorization: Bearer <METRICS_TOKEN>".
+    For scrapers, which cannot log in; refuses everything when unset.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        expected = Config.METRICS_TOKEN
+        if not expected or scheme.lower() != "bearer" or not hmac.compare_digest(
+            token.strip().encode(), expected.encode()
+        ):
+            return error_response("Not allowed", 403)
+        return fn(*args, **kwargs)
+    return wrapper
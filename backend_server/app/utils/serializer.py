@@ -1,39 +1,126 @@
-from bson import ObjectId
+import threading
+
+from bson import ObjectId, DBRef
 from datetime import datetime
+from mongoengine import fields as me_fields
+
+
+# ============================================================
+# COMPILED SERIALIZERS
+# Built once per Document/EmbeddedDocument class from its field
+# definitions, so serializing a document never probes value types.
+# ============================================================
+_compiled = {}
+_building = {}  # in-progress compiles (recursive embedded docs)
+_compile_lock = threading.RLock()
+
+
+def _identity(value):
+    return value
+
+
+def _object_id(value):
+    return str(value)
+
+
+def _datetime(value):
+    return value.isoformat()
+
+
+def _reference(value):
+    # Stored value: DBRef / ObjectId when not dereferenced, Document otherwise
+    if isinstance(value, DBRef):
+        return str(value.id)
+    if isinstance(value, ObjectId):
+        return str(value)
+    return str(value.pk)
 
-class SerializerMixin:
-    def to_json(self):
-        mongo_dict = self.to_mongo().to_dict()
-        cleaned = self._clean(mongo_dict)
 
-        # Rename _id → id
-        if "_id" in cleaned:
-            cleaned["id"] = cleaned.pop("_id")
+def _converter(field):
+    if isinstance(field, me_fields.ObjectIdField):
+        return _object_id
+    if isinstance(field, me_fields.DateTimeField):
+        return _datetime
+    if isinstance(field, (me_fields.ReferenceField, me_fields.LazyReferenceField)):
+        return _reference
+    if isinstance(field, me_fields.EmbeddedDocumentField):
+        return compile_serializer(field.document_type)
+    if isinstance(field, me_fields.ListField):
+        inner = _converter(field.field) if field.field is not None else _clean
+        if inner is _identity:
+            return list
+        return lambda values: [inner(v) for v in values]
+    if isinstance(field, (me_fields.DictField, me_fields.GenericReferenceField)):
+        return _clean
+    return _identity
 
-        return cleaned
+
+def compile_serializer(doc_cls):
+    """
+    Return fn(doc) -> dict for `doc_cls`. Output matches the legacy
+    to_mongo()+_clean path: db_field keys, None values skipped (unless
+    null=True), ObjectId/datetime stringified, `_id` exposed as `id`.
+    """
+    serializer = _compiled.get(doc_cls)
+    if serializer is not None:
+        return serializer
+
+    with _compile_lock:
+        serializer = _compiled.get(doc_cls) or _building.get(doc_cls)
+        if serializer is None:
+            serializer = _build(doc_cls)
+        return serializer
+
+
+def _build(doc_cls):
+    plan = []
+
+    def serialize(doc):
+        data = doc._data
+        out = {}
+        for name, key, convert, keep_null in plan:
+            value = data.get(name)
+            if value is None:
+                if keep_null:
+                    out[key] = None
+                continue
+            out[key] = convert(value)
+        return out
+
+    _building[doc_cls] = serialize
+    try:
+        for name in doc_cls._fields_ordered:
+            field = doc_cls._fields[name]
+            key = "id" if field.db_field == "_id" else field.db_field
+            plan.append((name, key, _converter(field), field.null))
+    finally:
+        del _building[doc_cls]
+
+    # Publish only once the plan is complete
+    _compiled[doc_cls] = serialize
+    return serialize
+
+
+def _clean(value):
+    """Generic fallback for untyped values (DictField contents, etc.)."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "_fields_ordered"):
+        return compile_serializer(type(value))(value)
+    if isinstance(value, DBRef):
+        return str(value.id)
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    return value
+
+
+class SerializerMixin:
+    def to_json(self):
+        return compile_serializer(type(self))(self)
 
     def _clean(self, value):
-        # ObjectId → string
-        if isinstance(value, ObjectId):
-            return str(value)
-
-        # datetime → ISO string
-        if isinstance(value, datetime):
-            return value.isoformat()
-
-        # EmbeddedDocument
-        if hasattr(value, "to_mongo"):
-            return {
-                k: self._clean(v)
-                for k, v in value.to_mongo().to_dict().items()
-            }
-
-        # List
-        if isinstance(value, list):
-            return [self._clean(v) for v in value]
-
-        # Dict
-        if isinstance(value, dict):
-            return {k: self._clean(v) for k, v in value.items()}
-
-        return value
+        return _clean(value)
@@ -0,0 +1,312 @@
+import functools
+import os
+import sys
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# Config is read at import time: settle the test settings before any
+# app module is imported. TEST_MONGO_URI runs the suite against a local
+# mongod; without it the database is mongomock.
+os.environ["QUERY_BUDGET_MODE"] = "raise"
+os.environ["TEST_OTP_MODE"] = "true"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_ROOT"] = tempfile.mkdtemp(prefix="dfms-storage-")
+os.environ["IMAGE_DERIVATIVES_ENABLED"] = "false"
+os.environ["TRUSTED_PROXY_HOPS"] = "1"
+os.environ["MONGO_DB_NAME"] = "digital_farm_test"
+os.environ["MONGO_URI"] = os.environ.get("TEST_MONGO_URI", "mongodb://localhost:27017/")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import monitoring  # noqa: E402
+
+from app.db import DB  # noqa: E402
+from app.utils.security import issue_access_token  # noqa: E402
+
+
+# ============================================================
+# MONGOMOCK COMMAND EVENTS
+# ============================================================
+class MockCommandEvents:
+    """
+    mongomock has no command monitoring. Publish one started/succeeded
+    event per collection call, named like the wire command, so the
+    query budget guard and capture_commands() count what a real server
+    would see. Nested calls (find_one -> find) count once.
+    """
+
+    COMMANDS = {
+        "find": "find",
+        "find_one": "find",
+        "aggregate": "aggregate",
+        "count_documents": "aggregate",
+        "estimated_document_count": "count",
+        "distinct": "distinct",
+        "insert_one": "insert",
+        "insert_many": "insert",
+        "update_one": "update",
+        "update_many": "update",
+        "replace_one": "update",
+        "delete_one": "delete",
+        "delete_many": "delete",
+        "find_one_and_update": "findAndModify",
+        "find_one_and_replace": "findAndModify",
+        "find_one_and_delete": "findAndModify",
+        "bulk_write": "bulkWrite",
+        "create_index": "createIndexes",
+        "create_indexes": "createIndexes",
+    }
+
+    _local = threading.local()
+
+    def __init__(self, listeners):
+        self.listeners = listeners
+
+    def install(self, monkeypatch):
+        from mongomock.collection import Collection
+
+        for method, command in self.COMMANDS.items():
+            monkeypatch.setattr(Collection, method, self._wrap(getattr(Collection, method), command))
+
+    def _wrap(self, method, command_name):
+        events = self
+
+        @functools.wraps(method)
+        def publishing(collection, *args, **kwargs):
+            if getattr(events._local, "busy", False):
+                return method(collection, *args, **kwargs)
+
+            event = SimpleNamespace(
+                command_name=command_name,
+                database_name=collection.database.name,
+                duration_micros=0,
+            )
+            for listener in events.listeners:
+                listener.started(event)
+
+            events._local.busy = True
+            try:
+                result = method(collection, *args, **kwargs)
+            finally:
+                events._local.busy = False
+
+            for listener in events.listeners:
+                listener.succeeded(event)
+            return result
+
+        return publishing
+
+
+# ============================================================
+# APP / CLIENT
+# ============================================================
+@pytest.fixture(scope="session")
+def app():
+    """
+    The app as create_app() builds it, minus the blueprints that are not
+    in this tree (auth, farmers, animals, authority_auth).
+    """
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+
+    from app.app import OrjsonProvider, register_error_handlers
+    from app.config import Config
+    from app.utils.log import setup_logging
+    from app.utils import metrics
+    from app.utils.query_budget import setup_query_budget
+    from app.utils.rate_limit import setup_proxy_fix
+
+    flask_app = Flask("app.app")
+    flask_app.config.from_object(Config)
+    flask_app.config["TESTING"] = True
+    flask_app.config["MAX_CONTENT_LENGTH"] = Config.MAX_UPLOAD_BYTES + 64 * 1024
+
+    setup_logging(flask_app)
+    metrics.setup_metrics(flask_app)
+    setup_query_budget(flask_app)
+    setup_proxy_fix(flask_app)
+
+    flask_app.json_provider_class = OrjsonProvider
+    flask_app.json = flask_app.json_provider_class(flask_app)
+    JWTManager(flask_app)
+
+    monkeypatch = pytest.MonkeyPatch()
+    if os.environ.get("TEST_MONGO_URI"):
+        DB.initialize()
+    else:
+        import mongomock
+
+        DB.initialize(mongo_client_class=mongomock.MongoClient)
+        listeners = [
+            listener for listener in DB.client_options()["event_listeners"]
+            if isinstance(listener, monitoring.CommandListener)
+        ]
+        MockCommandEvents(listeners).install(monkeypatch)
+
+    # Build indexes now so the first request of a test does not pay for
+    # MongoEngine's lazy createIndexes
+    from app.cli import indexed_models
+    from app.models.stored_file import StoredFile
+    for model in indexed_models() + [StoredFile]:
+        model.ensure_indexes()
+
+    from app.routes.treatments import treatments_bp
+    from app.routes.consumer import consumer_bp
+    from app.routes.veterinarian_auth import veterinarian_auth_bp
+    from app.routes.upload_routes import upload_bp
+    from app.routes.medicines import medicines_bp
+    from app.routes.authority_dashboard import authority_dashboard_bp
+    from app.routes.ops import ops_bp
+
+    flask_app.register_blueprint(medicines_bp, url_prefix="/medicines")
+    flask_app.register_blueprint(treatments_bp, url_prefix='/treatments')
+    flask_app.register_blueprint(consumer_bp, url_prefix='/consumer')
+    flask_app.register_blueprint(veterinarian_auth_bp, url_prefix='/veterinarian/auth')
+    flask_app.register_blueprint(authority_dashboard_bp, url_prefix='/authority/dashboard')
+    flask_app.register_blueprint(upload_bp, url_prefix='/uploads')
+    flask_app.register_blueprint(ops_bp)
+    register_error_handlers(flask_app)
+
+    yield flask_app
+
+    monkeypatch.undo()
+    DB.close()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(autouse=True)
+def clean_db(app):
+    """Empty every collection (indexes stay) and drop in-process caches."""
+    yield
+
+    for name in DB.db.list_collection_names():
+        DB.db[name].delete_many({})
+
+    from app.services.medicine_catalog import MedicineCatalog
+    MedicineCatalog._version = None
+    MedicineCatalog._miss_checked_at = 0.0
+    MedicineCatalog._by_id, MedicineCatalog._by_name = {}, {}
+
+    from app.services.safety_cache import SafetyCache
+    SafetyCache._entries.clear()
+
+    from app.services import rollup_service
+    rollup_service._districts.clear()
+
+    from app.services.overview_service import OverviewService
+    OverviewService._cached = None
+
+
+@pytest.fixture
+def auth_headers(app):
+    """auth_headers(doc_or_id, role) -> Authorization header for a test request."""
+    def make(identity, role):
+        identity = getattr(identity, "id", identity)
+        with app.app_context():
+            token = issue_access_token(identity, role)
+        return {"Authorization": f"Bearer {token}"}
+    return make
+
+
+# ============================================================
+# SEED DATA
+# ============================================================
+class Seed:
+    """Small factories for the documents most routes need."""
+
+    def __init__(self):
+        self._n = 0
+
+    def _next(self):
+        self._n += 1
+        return self._n
+
+    def farmer(self, district="Pune", **fields):
+        from app.models.farmers import Farmer
+        n = self._next()
+        return Farmer(
+            name=f"Farmer {n}", mobile=f"+91980000{n:04d}",
+            aadhar_number=f"0000{n:08d}", district=district, **fields
+        ).save()
+
+    def vet(self, **fields):
+        from app.models.vets import Vet
+        n = self._next()
+        return Vet(
+            name=f"Vet {n}", mobile=f"+91970000{n:04d}",
+            qualification="BVSc", registration_number=f"VET-{n}", **fields
+        ).save()
+
+    def animal(self, farmer, species="cow", **fields):
+        from app.models.animals import Animal
+        return Animal(
+            farmer=farmer, species=species, tag_number=f"TAG-{self._next()}", **fields
+        ).save()
+
+    def medicine(self, withdrawal_days=7, **fields):
+        from app.models.authorized_medicine import AuthorizedMedicine
+        n = self._next()
+        return AuthorizedMedicine(
+            name=f"Medicine {n}", dosage="10ml",
+            withdrawal_period_days=withdrawal_days, **fields
+        ).save()
+
+    def treatment(self, animal, vet=None, medicines=(), status="pending", **fields):
+        from app.models.treatments import Treatment
+        from app.models.prescribed_medicine import PrescribedMedicine
+        return Treatment(
+            farmer=animal.farmer, animal=animal, vet=vet, status=status,
+            symptoms=["fever"],
+            medicines=[
+                PrescribedMedicine(
+                    medicine=m, dosage=m.dosage, withdrawal_period_days=m.withdrawal_period_days
+                )
+                for m in medicines
+            ],
+            **fields
+        ).save()
+
+
+@pytest.fixture
+def seed(app):
+    return Seed()
+
+
+@pytest.fixture
+def seeded(seed):
+    """
+    A small but realistic dataset: two districts, a vet, two medicines,
+    animals with pending and diagnosed treatments, rollups rebuilt and
+    the medicine catalog warm, as after create_app().
+    """
+    from app.services.medicine_catalog import MedicineCatalog
+    from app.services.rollup_service import RollupService
+
+    vet = seed.vet()
+    medicines = [seed.medicine(), seed.medicine(withdrawal_days=21)]
+    farmers = [seed.farmer(district="Pune"), seed.farmer(district="Nashik")]
+
+    animals, treatments = [], []
+    for farmer in farmers:
+        for species in ("cow", "goat", "buffalo"):
+            animal = seed.animal(farmer, species=species)
+            animals.append(animal)
+            treatments.append(seed.treatment(animal))
+            treatments.append(
+                seed.treatment(animal, vet=vet, medicines=medicines, status="diagnosed")
+            )
+
+    RollupService.rebuild()
+    MedicineCatalog.load()
+
+    return SimpleNamespace(
+        vet=vet, medicines=medicines, farmers=farmers,
+        animals=animals, treatments=treatments,
+    )
@@ -0,0 +1,26 @@
+from app.services.withdrawal_service import WithdrawalService
+
+
+def test_uppercase_farmer_id_is_invalidated_by_new_withdrawal(client, seed):
+    farmer = seed.farmer()
+    animal = seed.animal(farmer)
+    treatment = seed.treatment(animal)
+    url = f"/consumer/safety/{str(farmer.id).upper()}"
+
+    assert client.get(url).get_json()["data"]["status"] == "SAFE"
+
+    WithdrawalService.create_withdrawal_alert(treatment.id, animal.id, withdrawal_days=5)
+
+    body = client.get(url).get_json()["data"]
+    assert body["status"] == "UNSAFE"
+    assert body["farmer_id"] == str(farmer.id)
+
+
+def test_unchanged_answer_revalidates_with_304(client, seed):
+    farmer = seed.farmer()
+    url = f"/consumer/safety/{farmer.id}"
+
+    etag = client.get(url).headers["ETag"]
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
@@ -0,0 +1,49 @@
+import json
+
+from app.config import Config
+from app.services.export_service import COLUMNS, ExportService
+from app.services.withdrawal_service import WithdrawalService
+from app.utils.security import ROLE_AUTHORITY
+
+
+def export(client, auth_headers, dataset, **params):
+    response = client.get(
+        f"/authority/dashboard/exports/{dataset}",
+        query_string={"gzip": "0", **params},
+        headers=auth_headers("a" * 24, ROLE_AUTHORITY),
+    )
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_district_narrows_the_first_match_in_batches(seed, monkeypatch):
+    monkeypatch.setattr(Config, "EXPORT_DISTRICT_BATCH", 2)
+    farmers = [seed.farmer(district="Pune") for _ in range(3)]
+    seed.farmer(district="Nashik")
+
+    pipelines = list(ExportService.build_pipelines("treatments", district="Pune"))
+
+    # every pipeline starts with the indexed farmer $in, no $lookup
+    assert [len(p[0]["$match"]["farmer"]["$in"]) for p in pipelines] == [2, 1]
+    assert {oid for p in pipelines for oid in p[0]["$match"]["farmer"]["$in"]} == {f.id for f in farmers}
+    assert "$lookup" not in json.dumps(pipelines, default=str)
+
+
+def test_treatments_export_filters_by_district(client, seeded, auth_headers):
+    pune = str(seeded.farmers[0].id)
+
+    rows = export(client, auth_headers, "treatments", district="Pune")
+
+    assert len(rows) == len(seeded.treatments) // 2
+    assert {row["farmer_id"] for row in rows} == {pune}
+    assert list(rows[0]) == COLUMNS["treatments"]
+
+
+def test_alerts_export_filters_by_district(client, seeded, auth_headers):
+    for treatment in seeded.treatments:
+        WithdrawalService.create_withdrawal_alert(treatment.id, treatment.animal.id, 3)
+    nashik_animals = {str(a.id) for a in seeded.animals if a.farmer.district == "Nashik"}
+
+    rows = export(client, auth_headers, "withdrawal-alerts", district="Nashik")
+
+    assert rows and {row["animal_id"] for row in rows} == nashik_animals
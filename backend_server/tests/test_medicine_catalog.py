@@ -0,0 +1,23 @@
+from bson import ObjectId
+
+from app.services.medicine_catalog import MedicineCatalog
+from app.utils.query_budget import capture_commands
+
+
+def test_unknown_ids_do_not_query_per_lookup(seed):
+    seed.medicine()
+    MedicineCatalog.load()
+
+    with capture_commands() as commands:
+        names = [MedicineCatalog.name_for(ObjectId()) for _ in range(50)]
+
+    assert names == [None] * 50
+    # at most the one forced catalog_versions check
+    assert len(commands) <= 1
+
+
+def test_medicine_saved_after_load_is_found(seed):
+    MedicineCatalog.load()
+    medicine = seed.medicine()
+
+    assert MedicineCatalog.name_for(medicine.id) == medicine.name
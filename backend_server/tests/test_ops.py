@@ -0,0 +1,35 @@
+import pytest
+
+from app.config import Config
+from app.utils.security import ROLE_AUTHORITY
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_TOKEN", "scrape-me")
+    return {"Authorization": "Bearer scrape-me"}
+
+
+def test_metrics_needs_the_token(client, token, seed, auth_headers):
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "scrape-me"}).status_code == 403
+    # a dashboard login is not a scrape token
+    assert client.get("/metrics", headers=auth_headers(seed.farmer(), ROLE_AUTHORITY)).status_code == 403
+
+    response = client.get("/metrics", headers=token)
+    assert response.status_code == 200
+    assert "mongo_pool_connections_in_use" in response.get_data(as_text=True)
+
+
+def test_metrics_refused_when_no_token_is_configured(client, monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_TOKEN", "")
+    assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 403
+
+
+def test_db_pool_stats_need_the_token(client, token):
+    assert client.get("/health/db-pool").status_code == 403
+
+    response = client.get("/health/db-pool", headers=token)
+    assert response.status_code == 200
+    assert "in_use" in response.get_json()
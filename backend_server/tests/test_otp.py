@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from app.config import Config
+from app.models.otp_code import OTPCode
+from app.services.otp_service import OTPService
+
+MOBILE = "9876543210"
+E164 = "+919876543210"
+
+
+def stored():
+    return OTPCode._get_collection().find_one({"_id": E164})
+
+
+def test_only_a_keyed_hash_of_the_code_is_stored(app):
+    OTPService().send_otp(MOBILE)
+
+    doc = stored()
+    assert Config.TEST_OTP_CODE not in str(doc)
+    assert doc["code_hash"] == OTPService._hash(E164, Config.TEST_OTP_CODE)
+    assert doc["expires_at"] > datetime.utcnow() + timedelta(seconds=Config.OTP_TTL_SECONDS - 60)
+
+
+def test_code_is_single_use(app):
+    otp = OTPService()
+    otp.send_otp(MOBILE)
+
+    assert otp.verify_otp(MOBILE, Config.TEST_OTP_CODE)
+    assert not otp.verify_otp(MOBILE, Config.TEST_OTP_CODE)
+
+
+def test_attempts_are_limited(app):
+    otp = OTPService()
+    otp.send_otp(MOBILE)
+
+    for _ in range(Config.OTP_MAX_ATTEMPTS):
+        assert not otp.verify_otp(MOBILE, "000000")
+    assert not otp.verify_otp(MOBILE, Config.TEST_OTP_CODE)
+
+
+def test_expired_code_is_rejected_and_ttl_indexed(app):
+    otp = OTPService()
+    otp.send_otp(MOBILE)
+    OTPCode._get_collection().update_one(
+        {"_id": E164}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+    assert not otp.verify_otp(MOBILE, Config.TEST_OTP_CODE)
+    ttl = [
+        index for index in OTPCode._get_collection().index_information().values()
+        if index["key"] == [("expires_at", 1)]
+    ]
+    assert ttl and ttl[0]["expireAfterSeconds"] == 0
+
+
+def test_hash_key_is_not_the_jwt_secret(monkeypatch):
+    digest = OTPService._hash(E164, "123456")
+    monkeypatch.setattr(Config, "JWT_SECRET_KEY", "rotated")
+    assert OTPService._hash(E164, "123456") == digest
@@ -0,0 +1,56 @@
+import pytest
+
+from app.utils.query_budget import QueryBudgetExceeded
+from app.utils.security import ROLE_AUTHORITY
+
+# web_dashboard/src/services/api.ts
+OVERVIEW_DATA = {
+    "total_farmers", "total_veterinarians", "total_animals",
+    "total_treatments", "pending_verifications",
+}
+SIMPLIFIED = {"overview", "today_treatments", "violations_count", "farm_safety", "charts"}
+CHARTS = {
+    "treatment_trends": {"month", "treatments"},
+    "animals_by_species": {"species", "count"},
+    "farm_safety_status": {"name", "value"},
+}
+
+
+def get(client, auth_headers, url):
+    response = client.get(url, headers=auth_headers("a" * 24, ROLE_AUTHORITY))
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def test_simplified_matches_the_dashboard_types(client, seeded, auth_headers):
+    data = get(client, auth_headers, "/authority/dashboard/simplified")
+
+    assert set(data) == SIMPLIFIED
+    assert set(data["overview"]) == OVERVIEW_DATA
+    assert set(data["farm_safety"]) == {"safe", "unsafe"}
+    assert set(data["charts"]) == set(CHARTS)
+    for chart, keys in CHARTS.items():
+        assert data["charts"][chart] and all(set(point) == keys for point in data["charts"][chart])
+
+    assert data["overview"] == {
+        "total_farmers": 2,
+        "total_veterinarians": 1,
+        "total_animals": 6,
+        "total_treatments": 12,
+        "pending_verifications": 3,  # nobody verified yet
+    }
+    assert data["today_treatments"] == 12
+    assert data["charts"]["treatment_trends"][-1]["treatments"] == 12
+    assert {p["species"]: p["count"] for p in data["charts"]["animals_by_species"]} == {
+        "cow": 2, "goat": 2, "buffalo": 2,
+    }
+
+
+def test_overview_reads_count_towards_the_budget(app, client, seeded, auth_headers, monkeypatch):
+    # The reads run on executor threads; they still belong to the request
+    monkeypatch.setattr(app.view_functions["authority_dashboard.overview"], "query_budget", 1)
+
+    with pytest.raises(QueryBudgetExceeded) as exc:
+        client.get("/authority/dashboard/overview", headers=auth_headers("a" * 24, ROLE_AUTHORITY))
+
+    assert "issued 6 Mongo commands (budget 1)" in str(exc.value)
@@ -0,0 +1,82 @@
+import base64
+from datetime import datetime, timedelta
+
+from app.config import Config
+from app.utils.security import ROLE_VET
+
+
+def farmer_with_treatments(seed, vet, created):
+    farmer = seed.farmer()
+    animal = seed.animal(farmer)
+    treatments = [seed.treatment(animal, vet=vet, status="diagnosed", created_at=at) for at in created]
+    return farmer, treatments
+
+
+def pages(client, url, headers):
+    ids, cursor = [], None
+    while True:
+        page_url = f"{url}?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(page_url, headers=headers).get_json()
+        ids.append([item["treatment_id"] for item in body["data"]])
+        cursor = body["meta"]["next_cursor"]
+        if not cursor:
+            return ids
+
+
+def test_cursor_round_trip_with_ties_on_created_at(client, seed, auth_headers):
+    vet = seed.vet()
+    now = datetime(2026, 1, 10, 12, 0)
+    # five rows, three sharing the same created_at across a page boundary
+    created = [now, now - timedelta(hours=1), now - timedelta(hours=1), now - timedelta(hours=1), now - timedelta(days=1)]
+    farmer, treatments = farmer_with_treatments(seed, vet, created)
+    headers = auth_headers(vet, ROLE_VET)
+
+    got = pages(client, f"/treatments/farmer/{farmer.id}", headers)
+
+    expected = [str(t.id) for t in sorted(treatments, key=lambda t: (t.created_at, t.id), reverse=True)]
+    assert [len(page) for page in got] == [2, 2, 1]
+    assert sum(got, []) == expected
+
+
+def test_no_params_returns_the_whole_list(client, seed, auth_headers):
+    vet = seed.vet()
+    now = datetime(2026, 1, 10)
+    farmer, treatments = farmer_with_treatments(
+        seed, vet, [now - timedelta(minutes=i) for i in range(Config.PAGE_DEFAULT_LIMIT + 5)]
+    )
+
+    body = client.get(f"/treatments/farmer/{farmer.id}", headers=auth_headers(vet, ROLE_VET)).get_json()
+
+    assert len(body["data"]) == len(treatments)
+    assert body["meta"] == {"next_cursor": None, "limit": None}
+
+
+def test_limit_is_clamped(client, seed, auth_headers, monkeypatch):
+    monkeypatch.setattr(Config, "PAGE_MAX_LIMIT", 3)
+    vet = seed.vet()
+    now = datetime(2026, 1, 10)
+    farmer, _ = farmer_with_treatments(seed, vet, [now - timedelta(minutes=i) for i in range(5)])
+    headers = auth_headers(vet, ROLE_VET)
+    url = f"/treatments/farmer/{farmer.id}"
+
+    body = client.get(f"{url}?limit=1000", headers=headers).get_json()
+    assert len(body["data"]) == 3 and body["meta"]["limit"] == 3
+
+    body = client.get(f"{url}?limit=0", headers=headers).get_json()
+    assert len(body["data"]) == 1 and body["meta"]["limit"] == 1
+
+    body = client.get(f"{url}?limit=abc", headers=headers).get_json()
+    assert body["meta"]["limit"] == 3  # default, clamped
+
+
+def test_invalid_cursor_is_400(client, seed, auth_headers):
+    vet = seed.vet()
+    farmer, (treatment,) = farmer_with_treatments(seed, vet, [datetime(2026, 1, 10)])
+    headers = auth_headers(vet, ROLE_VET)
+    bad_id = base64.urlsafe_b64encode(b'{"t": "2026-01-10T00:00:00", "id": "nope"}').decode()
+
+    for cursor in ("not-a-cursor", bad_id):
+        for url in (f"/treatments/farmer/{farmer.id}", f"/treatments/animal/{treatment.animal.id}"):
+            response = client.get(f"{url}?cursor={cursor}", headers=headers)
+            assert response.status_code == 400
+            assert response.get_json()["message"] == "Invalid cursor"
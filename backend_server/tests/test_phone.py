@@ -0,0 +1,26 @@
+import pytest
+
+from app.utils.phone import mobile_variants, normalize_mobile
+
+
+@pytest.mark.parametrize("raw", [
+    "9876543210", "+919876543210", "+91 98765 43210", " 098765-43210 ", "919876543210",
+])
+def test_indian_forms_normalize_to_e164(raw):
+    assert normalize_mobile(raw) == "+919876543210"
+
+
+def test_other_countries_keep_their_code():
+    assert normalize_mobile("+44 7911 123456") == "+447911123456"
+
+
+@pytest.mark.parametrize("raw", [None, "", 9876543210, "12345", "not a number", "+91 00000 00000"])
+def test_invalid_input_is_none(raw):
+    assert normalize_mobile(raw) is None
+
+
+def test_variants_cover_legacy_stored_forms():
+    variants = mobile_variants("+919876543210", " 98765 43210")
+    for stored in ("+919876543210", "9876543210", "09876543210", "919876543210",
+                   "+91 98765 43210", "098765 43210", "98765 43210", " 98765 43210"):
+        assert stored in variants
@@ -0,0 +1,64 @@
+import pytest
+
+from app.models.prefetch import prefetched, reference_id, select_related
+from app.models.treatments import Treatment
+from app.utils.query_budget import capture_commands
+from app.utils.security import ROLE_VET
+
+
+def seed_treatments(seed, farmer, count):
+    medicines = [seed.medicine(), seed.medicine(withdrawal_days=14)]
+    for _ in range(count):
+        seed.treatment(seed.animal(farmer), medicines=medicines)
+
+
+@pytest.mark.parametrize("count", [1, 5, 40])
+def test_select_related_issues_one_query_per_path(seed, count):
+    farmer = seed.farmer()
+    seed_treatments(seed, farmer, count)
+
+    with capture_commands() as commands:
+        treatments = select_related(
+            Treatment.objects(farmer=farmer.id),
+            "animal", "medicines.medicine",
+            projections={"animal": ["tag_number"]},
+        )
+        tags = [t.animal.tag_number for t in treatments]
+        names = {pm.medicine.name for t in treatments for pm in t.medicines}
+
+    # treatments, animals ($in), medicines ($in) — whatever the list length
+    assert [name for name, _ in commands] == ["find", "find", "find"]
+    assert len(tags) == count and all(tags)
+    assert len(names) == 2
+
+
+def test_missing_reference_is_left_unloaded(seed):
+    farmer = seed.farmer()
+    animal = seed.animal(farmer)
+    seed.treatment(animal)
+    animal.delete()
+
+    treatment, = select_related(Treatment.objects(farmer=farmer.id), "animal")
+
+    assert prefetched(treatment, "animal") is None
+    assert reference_id(treatment, "animal") == animal.pk
+
+
+@pytest.mark.parametrize("count", [2, 30])
+def test_farmer_treatment_list_query_count_is_fixed(client, seed, auth_headers, count):
+    farmer = seed.farmer()
+    vet = seed.vet()
+    seed_treatments(seed, farmer, count)
+
+    with capture_commands() as commands:
+        response = client.get(
+            f"/treatments/farmer/{farmer.id}?limit=50",
+            headers=auth_headers(vet, ROLE_VET),
+        )
+
+    assert response.status_code == 200
+    items = response.get_json()["data"]
+    assert len(items) == count
+    assert all(item["animal_tag_number"].startswith("TAG-") for item in items)
+    # farmer lookup, treatments page, animals ($in)
+    assert len(commands) == 3
@@ -0,0 +1,77 @@
+import pytest
+from app.utils.query_budget import QueryBudgetExceeded, capture_commands
+from app.utils.security import ROLE_AUTHORITY, ROLE_FARMER, ROLE_VET
+
+DASHBOARD_ROUTES = [
+    "/authority/dashboard/overview",
+    "/authority/dashboard/simplified",
+    "/authority/dashboard/stats/daily-treatments",
+    "/authority/dashboard/stats/treatment-trends",
+    "/authority/dashboard/stats/medicine-usage",
+    "/authority/dashboard/stats/animals-by-species",
+    "/authority/dashboard/stats/farm-safety-status",
+    "/authority/dashboard/stats/compliance-data",
+    "/authority/dashboard/stats/vet-activity",
+    "/authority/dashboard/stats/medicine-usage?district=Pune",
+    "/authority/dashboard/stats/farm-safety-status?district=Pune",
+]
+
+
+@pytest.mark.parametrize("url", DASHBOARD_ROUTES)
+def test_dashboard_routes_stay_within_budget(client, seeded, auth_headers, url):
+    # QUERY_BUDGET_MODE=raise: an over-budget route fails the request
+    response = client.get(url, headers=auth_headers("a" * 24, ROLE_AUTHORITY))
+    assert response.status_code == 200
+
+
+def test_treatment_routes_stay_within_budget(client, seeded, auth_headers):
+    vet = auth_headers(seeded.vet, ROLE_VET)
+    farmer = seeded.farmers[0]
+    animal = seeded.animals[0]
+    treatment = seeded.treatments[1]
+
+    assert client.get(f"/treatments/{treatment.id}", headers=vet).status_code == 200
+    assert client.get(f"/treatments/animal/{animal.id}", headers=vet).status_code == 200
+    assert client.get(f"/treatments/farmer/{farmer.id}", headers=vet).status_code == 200
+
+    created = client.post(
+        "/treatments/request",
+        json={"animal_id": str(animal.id), "symptoms": ["cough"]},
+        headers=auth_headers(farmer, ROLE_FARMER),
+    )
+    assert created.status_code == 201
+
+    pending_id = created.get_json()["data"]["_id"]["$oid"]
+    diagnosed = client.put(
+        f"/treatments/{pending_id}/diagnose",
+        json={"medicines": [{"medicine_id": str(seeded.medicines[0].id), "dosage": "5ml"}]},
+        headers=vet,
+    )
+    assert diagnosed.status_code == 200
+
+
+def test_consumer_safety_is_two_commands_then_cached(client, seeded):
+    url = f"/consumer/safety/{seeded.farmers[0].id}"
+
+    with capture_commands() as first:
+        client.get(url)
+    with capture_commands() as second:
+        client.get(url)
+
+    assert [name for name, _ in first] == ["find", "find"]
+    assert second == []
+
+
+def test_guard_reports_the_offending_commands(app, client, seeded, auth_headers, monkeypatch):
+    view = app.view_functions["treatments.get_treatments_by_farmer"]
+    monkeypatch.setattr(view, "query_budget", 1)
+
+    with pytest.raises(QueryBudgetExceeded) as exc:
+        client.get(
+            f"/treatments/farmer/{seeded.farmers[0].id}",
+            headers=auth_headers(seeded.vet, ROLE_VET),
+        )
+
+    report = str(exc.value)
+    assert "treatments.get_treatments_by_farmer issued 3 Mongo commands (budget 1)" in report
+    assert "routes/treatments.py" in report
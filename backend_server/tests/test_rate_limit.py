@@ -0,0 +1,28 @@
+from app.services import otp_service
+from app.utils.rate_limit import TokenBucketLimiter
+
+
+def test_bucket_count_stays_bounded_under_distinct_keys():
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=1e-6, max_keys=10)
+
+    for n in range(100):
+        limiter.take(f"ip-{n}")  # empty buckets: nothing refills, nothing is "full"
+        limiter.take("regular")
+        assert len(limiter._buckets) <= 10
+
+    # least recently used keys go first; the busy one keeps its state
+    assert limiter.take("regular") == (False, 1000000)
+
+
+def test_client_ip_comes_from_the_trusted_proxy_hop(client, monkeypatch):
+    seen = []
+    monkeypatch.setattr(otp_service.OTP_IP_LIMIT, "take", lambda key: seen.append(key) or (True, 0))
+
+    # TRUSTED_PROXY_HOPS=1: only the address our proxy appended counts
+    response = client.post(
+        "/veterinarian/auth/register/send-otp", json={},
+        headers={"X-Forwarded-For": "10.9.9.9, 198.51.100.7"},
+    )
+
+    assert response.status_code == 400
+    assert seen == ["198.51.100.7"]
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+from app.services.rollup_service import (
+    RollupService, day_key, district_for_farmer,
+    TREATMENTS_CREATED, TREATMENTS_DIAGNOSED, VET_VISITS, MEDICINE_USAGE,
+)
+
+
+def test_rebuild_counts_diagnosis_of_treatment_created_before_since(seed):
+    farmer = seed.farmer()
+    vet = seed.vet()
+    medicine = seed.medicine()
+    now = datetime.utcnow()
+    seed.treatment(
+        seed.animal(farmer), vet=vet, medicines=[medicine], status="diagnosed",
+        created_at=now - timedelta(days=10), treatment_start_date=now,
+    )
+
+    RollupService.rebuild(since=now - timedelta(days=1))
+
+    today = day_key(now)
+    assert RollupService.totals_by_day(TREATMENTS_DIAGNOSED, today)[today] == 1
+    assert RollupService.counts(VET_VISITS, today) == {str(vet.id): 1}
+    assert RollupService.counts(MEDICINE_USAGE, today) == {str(medicine.id): 1}
+
+
+def test_rebuild_replaces_range_and_drops_only_stale_keys(seed):
+    farmer = seed.farmer(district="Nashik")
+    seed.treatment(seed.animal(farmer))
+    today = day_key()
+    old_day = day_key(datetime.utcnow() - timedelta(days=30))
+
+    rollups = RollupService.collection()
+    rollups.update_one(
+        {"_id": f"{today}|Nashik|{TREATMENTS_CREATED}"}, {"$set": {"total": 99}}
+    )
+    rollups.insert_one({"_id": f"{today}|Ghost|{TREATMENTS_CREATED}", "day": today,
+                        "district": "Ghost", "metric": TREATMENTS_CREATED, "total": 3})
+    rollups.insert_one({"_id": f"{old_day}|Ghost|{TREATMENTS_CREATED}", "day": old_day,
+                        "district": "Ghost", "metric": TREATMENTS_CREATED, "total": 3})
+
+    RollupService.rebuild(since=datetime.utcnow())
+
+    assert rollups.find_one({"_id": f"{today}|Nashik|{TREATMENTS_CREATED}"})["total"] == 1
+    assert rollups.find_one({"_id": f"{today}|Ghost|{TREATMENTS_CREATED}"}) is None
+    # before `since`: untouched
+    assert rollups.find_one({"_id": f"{old_day}|Ghost|{TREATMENTS_CREATED}"})["total"] == 3
+
+
+def test_district_filled_in_later_is_picked_up(seed):
+    farmer = seed.farmer(district=None)
+    assert district_for_farmer(farmer.id) == "unknown"
+
+    farmer.district = "Satara"
+    farmer.save()
+
+    assert district_for_farmer(farmer.id) == "Satara"
+
+
+def test_rollup_failure_does_not_fail_the_save(seed, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("rollups unavailable")
+
+    monkeypatch.setattr(RollupService, "record", broken)
+    farmer = seed.farmer()
+
+    animal = seed.animal(farmer)
+    treatment = seed.treatment(animal)
+
+    assert animal.pk is not None and treatment.pk is not None
+
+
+def test_farm_safety_status_is_per_district(client, seed, auth_headers):
+    from datetime import datetime, timedelta
+    from app.utils.security import ROLE_AUTHORITY
+
+    later = datetime.utcnow() + timedelta(days=3)
+    pune = [seed.farmer(district="Pune") for _ in range(4)]
+    nashik = seed.farmer(district="Nashik")
+    seed.animal(pune[0], withdrawal_safe_from=later)
+    seed.animal(nashik, withdrawal_safe_from=later)
+
+    def status(**params):
+        response = client.get(
+            "/authority/dashboard/stats/farm-safety-status", query_string=params,
+            headers=auth_headers("a" * 24, ROLE_AUTHORITY),
+        )
+        assert response.status_code == 200
+        return {row["name"]: row["value"] for row in response.get_json()["data"]}
+
+    assert status(district="Pune") == {"Safe": 75, "Under Withdrawal": 25}
+    assert status(district="Nashik") == {"Safe": 0, "Under Withdrawal": 100}
+    assert status() == {"Safe": 60, "Under Withdrawal": 40}
+    assert status(district="Nowhere") == {"Safe": 0, "Under Withdrawal": 0}
@@ -0,0 +1,116 @@
+import hashlib
+import io
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.config import Config
+from app.services import storage_backends
+from app.services.storage_backends import StorageError, StorageUnavailable, SupabaseBackend
+from app.services.storage_service import StorageService
+from app.utils.circuit_breaker import CircuitBreaker
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the storage API: answers with scripted statuses."""
+
+    statuses = []
+    bodies = []
+    keep_bodies = True
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        if self.keep_bodies:
+            self.bodies.append(self.rfile.read(remaining))
+        else:
+            # drain in blocks, so the server side does not count towards
+            # the process's traced memory
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+        status = self.statuses.pop(0) if self.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    StandIn.statuses, StandIn.bodies, StandIn.keep_bodies = [], [], True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Fresh shared session and breaker, no backoff sleeps
+    monkeypatch.setattr(Config, "STORAGE_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(storage_backends, "_session", None)
+    monkeypatch.setattr(storage_backends, "_breaker", CircuitBreaker("storage", 2, 0.2))
+
+    yield StorageService(backend=SupabaseBackend(
+        f"http://127.0.0.1:{server.server_port}", "key", "bucket"
+    ))
+    server.shutdown()
+    server.server_close()
+
+
+def test_503_is_retried_with_the_body_rewound(stand_in):
+    data = b"0123456789" * 10000
+    StandIn.statuses = [503, 200]
+
+    path, digest, size, _ = stand_in.upload_stream("farmers/x/a.pdf", io.BytesIO(data), dedupe=False)
+
+    # the whole body was sent twice, and the hash restarted on the rewind
+    assert StandIn.bodies == [data, data]
+    assert digest == hashlib.sha256(data).hexdigest() and size == len(data)
+    assert storage_backends._breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_fails_fast_then_recovers(stand_in):
+    StandIn.statuses = [503] * (Config.STORAGE_RETRIES + 1) * 2
+    breaker = storage_backends._breaker
+
+    for _ in range(2):
+        with pytest.raises(StorageError):
+            stand_in.upload_file("farmers/x/a.pdf", b"data")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    sent = len(StandIn.bodies)
+    with pytest.raises(StorageUnavailable):
+        stand_in.upload_file("farmers/x/a.pdf", b"data")
+    assert len(StandIn.bodies) == sent  # failed fast, nothing sent
+
+    time.sleep(0.25)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    stand_in.upload_file("farmers/x/a.pdf", b"data")  # the trial call succeeds
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_upload_stream_memory_is_bounded(stand_in, monkeypatch):
+    size = 8 * 2**20
+    monkeypatch.setattr(Config, "MAX_UPLOAD_BYTES", size)
+    StandIn.keep_bodies = False
+
+    with tempfile.TemporaryFile() as spooled:
+        block = bytes(range(256)) * 4096
+        for _ in range(size // len(block)):
+            spooled.write(block)
+        spooled.seek(0)
+
+        tracemalloc.start()
+        try:
+            _, digest, sent, _ = stand_in.upload_stream("farmers/x/big.bin", spooled, dedupe=False)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert sent == size
+    assert digest == hashlib.sha256(block * (size // len(block))).hexdigest()
+    # streamed in blocks: the peak is a small fraction of the file
+    assert peak < 2**20, f"peak {peak} bytes for a {size} byte upload"
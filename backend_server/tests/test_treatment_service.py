@@ -0,0 +1,79 @@
+import pytest
+
+from app.db import DB
+from app.services.medicine_catalog import MedicineCatalog
+from app.services.treatment_service import TreatmentService
+from app.utils.security import ROLE_VET
+
+
+class RacingTreatments:
+    """DB.treatments stand-in that runs `interleave` just before bulk_write."""
+
+    def __init__(self, collection, interleave):
+        self._collection = collection
+        self._interleave = interleave
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def bulk_write(self, *args, **kwargs):
+        self._interleave()
+        return self._collection.bulk_write(*args, **kwargs)
+
+
+def test_diagnose_many_reports_only_what_it_modified(seed, monkeypatch):
+    vet = seed.vet()
+    medicine = seed.medicine()
+    MedicineCatalog.load()
+    farmer = seed.farmer()
+    treatments = [seed.treatment(seed.animal(farmer)) for _ in range(4)]
+    ids = [str(t.id) for t in treatments]
+    medicines = [{"medicine_id": str(medicine.id)}]
+
+    treatments_collection = DB.treatments
+
+    def same_vet_and_delete():
+        # A double submit by the same vet wins two; a third is deleted
+        monkeypatch.setattr(DB, "treatments", treatments_collection)
+        TreatmentService.diagnose_many(str(vet.id), ids[:2], medicines)
+        treatments_collection.delete_one({"_id": treatments[2].id})
+
+    monkeypatch.setattr(DB, "treatments", RacingTreatments(treatments_collection, same_vet_and_delete))
+    result = TreatmentService.diagnose_many(str(vet.id), ids, medicines)
+
+    assert [d["treatment_id"] for d in result["diagnosed"]] == [ids[3]]
+    assert sorted(e["id"] for e in result["errors"]) == sorted(ids[:3])
+    # one alert per treatment actually diagnosed, none duplicated
+    assert sorted(a["treatment_id"] for a in DB.withdrawal_alerts.find()) == sorted([ids[0], ids[1], ids[3]])
+
+
+def test_prescribe_coerces_vet_withdrawal_days(seed):
+    medicine = seed.medicine(withdrawal_days=7)
+    MedicineCatalog.load()
+
+    _, days = TreatmentService.prescribe([{"medicine_id": str(medicine.id), "vet_withdrawal_days": "14"}])
+    assert days == 14
+
+
+@pytest.mark.parametrize("value", ["fourteen", -3, 2.5, True, [14]])
+def test_bad_vet_withdrawal_days_is_a_400_naming_the_item(client, seed, auth_headers, value):
+    vet = seed.vet()
+    medicine = seed.medicine()
+    MedicineCatalog.load()
+    animal = seed.animal(seed.farmer())
+    treatment = seed.treatment(animal)
+    medicines = [
+        {"medicine_id": str(medicine.id)},
+        {"medicine_id": str(medicine.id), "vet_withdrawal_days": value},
+    ]
+    headers = auth_headers(vet, ROLE_VET)
+
+    for method, url, body in (
+        (client.post, "/treatments/camp", {"animal_ids": [str(animal.id)], "medicines": medicines}),
+        (client.put, "/treatments/bulk/diagnose", {"treatment_ids": [str(treatment.id)], "medicines": medicines}),
+    ):
+        response = method(url, json=body, headers=headers)
+        assert response.status_code == 400
+        assert "medicines[1]: vet_withdrawal_days" in response.get_json()["message"]
+
+    assert DB.treatments.count_documents({"status": "diagnosed"}) == 0
@@ -0,0 +1,207 @@
+import io
+
+import pytest
+
+from app.config import Config
+from app.utils.security import ROLE_AUTHORITY, ROLE_FARMER, ROLE_VET
+
+
+def sign(client, headers, *paths):
+    return client.post("/uploads/sign", json={"paths": list(paths)}, headers=headers)
+
+
+def test_farmer_signs_own_files_only(client, seed, auth_headers):
+    farmer, other = seed.farmer(), seed.farmer()
+    animal = seed.animal(farmer)
+    treatment = seed.treatment(animal)
+    headers = auth_headers(farmer, ROLE_FARMER)
+
+    response = sign(
+        client, headers,
+        f"farmers/{farmer.id}/a.jpg", f"animals/{animal.id}/b.jpg", f"treatments/{treatment.id}/c.pdf",
+    )
+    assert response.status_code == 200
+
+    other_animal = seed.animal(other)
+    for path in (f"farmers/{other.id}/a.jpg", f"animals/{other_animal.id}/b.jpg"):
+        assert sign(client, headers, f"farmers/{farmer.id}/a.jpg", path).status_code == 403
+
+
+def test_vet_signs_own_and_visible_treatment_files(client, seed, auth_headers):
+    vet, other_vet = seed.vet(), seed.vet()
+    farmer = seed.farmer()
+    pending_animal, taken_animal = seed.animal(farmer), seed.animal(farmer)
+    pending = seed.treatment(pending_animal)
+    taken = seed.treatment(taken_animal, vet=other_vet, status="diagnosed")
+    headers = auth_headers(vet, ROLE_VET)
+
+    response = sign(
+        client, headers,
+        f"vets/{vet.id}/cert.pdf", f"animals/{pending_animal.id}/a.jpg", f"treatments/{pending.id}/r.pdf",
+    )
+    assert response.status_code == 200
+
+    for path in (
+        f"vets/{other_vet.id}/cert.pdf",
+        f"farmers/{farmer.id}/a.jpg",  # only a pending treatment, not theirs
+        f"animals/{taken_animal.id}/a.jpg",
+        f"treatments/{taken.id}/r.pdf",
+    ):
+        assert sign(client, headers, path).status_code == 403
+
+
+def test_vet_signs_files_of_farmers_they_treated(client, seed, auth_headers):
+    vet = seed.vet()
+    treated, stranger = seed.farmer(), seed.farmer()
+    seed.treatment(seed.animal(treated), vet=vet, status="diagnosed")
+    headers = auth_headers(vet, ROLE_VET)
+
+    assert sign(client, headers, f"farmers/{treated.id}/id.jpg").status_code == 200
+    assert sign(client, headers, f"farmers/{stranger.id}/id.jpg").status_code == 403
+
+
+def test_authority_signs_any_owner_path(client, seed, auth_headers):
+    farmer, vet = seed.farmer(), seed.vet()
+    animal = seed.animal(farmer)
+    treatment = seed.treatment(animal)
+
+    response = sign(
+        client, auth_headers("a" * 24, ROLE_AUTHORITY),
+        f"farmers/{farmer.id}/a.jpg", f"vets/{vet.id}/b.pdf",
+        f"animals/{animal.id}/c.jpg", f"treatments/{treatment.id}/d.pdf",
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path", [
+    "farmers/{me}/../../vets/{me}/x.pdf",
+    "farmers/{me}",
+    "farmers/not-an-id/x.pdf",
+    "other/{me}/x.pdf",
+])
+def test_malformed_paths_are_rejected(client, seed, auth_headers, path):
+    farmer = seed.farmer()
+    response = sign(client, auth_headers(farmer, ROLE_FARMER), path.format(me=farmer.id))
+    assert response.status_code == 400
+
+
+def test_dedup_hit_rebuilds_missing_derivatives(client, seed, auth_headers, monkeypatch):
+    from app.routes import upload_routes
+    from app.services.image_derivatives import ImageDerivatives, derivative_path
+
+    scheduled = []
+    monkeypatch.setattr(ImageDerivatives, "enabled", classmethod(lambda cls: True))
+    monkeypatch.setattr(
+        ImageDerivatives, "schedule",
+        classmethod(lambda cls, storage, path, stream, content_type: scheduled.append(path) or {}),
+    )
+
+    farmer = seed.farmer()
+    headers = auth_headers(farmer, ROLE_FARMER)
+
+    def upload():
+        response = client.post(
+            "/uploads/farmer", headers=headers,
+            data={"file": (io.BytesIO(b"\x89PNG same bytes"), "photo.png", "image/png")},
+        )
+        assert response.status_code == 200
+        return response.get_json()["data"]
+
+    first = upload()
+    second = upload()  # dedup hit, but the thumb was never stored
+    assert second["deduplicated"] and scheduled == [first["path"], first["path"]]
+
+    upload_routes.storage.upload_file(derivative_path(first["path"], "thumb"), b"webp", "image/webp")
+    upload()
+    assert len(scheduled) == 2
+
+
+def test_dedup_never_returns_another_owners_path(client, seed, auth_headers):
+    def upload(farmer):
+        response = client.post(
+            "/uploads/farmer", headers=auth_headers(farmer, ROLE_FARMER),
+            data={"file": (io.BytesIO(b"%PDF shared bytes"), "id.pdf", "application/pdf")},
+        )
+        assert response.status_code == 200
+        return response.get_json()["data"]
+
+    a, b = seed.farmer(), seed.farmer()
+    first, again = upload(a), upload(a)
+    other = upload(b)
+
+    assert again["deduplicated"] and again["path"] == first["path"]
+    assert not other["deduplicated"] and other["path"].startswith(f"farmers/{b.id}/")
+
+
+def test_file_links_are_signed_with_their_own_key(monkeypatch):
+    from app.config import Config
+    from app.services.storage_backends import file_signature
+
+    signature = file_signature("farmers/x/a.jpg", 123)
+    monkeypatch.setattr(Config, "JWT_SECRET_KEY", "rotated-jwt-key")
+    assert file_signature("farmers/x/a.jpg", 123) == signature
+
+    monkeypatch.setattr(Config, "FILE_SIGNING_KEY", "rotated-file-key")
+    assert file_signature("farmers/x/a.jpg", 123) != signature
+
+
+def test_backend_missing_a_method_fails_on_creation():
+    from app.services.storage_backends import StorageBackend
+
+    class UploadOnly(StorageBackend):
+        def upload(self, storage_path, body, content_type):
+            pass
+
+    with pytest.raises(TypeError):
+        UploadOnly()
+
+
+def test_signed_local_link_serves_byte_ranges(client, seed, auth_headers):
+    from urllib.parse import urlsplit
+
+    farmer = seed.farmer()
+    body = bytes(range(256)) * 64
+    uploaded = client.post(
+        "/uploads/farmer", headers=auth_headers(farmer, ROLE_FARMER),
+        data={"file": (io.BytesIO(body), "report.pdf", "application/pdf")},
+    ).get_json()["data"]
+    link = urlsplit(uploaded["url"])
+    url = f"{link.path}?{link.query}"
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.data == body[100:200]
+    assert partial.headers["Content-Range"] == f"bytes 100-199/{len(body)}"
+
+    assert client.get(url).data == body
+    tampered = url.replace("sig=", "sig=0")
+    assert client.get(tampered).status_code == 403
+
+
+def test_body_over_max_content_length_is_413(app, client, seed, auth_headers, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 64 * 1024)
+    headers = auth_headers(seed.farmer(), ROLE_FARMER)
+
+    response = client.post(
+        "/uploads/farmer",
+        data={"file": (io.BytesIO(b"x" * 128 * 1024), "big.pdf", "application/pdf")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 413
+    assert response.get_json()["error"] == "Payload too large"
+
+
+def test_file_over_upload_limit_is_413(client, seed, auth_headers, monkeypatch):
+    # within MAX_CONTENT_LENGTH (headroom), but over the per-file limit
+    monkeypatch.setattr(Config, "MAX_UPLOAD_BYTES", 1024)
+    headers = auth_headers(seed.farmer(), ROLE_FARMER)
+
+    response = client.post(
+        "/uploads/farmer",
+        data={"file": (io.BytesIO(b"x" * 2048), "big.pdf", "application/pdf")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 413
+    assert response.get_json()["status"] == "error"
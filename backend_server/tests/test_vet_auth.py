@@ -0,0 +1,56 @@
+from app.config import Config
+from app.db import DB
+from app.models.vets import Vet
+from app.utils.security import ROLE_VET
+
+AUTH = "/veterinarian/auth"
+
+
+def legacy_vet(mobile):
+    # Saved before mobile_e164 existed (not yet backfilled)
+    DB.vets.insert_one({
+        "name": "Old Vet", "mobile": mobile, "qualification": "BVSc",
+        "registration_number": "VET-OLD",
+    })
+
+
+def test_login_matches_a_legacy_non_e164_mobile(client):
+    legacy_vet("98765 43210")
+
+    sent = client.post(f"{AUTH}/login/send-otp", json={"mobile": "+91 9876543210"})
+    assert sent.status_code == 200
+
+    login = client.post(
+        f"{AUTH}/login/verify-otp",
+        json={"mobile": "9876543210", "otp_code": Config.TEST_OTP_CODE},
+    )
+    assert login.status_code == 200
+    assert login.get_json()["data"]["access_token"]
+
+    # found once through the fallback, then by mobile_e164
+    assert Vet.objects(mobile_e164="+919876543210").count() == 1
+
+
+def test_register_refuses_a_legacy_mobile(client):
+    legacy_vet("09876543210")
+    response = client.post(f"{AUTH}/register/send-otp", json={"mobile": "9876543210"})
+    assert response.status_code == 409
+
+
+def test_register_requires_the_registration_token(client, seed, auth_headers):
+    vet = seed.vet()
+    body = {"name": "New", "qualification": "BVSc", "registration_number": "VET-NEW"}
+
+    response = client.post(f"{AUTH}/register", json=body, headers=auth_headers(vet, ROLE_VET))
+    assert response.status_code == 403
+
+    client.post(f"{AUTH}/register/send-otp", json={"mobile": "9123456780"})
+    verified = client.post(
+        f"{AUTH}/register/verify-otp",
+        json={"mobile": "9123456780", "otp_code": Config.TEST_OTP_CODE},
+    )
+    temp_token = verified.get_json()["data"]["temp_token"]
+    response = client.post(
+        f"{AUTH}/register", json=body, headers={"Authorization": f"Bearer {temp_token}"}
+    )
+    assert response.status_code == 201